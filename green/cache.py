@@ -0,0 +1,52 @@
+"""Persist small pieces of information between green runs."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Any
+
+from green.output import debug
+
+
+def readCache(cache_dir: str, name: str, default: Any = None) -> Any:
+    """
+    I return the value stored under `name` in `cache_dir`.
+
+    If caching is disabled (an empty `cache_dir`), or nothing usable has been
+    stored yet, I return `default` instead.
+    """
+    if not cache_dir:
+        return default
+    path = os.path.join(cache_dir, name + ".json")
+    try:
+        with open(path, encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        debug(f"No usable cache file at {path}", 2)
+        return default
+
+
+def writeCache(cache_dir: str, name: str, value: Any) -> None:
+    """
+    I store `value` (anything json can serialize) under `name` in `cache_dir`.
+
+    The value is written to a temporary file which is then moved into place,
+    so concurrent runs sharing a cache directory never read a partially
+    written file.  The last run to finish wins.
+    """
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=f".{name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+                json.dump(value, cache_file)
+            os.replace(temp_path, os.path.join(cache_dir, name + ".json"))
+        except:
+            os.unlink(temp_path)
+            raise
+    except (OSError, TypeError, ValueError) as e:
+        debug(f"Unable to write cache file '{name}' in {cache_dir}: {e}")
@@ -46,7 +46,11 @@ def _main(argv: Sequence[str] | None, testing: bool) -> int:
 
     # Argument-completion for bash and zsh (for test-target completion)
     if args.completions:
-        print(getCompletions(args.targets))
+        print(
+            getCompletions(
+                args.targets, args.cache_dir, args.test_pattern, args.exclude_dirs
+            )
+        )
         return 0
 
     # Option-completion for bash and zsh
@@ -59,29 +63,84 @@ def _main(argv: Sequence[str] | None, testing: bool) -> int:
         loaded_files = ", ".join(str(path) for path in config.files_loaded)
         debug(f"Loaded config file(s): {loaded_files}")
 
+    # Only run the tests affected by the changed files
+    if args.changed_since or args.changed_files:
+        from green.exceptions import ChangedFilesError
+        from green.impact import findChangedFiles, selectChangedTargets
+
+        changed = list(args.changed_files)
+        if args.changed_since:
+            try:
+                changed.extend(findChangedFiles(args.changed_since))
+            except ChangedFilesError as e:
+                print(f"Unable to find the changed files: {e}", file=sys.stderr)
+                return 1
+        debug(f"Changed files: {changed}")
+        args.targets = selectChangedTargets(
+            args.targets,
+            changed,
+            args.file_pattern,
+            args.cache_dir,
+            args.exclude_dirs,
+        )
+        if not args.targets:
+            stream.writeln("No tests are affected by the changed files.")
+            return 0
+
+    # Only run the tests which failed last time
+    if args.last_failed:
+        from green.cache import readCache
+        from green.index import DiscoveryIndex
+        from green.runner import (
+            FAILURES_CACHE,
+            selectFailedTargets,
+            selectLoadableFailures,
+        )
+
+        failures = selectFailedTargets(
+            args.targets, readCache(args.cache_dir, FAILURES_CACHE, [])
+        )
+        # Like when none failed, run all of the tests if the failed ones are gone
+        failures = selectLoadableFailures(
+            failures,
+            DiscoveryIndex(args.cache_dir, args.test_pattern),
+            args.file_pattern,
+        )
+        if failures:
+            debug(f"Running the tests which failed last time: {failures}")
+            args.targets = failures
+        else:
+            debug("No tests which failed last time are left, running all of them.")
+
+    # Run the tests again whenever files change
+    if args.watch:  # pragma: no cover
+        from green.watch import watch
+
+        return watch(stream, args)
+
     # Discover/Load the test suite
     if testing:
         test_suite = None
+    elif args.lazy_discovery:
+        # The worker processes do all of the importing.
+        debug("Lazy discovery, the tests will be loaded by the workers.")
+        test_suite = GreenTestSuite()
     else:  # pragma: no cover
         loader = GreenTestLoader()
-        test_suite = loader.loadTargets(args.targets, file_pattern=args.file_pattern)
+        test_suite = loader.loadTargets(
+            args.targets,
+            file_pattern=args.file_pattern,
+            exclude_dirs=args.exclude_dirs,
+        )
 
     # We didn't even load 0 tests...
-    if not test_suite:
+    if not test_suite and not args.lazy_discovery:
         debug("No test loading attempts succeeded.  Created an empty test suite.")
         test_suite = GreenTestSuite()
 
     # Actually run the test_suite
     result = run(test_suite, stream, args, testing)
 
-    # Generate a test report if required
-    if args.junit_report:
-        from green.junit import JUnitXML
-
-        adapter = JUnitXML()
-        with open(args.junit_report, "w") as report_file:
-            adapter.save_as(result, report_file)
-
     return int(not result.wasSuccessful())
 
 
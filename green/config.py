@@ -39,13 +39,19 @@ def get_default_args() -> argparse.Namespace:
         initializer="",
         finalizer="",
         maxtasksperchild=None,
+        split_modules=False,
+        split_module_fixtures=False,
+        preload=None,
         termcolor=None,
         notermcolor=None,
         disable_windows=False,
         allow_stdout=False,
         quiet_stdout=False,
+        capture_limit=1000000,
         no_skip_report=False,
         no_tracebacks=False,
+        ordered_output=False,
+        stream_results=False,
         help=False,  # Not in configs
         version=False,
         logging=False,
@@ -55,8 +61,17 @@ def get_default_args() -> argparse.Namespace:
         failfast=False,
         config=None,  # Not in configs
         file_pattern="test*.py",
+        exclude_dirs=None,
         test_pattern="*",
+        lazy_discovery=False,
+        parallel_discovery=False,
+        watch=False,
+        changed_since="",
+        changed_files=None,
+        last_failed=False,
+        failed_first=False,
         junit_report="",
+        cache_dir=".green_cache",
         run_coverage=False,
         cov_config_file=True,  # A string with a special boolean default
         quiet_coverage=False,
@@ -64,6 +79,7 @@ def get_default_args() -> argparse.Namespace:
         omit_patterns=None,
         include_patterns=None,
         minimum_coverage=None,
+        sysmon_coverage=False,
         completion_file=False,
         completions=False,
         options=False,
@@ -232,6 +248,46 @@ def parseArguments(
         )
     )
 
+    store_opt(
+        concurrency_args.add_argument(
+            "--split-modules",
+            action="store_true",
+            help="Run the test classes of a heavy test module as separate tasks, "
+            "so they can run in parallel.  A module is heavy if it is expected "
+            "to take longer than an even share of the whole run across all the "
+            "processes, going by its number of tests or by how long it took "
+            "last time (see --cache-dir).  Modules that use the load_tests "
+            "protocol or doctest_modules are never split.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        concurrency_args.add_argument(
+            "--split-module-fixtures",
+            action="store_true",
+            help="Also let --split-modules split modules that define "
+            "setUpModule or tearDownModule.  The module fixtures then run once "
+            "per test class in whichever process runs it, so only use this if "
+            "they are safe to run several times, possibly concurrently.",
+            default=argparse.SUPPRESS,
+        )
+    )
+
+    store_opt(
+        concurrency_args.add_argument(
+            "--preload",
+            action="store",
+            metavar="MODULES",
+            help="Comma-separated modules to import once, in the server process "
+            "that the worker processes are forked from, so that they do not "
+            "each import them again.  Useful for large packages that most "
+            "tests use, like django or numpy.  Code that preloaded modules "
+            "run when imported is not included in coverage.  Only supported "
+            'on platforms with the "forkserver" start method.',
+            default=argparse.SUPPRESS,
+        )
+    )
+
     format_args = parser.add_argument_group("Format Options")
     store_opt(
         format_args.add_argument(
@@ -289,6 +345,21 @@ def parseArguments(
             default=argparse.SUPPRESS,
         )
     )
+    store_opt(
+        out_args.add_argument(
+            "--capture-limit",
+            action="store",
+            metavar="CHARS",
+            type=int,
+            help=(
+                "How many characters of the captured stdout (and stderr) of "
+                "each test to keep in memory.  Output beyond that is spilled "
+                "to a temporary file, and only its beginning and end are "
+                "presented.  0 means no limit.  Default is 1000000."
+            ),
+            default=argparse.SUPPRESS,
+        )
+    )
     store_opt(
         out_args.add_argument(
             "-k",
@@ -311,6 +382,32 @@ def parseArguments(
             default=argparse.SUPPRESS,
         )
     )
+    store_opt(
+        out_args.add_argument(
+            "--ordered-output",
+            action="store_true",
+            help=(
+                "Report results grouped by test module, in the order the "
+                "modules were discovered, instead of as soon as each test "
+                "completes.  Results of modules that finish early are held back "
+                "until the modules discovered before them are done."
+            ),
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        out_args.add_argument(
+            "--stream-results",
+            action="store_true",
+            help=(
+                "Only count the tests which did not fail instead of keeping "
+                "them until the end of the run, so that memory use does not "
+                "grow with the number of tests.  The skip report and the "
+                "captured output of tests which did not fail are not shown."
+            ),
+            default=argparse.SUPPRESS,
+        )
+    )
     store_opt(
         out_args.add_argument(
             "-h",
@@ -409,6 +506,20 @@ def parseArguments(
             default=argparse.SUPPRESS,
         )
     )
+    store_opt(
+        other_args.add_argument(
+            "--exclude-dirs",
+            action="store",
+            metavar="PATTERNS",
+            help="Comma-separated .gitignore style patterns of directories not "
+            "to look for test files in, like 'node_modules,build*,/docs'.  "
+            "Patterns with a slash match the path of a directory relative to "
+            "the target being searched, others match its name anywhere.  "
+            "Virtual environments and directories that could not be a package "
+            "name are always skipped.",
+            default=argparse.SUPPRESS,
+        )
+    )
     store_opt(
         other_args.add_argument(
             "-n",
@@ -420,13 +531,110 @@ def parseArguments(
             default=argparse.SUPPRESS,
         )
     )
+    store_opt(
+        other_args.add_argument(
+            "--lazy-discovery",
+            action="store_true",
+            help="Only look for test files in the main process, and leave "
+            "importing them to the worker processes, so that they are not all "
+            "imported twice.  Directories are searched for files matching "
+            "--file-pattern without checking that they contain tests.  The "
+            "tests of the files which have not changed since they were last "
+            "loaded are taken from the discovery index kept in --cache-dir.  "
+            "--split-modules only has an effect with --parallel-discovery.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        other_args.add_argument(
+            "--parallel-discovery",
+            action="store_true",
+            help="Import the test files that are not in the discovery index, "
+            "or changed since, in the worker processes before running any "
+            "test, so that their tests are known up front without importing "
+            "them one by one in the main process, and --split-modules can "
+            "split the heavy ones.  Implies --lazy-discovery.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        other_args.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running.  After the tests have run, watch the python files "
+            "under the target directories and the current directory, and "
+            "whenever some change, run the tests they may affect again, in new "
+            "worker processes.  Implies "
+            "--lazy-discovery.  Coverage is only measured the first time.  "
+            "Press Ctrl-C to stop.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        other_args.add_argument(
+            "--changed-since",
+            action="store",
+            metavar="GIT_REF",
+            help="Only run the test modules in the target directories that "
+            "changed since the given git commit, branch or tag, or that import a "
+            "python module which did (directly or not), going by their import "
+            "statements.  Uncommitted and untracked changes count too.  Changes "
+            "to anything other than python modules are ignored.  All of the "
+            "tests run if a python module outside of the target directories "
+            "and the current directory changed.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        other_args.add_argument(
+            "--changed-files",
+            action="store",
+            metavar="FILES",
+            help="Like --changed-since, but for the given comma-separated "
+            "files.  Both options can be used together.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        other_args.add_argument(
+            "--last-failed",
+            action="store_true",
+            help="Only run the tests in the targets which failed (or errored) "
+            "the last time they ran, as recorded in --cache-dir.  If none did, "
+            "or those which did were renamed or deleted since, all of the "
+            "tests are run.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        other_args.add_argument(
+            "--failed-first",
+            action="store_true",
+            help="Run all of the tests, but start with the ones which failed "
+            "the last time they ran, as recorded in --cache-dir.",
+            default=argparse.SUPPRESS,
+        )
+    )
     store_opt(
         other_args.add_argument(
             "-j",
             "--junit-report",
             action="store",
             metavar="FILENAME",
-            help=("Generate a JUnit XML report."),
+            help="Generate a JUnit XML report, written as the tests run.",
+            default=argparse.SUPPRESS,
+        )
+    )
+    store_opt(
+        other_args.add_argument(
+            "--cache-dir",
+            action="store",
+            metavar="DIR",
+            help="Directory where green keeps information between runs, such "
+            "as how long each test module took to run (used to start the "
+            "slowest modules first), which tests failed and which tests each test file "
+            "holds.  Set to an empty string to disable. "
+            "Default is .green_cache",
             default=argparse.SUPPRESS,
         )
     )
@@ -529,6 +737,19 @@ def parseArguments(
             default=argparse.SUPPRESS,
         )
     )
+    store_opt(
+        cov_args.add_argument(
+            "--sysmon-coverage",
+            action="store_true",
+            help=(
+                "Measure coverage with the sys.monitoring core of coverage, "
+                "which slows the tests down much less than the default tracer.  "
+                "Needs python 3.12+ and coverage 7.9+, otherwise the default "
+                "tracer is used."
+            ),
+            default=argparse.SUPPRESS,
+        )
+    )
 
     integration_args = parser.add_argument_group("Integration Options")
     store_opt(
@@ -653,6 +874,19 @@ def getConfig(  # pragma: no cover
     return parser
 
 
+def useSysmonCore(cov: coverage.Coverage) -> None:  # pragma: no cover
+    """
+    I make a coverage object that has not been started yet measure with the
+    sys.monitoring core of coverage, when this python (3.12+) and coverage
+    (7.9+) have it.  Otherwise I leave it with the default tracer.
+    """
+    # Older versions of coverage can't be told which core to use, and don't
+    # all raise a CoverageException when asked to.
+    if sys.version_info < (3, 12) or coverage.version_info < (7, 9):
+        return
+    cov.set_option("run:core", "sysmon")
+
+
 # Since this must be imported before coverage is started, we get erroneous
 # reports of not covering this function during our internal coverage tests.
 def mergeConfig(  # pragma: no cover
@@ -667,6 +901,9 @@ def mergeConfig(  # pragma: no cover
         shouldExit       = default False
         exitCode         = default 0
         include patterns = include-patterns setting converted to list.
+        preload          = preload setting converted to list.
+        exclude_dirs     = exclude-dirs setting converted to list.
+        changed_files    = changed-files setting converted to list.
         omit_patterns    = omit-patterns settings converted to list and
                            extended, taking clear-omit into account.
         cov              = coverage object default None
@@ -695,8 +932,18 @@ def mergeConfig(  # pragma: no cover
             "clear_omit",
             "no_skip_report",
             "no_tracebacks",
+            "ordered_output",
+            "stream_results",
+            "split_modules",
+            "split_module_fixtures",
+            "lazy_discovery",
+            "parallel_discovery",
+            "watch",
+            "last_failed",
+            "failed_first",
             "disable_windows",
             "quiet_coverage",
+            "sysmon_coverage",
         }:
             config_getter = config.getboolean
         elif name in {
@@ -705,18 +952,24 @@ def mergeConfig(  # pragma: no cover
             "verbose",
             "minimum_coverage",
             "maxtasksperchild",
+            "capture_limit",
         }:
             config_getter = config.getint
         elif name in {
             "file_pattern",
+            "exclude_dirs",
             "finalizer",
             "initializer",
+            "preload",
             "cov_config_file",
             "include_patterns",
             "omit_patterns",
             "warnings",
             "test_pattern",
             "junit_report",
+            "cache_dir",
+            "changed_since",
+            "changed_files",
         }:
             config_getter = config.get
         elif name in {"targets", "help", "config"}:
@@ -810,9 +1063,27 @@ def mergeConfig(  # pragma: no cover
     else:
         new_args.include_patterns = []
 
+    if new_args.changed_files:
+        new_args.changed_files = [x.strip() for x in new_args.changed_files.split(",")]
+    else:
+        new_args.changed_files = []
+
+    if new_args.preload:
+        new_args.preload = [x.strip() for x in new_args.preload.split(",")]
+    else:
+        new_args.preload = []
+
+    if new_args.exclude_dirs:
+        new_args.exclude_dirs = [x.strip() for x in new_args.exclude_dirs.split(",")]
+    else:
+        new_args.exclude_dirs = []
+
     if new_args.quiet_coverage or isinstance(new_args.cov_config_file, str):
         new_args.run_coverage = True
 
+    if new_args.parallel_discovery:
+        new_args.lazy_discovery = True
+
     if new_args.minimum_coverage is not None:
         new_args.run_coverage = True
 
@@ -824,6 +1095,8 @@ def mergeConfig(  # pragma: no cover
                 include=new_args.include_patterns,
                 config_file=new_args.cov_config_file,
             )
+            if new_args.sysmon_coverage:
+                useSysmonCore(cov)
             cov.start()
         new_args.cov = cov
 
@@ -3,3 +3,7 @@ from __future__ import annotations
 
 class InitializerOrFinalizerError(Exception):
     pass
+
+
+class ChangedFilesError(Exception):
+    pass
@@ -0,0 +1,235 @@
+"""Finding the tests affected by changes to some files."""
+
+from __future__ import annotations
+
+import ast
+from collections import deque
+import os
+import pathlib
+import subprocess
+from typing import Iterable, Sequence
+
+from green.cache import readCache, writeCache
+from green.exceptions import ChangedFilesError
+from green.loader import findTestFiles, isPackage
+from green.output import debug
+
+# Name of the cache entry holding the imports found in each module, by path.
+IMPORTS_CACHE = "imports"
+
+
+def moduleName(path: str) -> str:
+    """
+    I return the full dotted name of the module at path, with respect to the
+    package it is in, like findDottedModuleAndParentDir() does, except that
+    the file need not exist anymore.  Packages are named without __init__.
+    """
+    file_path = pathlib.Path(path).absolute()
+    parts = [] if file_path.stem == "__init__" else [file_path.stem]
+    parent_dir = file_path.parent
+    while isPackage(parent_dir):
+        parts.insert(0, parent_dir.name)
+        parent_dir = parent_dir.parent
+    return ".".join(parts)
+
+
+def findImports(path: str, module: str) -> list[str]:
+    """
+    I return the dotted names that the module at path imports, without
+    importing it.  For `from x import y`, both x and x.y are included, since
+    y may be a submodule.  Relative imports are resolved against module.
+    """
+    try:
+        with open(path, "rb") as source:
+            tree = ast.parse(source.read(), path)
+    except (OSError, SyntaxError, ValueError):
+        debug(f"Unable to parse {path} for imports")
+        return []
+    if os.path.basename(path) == "__init__.py":
+        package = module
+    else:
+        package = module.rpartition(".")[0]
+    imports: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package.split(".") if package else []
+                base_parts = base_parts[: len(base_parts) - (node.level - 1)]
+                if node.module:
+                    base_parts.append(node.module)
+                base = ".".join(base_parts)
+            else:
+                base = node.module or ""
+            if base:
+                imports.add(base)
+            for alias in node.names:
+                imports.add(f"{base}.{alias.name}" if base else alias.name)
+    return sorted(imports)
+
+
+def buildImportGraph(
+    roots: Iterable[str], cache_dir: str = "", exclude_dirs: Sequence[str] = ()
+) -> dict[str, set[str]]:
+    """
+    I return the reverse import graph of the python modules under the roots,
+    outside of the excluded directories (see findTestFiles()): each module is
+    mapped to the modules that import it directly.
+
+    Only the modules that changed or were renamed since the cached graph was
+    built are parsed again.
+    """
+    cache: dict[str, list] = readCache(cache_dir, IMPORTS_CACHE, {})
+    new_cache: dict[str, list] = {}
+    modules: dict[str, list[str]] = {}
+    for root in roots:
+        for path in findTestFiles(root, "*.py", exclude_dirs):
+            abs_path = os.path.abspath(path)
+            try:
+                mtime = os.stat(abs_path).st_mtime_ns
+            except OSError:
+                continue
+            # The name changes if an __init__.py is added or removed
+            module = moduleName(abs_path)
+            entry = cache.get(abs_path)
+            if entry is None or entry[0] != mtime or entry[1] != module:
+                entry = [mtime, module, findImports(abs_path, module)]
+            new_cache[abs_path] = entry
+            modules[entry[1]] = entry[2]
+    if new_cache != cache:
+        writeCache(cache_dir, IMPORTS_CACHE, new_cache)
+
+    importers: dict[str, set[str]] = {module: set() for module in modules}
+    for module, imports in modules.items():
+        for name in imports:
+            # Importing a.b.c imports the packages a and a.b as well.  Modules
+            # which were not parsed are kept, in case they were just deleted.
+            parts = name.split(".")
+            for i in range(1, len(parts) + 1):
+                imported = ".".join(parts[:i])
+                if imported != module:
+                    importers.setdefault(imported, set()).add(module)
+    return importers
+
+
+def findImportRoots(roots: Iterable[str]) -> list[str]:
+    """
+    I return the absolute paths of the directories to look for the modules
+    that the tests under the roots may import: the directory each root's
+    top-level package is in, and the current directory.  Directories inside
+    others are left out, since they are walked anyway.
+    """
+    import_roots = {os.getcwd()}
+    for root in roots:
+        import_dir = pathlib.Path(root).absolute()
+        while isPackage(import_dir):
+            import_dir = import_dir.parent
+        import_roots.add(str(import_dir))
+    return [
+        x
+        for x in sorted(import_roots)
+        if not any(isWithinDir(x, y) for y in import_roots if y != x)
+    ]
+
+
+def isWithinDir(path: str, directory: str) -> bool:
+    """
+    I check whether path is inside directory, both being absolute.
+    """
+    return path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def findAffectedTestModules(
+    changed: Iterable[str],
+    roots: Iterable[str],
+    file_pattern: str = "test*.py",
+    cache_dir: str = "",
+    exclude_dirs: Sequence[str] = (),
+) -> list[str]:
+    """
+    I return the dotted names of the test modules under the roots that are
+    among the changed python files, or import one of them, directly or not.
+    Changed files that are not python modules are ignored.
+
+    The imports are followed through all the modules under the import roots
+    of the roots (see findImportRoots()).  If a python file outside of them
+    changed, which of the tests use it can not be told, so all of the test
+    modules under the roots are returned.
+    """
+    roots = list(roots)
+    import_roots = findImportRoots(roots)
+    importers = buildImportGraph(import_roots, cache_dir, exclude_dirs)
+    changed = [os.path.abspath(x) for x in changed if x.endswith(".py")]
+    changed_modules = {moduleName(x) for x in changed}
+    unknown = [x for x in changed if not any(isWithinDir(x, y) for y in import_roots)]
+    if unknown:
+        debug(f"Changed files outside of {import_roots}: {unknown}")
+    affected = set()
+    queue = deque(changed_modules)
+    while queue:
+        module = queue.popleft()
+        if module in affected:
+            continue
+        affected.add(module)
+        queue.extend(importers.get(module, ()))
+    test_modules = []
+    for root in roots:
+        for path in findTestFiles(root, file_pattern, exclude_dirs):
+            module = moduleName(path)
+            if unknown or module in affected:
+                test_modules.append(module)
+    return test_modules
+
+
+def findChangedFiles(ref: str) -> list[str]:
+    """
+    I return the absolute paths of the files that differ from the git ref,
+    including uncommitted and untracked ones.
+    """
+    try:
+        top_level = gitOutput("rev-parse", "--show-toplevel")[0]
+        # Both list paths relative to the top level
+        paths = gitOutput("-C", top_level, "diff", "--name-only", ref, "--")
+        paths += gitOutput(
+            "-C", top_level, "ls-files", "--others", "--exclude-standard"
+        )
+    except OSError as e:
+        raise ChangedFilesError(f"Unable to run git: {e}")
+    return [os.path.join(top_level, x) for x in paths]
+
+
+def gitOutput(*args: str) -> list[str]:
+    """
+    I run git with the given arguments, and return the lines it outputs.
+    """
+    process = subprocess.run(
+        ("git",) + args, capture_output=True, text=True, check=False
+    )
+    if process.returncode:
+        raise ChangedFilesError(
+            f"git {' '.join(args)} failed: {process.stderr.strip()}"
+        )
+    return process.stdout.splitlines()
+
+
+def selectChangedTargets(
+    targets: list[str],
+    changed: Iterable[str],
+    file_pattern: str = "test*.py",
+    cache_dir: str = "",
+    exclude_dirs: Sequence[str] = (),
+) -> list[str]:
+    """
+    I narrow the target directories down to the test modules in them that
+    are affected by the changed files.  Other targets are kept as they are.
+    """
+    roots = [x for x in targets if os.path.isdir(x)]
+    others = [x for x in targets if not os.path.isdir(x)]
+    if not roots:
+        return others
+    affected = findAffectedTestModules(
+        changed, roots, file_pattern, cache_dir, exclude_dirs
+    )
+    debug(f"Test modules affected by the changed files: {affected}")
+    return affected + others
@@ -0,0 +1,167 @@
+"""Remembering which tests each test file holds, to avoid importing it again."""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from green.cache import readCache, writeCache
+from green.output import debug
+
+# Name of the cache entry holding the tests found in each test file, by path.
+DISCOVERY_CACHE = "discovery"
+
+
+def fileStamp(path: str) -> list[int] | None:
+    """
+    I return what tells whether the file at path changed: its modification
+    time and size.  If it cannot be read, I return None.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class DiscoveryIndex:
+    """
+    I map each test file, by absolute path, to the dotted name of its module,
+    the dotted names of the tests loaded from it (its test methods, grouped by
+    class in their names) and whether it has module fixtures or loads its
+    tests in ways that can not be split by class.
+
+    An entry is only used while the modification time and size of its file
+    are the same as when it was made, and the test pattern is the same.
+
+    Concurrent runs sharing a cache directory only replace the entries they
+    made themselves, see save().
+    """
+
+    def __init__(self, cache_dir: str, test_pattern: str = "*") -> None:
+        self.cache_dir = cache_dir
+        self.test_pattern = test_pattern
+        self.entries: dict[str, dict] = readCache(cache_dir, DISCOVERY_CACHE, {})
+        self.updates: dict[str, dict] = {}
+        self._paths: dict[str, str | None] | None = None
+
+    def lookup(self, path: str) -> dict | None:
+        """
+        I return the entry of the test file at path, if it is still valid.
+        """
+        abs_path = os.path.abspath(path)
+        entry = self.updates.get(abs_path) or self.entries.get(abs_path)
+        if (
+            entry is None
+            or entry.get("test_pattern") != self.test_pattern
+            or entry.get("stamp") != fileStamp(abs_path)
+        ):
+            return None
+        return entry
+
+    def lookupModule(self, module_name: str) -> dict | None:
+        """
+        I return the valid entry of the test file of the module with the given
+        dotted name, if there is exactly one such file.
+        """
+        if self._paths is None:
+            self._paths = {}
+            for path, entry in self.entries.items():
+                module = entry["module"]
+                # Two files named the same can not be told apart
+                self._paths[module] = None if module in self._paths else path
+        module_path = self._paths.get(module_name)
+        return self.lookup(module_path) if module_path else None
+
+    def add(self, module_name: str, tests: list[str], path: str = "") -> None:
+        """
+        I make an entry for the imported module with the given dotted name,
+        from the dotted names of all the tests loaded from it (see
+        moduleEntry()).
+        """
+        described = moduleEntry(module_name, tests, path)
+        if described is not None:
+            self.addEntry(*described)
+
+    def addEntry(self, path: str, entry: dict) -> None:
+        """
+        I add the entry moduleEntry() made for the file at path, possibly in
+        another process.
+        """
+        entry = dict(entry, test_pattern=self.test_pattern)
+        if entry != self.entries.get(path):
+            self.updates[path] = entry
+            self._paths = None
+
+    def save(self) -> None:
+        """
+        I store the entries made since the index was read.  The index is read
+        again first, so that the entries other runs stored meanwhile are kept,
+        and those of the files which are gone are dropped.
+        """
+        if not self.updates:
+            return
+        entries = readCache(self.cache_dir, DISCOVERY_CACHE, {})
+        entries.update(self.updates)
+        entries = {x: y for x, y in entries.items() if os.path.isfile(x)}
+        debug(f"Updating {len(self.updates)} discovery index entries", 2)
+        writeCache(self.cache_dir, DISCOVERY_CACHE, entries)
+        self.entries = entries
+        self.updates = {}
+        self._paths = None
+
+
+def moduleEntry(
+    module_name: str, tests: list[str], path: str = ""
+) -> tuple[str, dict] | None:
+    """
+    I return the absolute path of the file of the imported module with the
+    given dotted name, and its entry for the index, made from the dotted
+    names of all the tests loaded from it.  The file is found from the
+    module, unless path is given.  If the module is not imported, or its file
+    can not be found, I return None.
+    """
+    module = sys.modules.get(module_name)
+    if module is None:
+        return None
+    path = os.path.abspath(path or getattr(module, "__file__", None) or "")
+    stamp = fileStamp(path)
+    if stamp is None or not os.path.isfile(path):
+        return None
+    return path, {
+        "module": module_name,
+        "stamp": stamp,
+        "tests": tests,
+        "load_tests": hasattr(module, "load_tests"),
+        "doctest_modules": bool(getattr(module, "doctest_modules", None)),
+        "module_fixtures": hasattr(module, "setUpModule")
+        or hasattr(module, "tearDownModule"),
+    }
+
+
+def isSplittableEntry(entry: dict | None, allow_module_fixtures: bool = False) -> bool:
+    """
+    I check whether the tests of an indexed module can be run as separate
+    per-class targets, like isSplittableModule() does for an imported one.
+    Modules which are not indexed never are.
+    """
+    if entry is None or entry["load_tests"] or entry["doctest_modules"]:
+        return False
+    return allow_module_fixtures or not entry["module_fixtures"]
+
+
+def indexTargetTests(index: DiscoveryIndex, target_tests: dict[str, list[str]]) -> None:
+    """
+    I add the imported modules among the parallel targets to the index, along
+    with their tests, and save it.  Modules some tests of which were given as
+    more specific targets are left out, since not all of their tests are
+    known.
+    """
+    for target, tests in target_tests.items():
+        if target not in sys.modules:
+            continue
+        prefix = target + "."
+        if any(x.startswith(prefix) for x in target_tests):
+            continue
+        index.add(target, tests)
+    index.save()
@@ -2,14 +2,28 @@
 
 from __future__ import annotations
 
-from typing import Dict, List, Final, TextIO, Tuple, TYPE_CHECKING, Union
-
-from lxml.etree import Element, tostring as to_xml
+from contextlib import ExitStack
+import os
+from typing import (
+    BinaryIO,
+    Dict,
+    List,
+    Final,
+    TextIO,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+)
+
+from lxml.etree import Element, tostring as to_xml, xmlfile
+
+from green.result import ResultReporter
 
 if TYPE_CHECKING:
     # TypeAlias moved to the typing module after py3.9.
     from typing_extensions import TypeAlias
 
+    from green.output import SpilledOutput
     from green.result import GreenTestResult, ProtoTest, ProtoError
     from lxml.etree import _Element
 
@@ -77,7 +91,10 @@ class JUnitXML:
             xml_root.append(xml_suite)
 
         xml_root.set(JUnitDialect.TEST_TIME, str(test_results.timeTaken))
+        self._write(xml_root, destination)
 
+    @staticmethod
+    def _write(xml_root: _Element, destination: TextIO) -> None:
         xml = to_xml(
             xml_root,
             xml_declaration=True,
@@ -142,28 +159,33 @@ class JUnitXML:
     def _convert_suite(
         self, results: GreenTestResult, name: str, suite: list[TestVerdict]
     ) -> _Element:
-        xml_suite = Element(JUnitDialect.TEST_SUITE)
-        xml_suite.set(JUnitDialect.NAME, name)
-        xml_suite.set(JUnitDialect.TEST_COUNT, str(len(suite)))
-        xml_suite.set(
-            JUnitDialect.FAILURE_COUNT,
-            str(self._count_test_with_verdict(Verdict.FAILED, suite)),
-        )
-        xml_suite.set(
-            JUnitDialect.ERROR_COUNT,
-            str(self._count_test_with_verdict(Verdict.ERROR, suite)),
+        xml_suite = self._suite_element(
+            name,
+            len(suite),
+            self._count_test_with_verdict(Verdict.FAILED, suite),
+            self._count_test_with_verdict(Verdict.ERROR, suite),
+            self._count_test_with_verdict(Verdict.SKIPPED, suite),
+            self._suite_time(suite),
         )
-        xml_suite.set(
-            JUnitDialect.SKIPPED_COUNT,
-            str(self._count_test_with_verdict(Verdict.SKIPPED, suite)),
-        )
-        xml_suite.set(JUnitDialect.TEST_TIME, str(self._suite_time(suite)))
         for each_test in suite:
             xml_test = self._convert_test(results, *each_test)
             xml_suite.append(xml_test)
 
         return xml_suite
 
+    @staticmethod
+    def _suite_element(
+        name: str, tests: int, failures: int, errors: int, skipped: int, time: float
+    ) -> _Element:
+        xml_suite = Element(JUnitDialect.TEST_SUITE)
+        xml_suite.set(JUnitDialect.NAME, name)
+        xml_suite.set(JUnitDialect.TEST_COUNT, str(tests))
+        xml_suite.set(JUnitDialect.FAILURE_COUNT, str(failures))
+        xml_suite.set(JUnitDialect.ERROR_COUNT, str(errors))
+        xml_suite.set(JUnitDialect.SKIPPED_COUNT, str(skipped))
+        xml_suite.set(JUnitDialect.TEST_TIME, str(time))
+        return xml_suite
+
     @staticmethod
     def _count_test_with_verdict(verdict: int, suite: list[TestVerdict]) -> int:
         return sum(1 for entry in suite if entry[0] == verdict)
@@ -174,25 +196,41 @@ class JUnitXML:
         verdict: int,
         test: ProtoTest,
         *details: str | ProtoError,
+    ) -> _Element:
+        error: str | ProtoError | None = details[0] if details else None
+        return self._test_element(
+            verdict,
+            test,
+            error,
+            results.stdout_output.get(test),
+            results.stderr_errput.get(test),
+        )
+
+    def _test_element(
+        self,
+        verdict: int,
+        test: ProtoTest,
+        error: str | ProtoError | None,
+        stdout: str | SpilledOutput | None,
+        stderr: str | SpilledOutput | None,
     ) -> _Element:
         xml_test = Element(JUnitDialect.TEST_CASE)
         xml_test.set(JUnitDialect.NAME, test.method_name)
         xml_test.set(JUnitDialect.CLASS_NAME, test.class_name)
         xml_test.set(JUnitDialect.TEST_TIME, test.test_time)
 
-        error: str | ProtoError | None = details[0] if details else None
         xml_verdict = self._convert_verdict(verdict, test, error)
         if xml_verdict is not None:
             xml_test.append(xml_verdict)
 
-        if test in results.stdout_output:
+        if stdout is not None:
             system_out = Element(JUnitDialect.SYSTEM_OUT)
-            system_out.text = results.stdout_output[test]
+            system_out.text = str(stdout)
             xml_test.append(system_out)
 
-        if test in results.stderr_errput:
+        if stderr is not None:
             system_err = Element(JUnitDialect.SYSTEM_ERR)
-            system_err.text = results.stderr_errput[test]
+            system_err.text = str(stderr)
             xml_test.append(system_err)
 
         return xml_test
@@ -219,3 +257,114 @@ class JUnitXML:
     @staticmethod
     def _suite_time(suite: list[TestVerdict]) -> float:
         return sum(float(each_test.test_time) for verdict, each_test, *details in suite)
+
+
+class JUnitReporter(JUnitXML, ResultReporter):
+    """
+    I write the JUnit XML report of a run to a file from the results as they
+    arrive, rather than from the GreenTestResult once the run is over.
+
+    Each test suite (class) is written out as soon as the target it belongs
+    to is finished, with lxml's incremental xmlfile API, so that only the
+    suites still running are held in memory.  After each one, the closing
+    tag of the report is written too, and then written over by whatever
+    comes next, so that the report is valid even if the run is killed.
+
+    Unlike with save_as(), the report has no total time, since it is not
+    known when the report is started.
+
+    See Option '-j' / '--junit-report'
+    """
+
+    # The outcomes which are part of the report
+    VERDICTS: Final[dict[str, int]] = {
+        "passing": Verdict.PASSED,
+        "failures": Verdict.FAILED,
+        "errors": Verdict.ERROR,
+        "skipped": Verdict.SKIPPED,
+    }
+    CLOSING_TAG: Final[bytes] = f"</{JUnitDialect.TEST_SUITES}>\n".encode()
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # The test elements of each suite, with their verdicts and times
+        self.suites: dict[str, list[tuple[int, float, _Element]]] = {}
+        self.report_file: BinaryIO | None = None
+        self.exit_stack = ExitStack()
+
+    def startTestRun(self, result: GreenTestResult) -> None:
+        self.report_file = open(self.path, "w+b")
+        self.xml_file = self.exit_stack.enter_context(
+            xmlfile(self.report_file, encoding="utf-8")
+        )
+        self.xml_file.write_declaration()
+        self.exit_stack.enter_context(self.xml_file.element(JUnitDialect.TEST_SUITES))
+        self.xml_file.write("\n")
+        self._writeClosingTag()
+
+    def addResult(
+        self,
+        outcome: str,
+        test: ProtoTest,
+        detail: ProtoError | str | None,
+        stdout: str | SpilledOutput | None,
+        stderr: str | SpilledOutput | None,
+    ) -> None:
+        verdict = self.VERDICTS.get(outcome)
+        if verdict is None:
+            return
+        xml_test = self._test_element(verdict, test, detail, stdout, stderr)
+        self.suites.setdefault(self._suite_name(test), []).append(
+            (verdict, float(test.test_time), xml_test)
+        )
+
+    def stopTarget(self, target: str) -> None:
+        finished = [
+            name
+            for name in self.suites
+            if name == target or name.startswith(target + ".")
+        ]
+        for name in finished:
+            self._writeSuite(name)
+        if finished:
+            self._writeClosingTag()
+
+    def stopTestRun(self, result: GreenTestResult) -> None:
+        for name in list(self.suites):
+            self._writeSuite(name)
+        if self.report_file is None:
+            return
+        # Closing the report element writes the real closing tag
+        self.exit_stack.close()
+        self.report_file.write(b"\n")
+        self.report_file.truncate()
+        self.report_file.close()
+        self.report_file = None
+
+    def _writeSuite(self, name: str) -> None:
+        suite = self.suites.pop(name)
+        if self.report_file is None:
+            return
+        verdicts = [verdict for verdict, _, _ in suite]
+        xml_suite = self._suite_element(
+            name,
+            len(suite),
+            verdicts.count(Verdict.FAILED),
+            verdicts.count(Verdict.ERROR),
+            verdicts.count(Verdict.SKIPPED),
+            sum(test_time for _, test_time, _ in suite),
+        )
+        xml_suite.extend(xml_test for _, _, xml_test in suite)
+        self.xml_file.write(xml_suite, pretty_print=True)
+
+    def _writeClosingTag(self) -> None:
+        """
+        I write the closing tag of the report, and step back over it, so that
+        the next suite (or the real closing tag) is written over it.
+        """
+        if self.report_file is None:
+            return
+        self.xml_file.flush()
+        self.report_file.write(self.CLOSING_TAG)
+        self.report_file.flush()
+        self.report_file.seek(-len(self.CLOSING_TAG), os.SEEK_CUR)
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from typing import Iterable, TextIO, Type, TYPE_CHECKING
+from typing import Callable, Iterable, TextIO, Type, TYPE_CHECKING
 
 from colorama import Fore, Style
 from colorama.ansi import Cursor
 from colorama.initialise import wrap_stream
+from io import StringIO
 import logging
 import os
 import platform
 import re
+from shutil import get_terminal_size
 import sys
+import tempfile
+import threading
+import time
 from unidecode import unidecode
 
 if TYPE_CHECKING:
@@ -21,6 +26,16 @@ debug_level = 0
 text_type: Type[str] = str
 unicode = None  # so pyflakes stops complaining
 
+# How many times a second, at most, a GreenStream refreshes the terminal with
+# the progress output written to it while the tests run (see startFrames()),
+# and how many seconds apart it refreshes its footer if nothing else changes.
+FRAMES_PER_SECOND = 20
+FOOTER_SECONDS = 1.0
+# Erases from the cursor to the end of the screen
+ERASE_BELOW = "\x1b[J"
+# Terminal control sequences, which take up no room on the screen
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
 
 def debug(message: str, level: int = 1) -> None:
     """
@@ -115,11 +130,12 @@ class GreenStream:
        methods as we discover people need them).  So far we have implemented the
        following functions just for compatibility:
            writelines(lines)
+    4) Coalescing what is written to a terminal into frames, refreshed at a
+       bounded rate, with an optional footer line (see startFrames()).
     """
 
     indent_spaces: int = 2
     _ascii_only_output: bool = False  # default to printing output in unicode
-    coverage_pattern = re.compile(r"TOTAL\s+\d+\s+\d+\s+(?P<percent>\d+)%")
 
     def __init__(
         self,
@@ -150,13 +166,114 @@ class GreenStream:
             self.encoding = stream.encoding
         except:
             self.encoding = "UTF-8"
-        # Susceptible to false-positives if other matching lines are output,
-        # so set this to None immediately before running a coverage report to
-        # guarantee accuracy.
-        self.coverage_percent: int | None = None
+        # While frames are on, the text written since the last frame, the
+        # minimum number of seconds between frames, whether I was flushed since
+        # the last one, when it was rendered, and the thread rendering them.
+        self.frame: list[str] = []
+        self.frame_interval = 0.0
+        self.frame_due = False
+        self.frame_time = 0.0
+        self.frame_thread: threading.Thread | None = None
+        self.frames_stopped = threading.Event()
+        self.frame_lock = threading.RLock()
+        # What to show on the line below the output on each frame, if anything,
+        # whether it is shown, the column the output left the cursor in, and
+        # the width of the terminal.
+        self.footer: Callable[[], str] | None = None
+        self.footer_shown = False
+        self.column = 0
+        self.width = 80
+
+    def startFrames(self, frames_per_second: int = FRAMES_PER_SECOND) -> None:
+        """
+        I start holding back what is written to me, and writing it out to my
+        stream from a thread of my own, at most frames_per_second times a
+        second, so that many test results arriving at once cost one terminal
+        update rather than one each.  Being flushed marks the next frame as
+        due instead of flushing my stream, so nothing is held back for longer
+        than a frame.
+
+        Output that is not going to a terminal is not refreshed as it arrives,
+        so there I keep writing and flushing everything straight away.
+        """
+        if not self.isatty():
+            return
+        self.frame_interval = 1.0 / frames_per_second
+        self.width = get_terminal_size().columns
+        self.frames_stopped.clear()
+        self.frame_thread = threading.Thread(
+            target=self._renderFrames, name="green-frames", daemon=True
+        )
+        self.frame_thread.start()
+
+    def stopFrames(self) -> None:
+        """
+        I write out everything held back, take down the footer, and stop
+        holding back what is written to me.
+        """
+        if self.frame_thread is not None:
+            self.frames_stopped.set()
+            self.frame_thread.join()
+            self.frame_thread = None
+        with self.frame_lock:
+            self.footer = None
+            self.render()
+            self.frame_interval = 0.0
+
+    def _renderFrames(self) -> None:
+        while not self.frames_stopped.wait(self.frame_interval):
+            # The footer changes over time even if nothing else is written
+            if self.frame_due or (
+                self.footer is not None
+                and time.monotonic() - self.frame_time >= FOOTER_SECONDS
+            ):
+                self.render()
+
+    def render(self) -> None:
+        """
+        I write out everything held back as one frame, and flush my stream.
+
+        The footer, if any, is written below the output, and the cursor put
+        back where the output left it, so that the next frame can erase the
+        footer and carry on from there.
+        """
+        with self.frame_lock:
+            self.frame_due = False
+            text = "".join(self.frame)
+            self.frame.clear()
+            if text:
+                self._moveColumn(text)
+            if self.footer_shown:
+                text = ERASE_BELOW + text
+                self.footer_shown = False
+            footer = self.footer() if self.footer is not None else ""
+            if footer:
+                text += "\n" + footer[: self.width - 1] + Cursor.UP(1) + "\r"
+                column = self.column % self.width
+                if column:
+                    text += Cursor.FORWARD(column)
+                self.footer_shown = True
+            if text:
+                self.stream.write(text)
+            self.frame_time = time.monotonic()
+            self.stream.flush()
+
+    def _moveColumn(self, text: str) -> None:
+        """
+        I work out which column of the terminal the cursor is left in once
+        text is written out.
+        """
+        _, newline, line = text.rpartition("\n")
+        _, carriage_return, line = line.rpartition("\r")
+        if newline or carriage_return:
+            self.column = 0
+        self.column += len(ANSI_ESCAPE.sub("", line))
 
     def flush(self) -> None:
-        self.stream.flush()
+        if self.frame_interval:
+            self.frame_due = True
+        else:
+            self.stream.flush()
 
     def writeln(self, text: str = "") -> None:
         self.write(text + "\n")
@@ -169,15 +286,10 @@ class GreenStream:
             # Windows doesn't actually want unicode, so we get
             # the closest ASCII equivalent
             text = text_type(unidecode(text))
-        # Since coverage doesn't like us switching out its stream to run extra
-        # reports to look for percent covered. We should replace this with
-        # grabbing the percentage directly from coverage if we can figure out
-        # how.
-        match = self.coverage_pattern.search(text)
-        if match:
-            percent_str = match.groupdict().get("percent")
-            if percent_str:
-                self.coverage_percent = int(percent_str)
+        if self.frame_interval:
+            with self.frame_lock:
+                self.frame.append(text)
+            return
         self.stream.write(text)
 
     def writelines(self, lines: Iterable[str]) -> None:
@@ -216,3 +328,94 @@ class GreenStream:
         Wrap internal self.stream.isatty.
         """
         return self.stream.isatty()
+
+
+class SpilledOutput:
+    """
+    I stand for captured output which went over the capture limit: I hold
+    the beginning of it, and the path of the temporary file that the rest of
+    it was spilled to, which only lasts as long as the run.  As a string, I am
+    the beginning and the end of the output, with a note of how much was left
+    out in between.
+    """
+
+    __slots__ = ("head", "path", "length", "tail_length")
+
+    def __init__(self, head: str, path: str, length: int, tail_length: int) -> None:
+        self.head = head
+        self.path = path
+        self.length = length
+        self.tail_length = tail_length
+
+    def __getstate__(self) -> tuple[str, str, int, int]:
+        return (self.head, self.path, self.length, self.tail_length)
+
+    def __setstate__(self, state: tuple[str, str, int, int]) -> None:
+        self.head, self.path, self.length, self.tail_length = state
+
+    def tail(self) -> str:
+        """
+        I read the end of the spilled output back from the temporary file.
+        """
+        try:
+            with open(self.path, "rb") as spill_file:
+                size = spill_file.seek(0, os.SEEK_END)
+                spill_file.seek(max(0, size - self.tail_length))
+                return spill_file.read().decode("utf-8", errors="ignore")
+        except OSError:
+            return ""
+
+    def __str__(self) -> str:
+        tail = self.tail()
+        omitted = self.length - len(self.head) - len(tail)
+        return (
+            f"{self.head}\n"
+            f"[... {omitted} characters not shown, see --capture-limit ...]\n"
+            f"{tail}"
+        )
+
+
+class CaptureBuffer(StringIO):
+    """
+    I am a StringIO for the output of a test, which only keeps up to limit
+    characters of it in memory.  Past that, I keep the first half of the
+    limit, and spill everything after it to a temporary file, so that a test
+    which outputs a lot does not use up the memory of the worker process and
+    the main process.  A limit of 0 means there is none.
+    """
+
+    def __init__(self, limit: int = 0) -> None:
+        super().__init__()
+        self.limit = limit
+        self.length = 0
+        self.head = ""
+        self.spill_path = ""
+        self.spill_file: TextIO | None = None
+
+    def write(self, text: str) -> int:
+        self.length += len(text)
+        if self.spill_file is not None:
+            return self.spill_file.write(text)
+        super().write(text)
+        if self.limit and self.length > self.limit:
+            value = super().getvalue()
+            self.head = value[: self.limit // 2]
+            fd, self.spill_path = tempfile.mkstemp(
+                prefix="green-output-", suffix=".txt"
+            )
+            self.spill_file = open(fd, "w", encoding="utf-8", errors="replace")
+            self.spill_file.write(value[self.limit // 2 :])
+            self.seek(0)
+            self.truncate()
+        return len(text)
+
+    def getvalue(self) -> str | SpilledOutput:  # type: ignore[override]
+        """
+        I return the output, or what is left of it if it went over the limit.
+        """
+        if self.spill_file is None:
+            return super().getvalue()
+        self.spill_file.close()
+        return SpilledOutput(
+            self.head, self.spill_path, self.length, self.limit - self.limit // 2
+        )
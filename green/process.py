@@ -4,6 +4,7 @@ Handle running unittests suites in parallel.
 
 from __future__ import annotations
 
+import copy
 import logging
 import multiprocessing
 import multiprocessing.pool
@@ -15,6 +16,8 @@ import os
 import random
 import sys
 import tempfile
+import threading
+import time
 import traceback
 from typing import (
     Type,
@@ -30,8 +33,10 @@ from typing import (
 
 import coverage
 
+from green.config import useSysmonCore
 from green.exceptions import InitializerOrFinalizerError
-from green.loader import GreenTestLoader
+from green.index import moduleEntry
+from green.loader import GreenTestLoader, isLoadFailure, toProtoTestList
 from green.result import proto_test, ProtoTest, ProtoTestResult
 
 if TYPE_CHECKING:
@@ -39,6 +44,7 @@ if TYPE_CHECKING:
     from queue import Queue
 
     from multiprocessing.context import SpawnContext, SpawnProcess
+    from multiprocessing.synchronize import Event
     from multiprocessing.pool import ApplyResult
     from multiprocessing.queues import SimpleQueue
 
@@ -51,6 +57,14 @@ if TYPE_CHECKING:
         Tuple[None, None, None],
     ]
     _T = TypeVar("_T")
+    # The omit patterns, config file and whether to use the sys.monitoring core
+    # that each pool worker measures coverage with.
+    CoverageOptions = Tuple[Union[str, Iterable[str], None], Union[bool, str], bool]
+
+# A BatchingTargetQueue sends its results once it holds this many, or once the
+# oldest of them has waited this many seconds.
+RESULT_BATCH_SIZE = 100
+RESULT_BATCH_SECONDS = 0.25
 
 
 # Super-useful debug function for finding problems in the subprocesses, and it
@@ -107,7 +121,7 @@ class LoggingDaemonlessPool(Pool):
 
     def apply_async(
         self,
-        func: Callable[[Any, Any], _T],  # should be the poolRunner method.
+        func: Callable[..., _T],  # poolBatchRunner() or poolDiscoverer()
         args: Iterable = (),
         kwargs: Mapping[str, Any] | None = None,
         callback: Callable[[_T], Any] | None = None,
@@ -129,9 +143,20 @@ class LoggingDaemonlessPool(Pool):
         # Green specific:
         finalizer: Callable | None = None,
         finalargs: Iterable[Any] = (),
+        coverage_options: CoverageOptions | None = None,
     ):
         self._finalizer = finalizer
         self._finalargs = finalargs
+        # What each worker measures coverage with for as long as it lives, or
+        # None to not measure coverage.
+        self._coverage_options = coverage_options
+        # Test results travel from the workers to the parent process over this
+        # pipe, which the workers inherit when they start, instead of being
+        # relayed through a multiprocessing manager process.
+        ctx = context or multiprocessing.get_context()
+        self.result_queue: SimpleQueue = ctx.SimpleQueue()
+        # Set to tell the workers not to start any more targets.
+        self.abort_event: Event = ctx.Event()
         super().__init__(processes, initializer, initargs, maxtasksperchild, context)
 
     def _repopulate_pool(self):
@@ -148,6 +173,9 @@ class LoggingDaemonlessPool(Pool):
             self._wrap_exception,
             self._finalizer,
             self._finalargs,
+            self.result_queue,
+            self.abort_event,
+            self._coverage_options,
         )
 
     @staticmethod
@@ -164,6 +192,9 @@ class LoggingDaemonlessPool(Pool):
         wrap_exception: bool,
         finalizer: InitializerOrFinalizer,
         finalargs: tuple,
+        result_queue: SimpleQueue,
+        abort_event: Event,
+        coverage_options: CoverageOptions | None = None,
     ) -> None:
         """
         Bring the number of pool processes up to the specified number,
@@ -182,6 +213,10 @@ class LoggingDaemonlessPool(Pool):
                     wrap_exception,
                     finalizer,
                     finalargs,
+                    result_queue,
+                    abort_event,
+                    time.time(),
+                    coverage_options,
                 ),
             )
             w.name = w.name.replace("Process", "PoolWorker")
@@ -190,6 +225,14 @@ class LoggingDaemonlessPool(Pool):
             util.debug("added worker")
 
 
+# The result queue and abort flag of the LoggingDaemonlessPool that the current
+# worker process belongs to.  Set by worker(), which also sends the number of
+# seconds it took to start up on the result queue, as the message of a None
+# target index.
+worker_result_queue: SimpleQueue | None = None
+worker_abort_event: Event | None = None
+
+
 def worker(
     inqueue: SimpleQueue,
     outqueue: SimpleQueue,
@@ -199,6 +242,10 @@ def worker(
     wrap_exception: bool = False,
     finalizer: Callable | None = None,
     finalargs: tuple = (),
+    result_queue: SimpleQueue | None = None,
+    abort_event: Event | None = None,
+    spawn_time: float | None = None,
+    coverage_options: CoverageOptions | None = None,
 ):  # pragma: no cover
     # TODO: revisit this assert; these statements are skipped by the python
     #  compiler in optimized mode.
@@ -213,12 +260,26 @@ def worker(
     if reader is not None:
         reader.close()
 
+    global worker_result_queue, worker_abort_event
+    worker_result_queue = result_queue
+    worker_abort_event = abort_event
+
     if initializer is not None:
         try:
             initializer(*initargs)
         except InitializerOrFinalizerError as e:
             print(str(e))
 
+    # Coverage is measured for the whole life of the worker, into a single data
+    # file, rather than for each task.
+    cov = None
+    if coverage_options is not None:
+        cov = startCoverage(os.getpid(), *coverage_options)
+
+    if result_queue is not None and spawn_time is not None:
+        # Let the runner know how long this process took to be ready for work
+        result_queue.put((None, time.time() - spawn_time))
+
     completed = 0
     while maxtasks is None or (maxtasks and completed < maxtasks):
         try:
@@ -248,6 +309,10 @@ def worker(
             put((job, i, (False, wrapped)))
         completed += 1
 
+    if cov is not None:
+        cov.stop()
+        cov.save()
+
     if finalizer:
         try:
             finalizer(*finalargs)
@@ -289,20 +354,225 @@ multiprocessing.pool.worker = worker  # type: ignore
 # -----------------------------------------------------------------------------
 
 
+class TargetQueue:
+    """
+    I wrap the result queue shared by all the targets of a run, tagging each
+    message a poolRunner sends with the index of its target so that the runner
+    can tell apart the results of targets running at the same time.
+
+    If no queue is given, I send to the result queue of the LoggingDaemonlessPool
+    whose worker process I end up in.  Such a queue can only be handed to a
+    process when it starts, not pickled along with each task.
+    """
+
+    def __init__(self, index: int, queue: Queue | SimpleQueue | None = None) -> None:
+        self.index = index
+        self.queue = queue
+
+    def put(self, msg: Any) -> None:
+        queue = self.queue or worker_result_queue
+        if queue is None:
+            raise ValueError("TargetQueue has no queue to put results on")
+        queue.put((self.index, msg))
+
+
+class BatchingTargetQueue(TargetQueue):
+    """
+    I am a TargetQueue for runs which do not report each test as it starts,
+    like in dots and quiet modes.  I drop the messages about tests starting,
+    and send the rest in batches (lists of messages), which saves most of the
+    cost of sending each one on its own.  An empty batch is sent right away
+    when the first test starts, so that the runner knows the target started.
+
+    A batch is sent once it is big or old enough (see RESULT_BATCH_SIZE and
+    RESULT_BATCH_SECONDS), as soon as a test did not succeed, so that failures
+    are reported (and --failfast stops the run) right away, and when the
+    target is done.  A timer sends the batch once it is old enough, even
+    while the next test is still running, so the lock guards the batch.
+    """
+
+    def __init__(self, index: int, queue: Queue | SimpleQueue | None = None) -> None:
+        super().__init__(index, queue)
+        self.batch: list[ProtoTestResult | None] = []
+        self.started = False
+        self.lock = threading.Lock()
+        self.timer: threading.Timer | None = None
+
+    def __getstate__(self) -> dict:
+        # Locks and threads stay in the process which made them
+        state = self.__dict__.copy()
+        del state["lock"], state["timer"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def put(self, msg: Any) -> None:
+        with self.lock:
+            if not self.started:
+                self.started = True
+                super().put([])
+            if msg is not None and not isinstance(msg, ProtoTestResult):
+                return
+            if msg is None:
+                self.batch.append(msg)
+                self.flush()
+                return
+            # The poolRunner reuses its ProtoTestResult for the next test
+            self.batch.append(copy.copy(msg))
+            if (
+                msg.errors
+                or msg.failures
+                or msg.unexpectedSuccesses
+                or len(self.batch) >= RESULT_BATCH_SIZE
+            ):
+                self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(
+                    RESULT_BATCH_SECONDS, self.flushAged, (self.batch,)
+                )
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flushAged(self, batch: list[ProtoTestResult | None]) -> None:
+        """
+        I send the given batch, unless it was sent in the meantime.
+        """
+        with self.lock:
+            if batch is self.batch:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        I send the batch of messages I hold, if any.  The lock must be held.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.batch:
+            batch, self.batch = self.batch, []
+            super().put(batch)
+
+
+def startCoverage(
+    coverage_number: int,
+    omit_patterns: str | Iterable[str] | None,
+    cov_config_file: bool | str,
+    sysmon_coverage: bool = False,
+) -> coverage.Coverage:  # pragma: no cover
+    """
+    I start measuring coverage into a data file of my own, which the main
+    process later combines with the others.
+
+    Pool workers call me once when they start, with their process ID as the
+    coverage_number, and save the data when they exit.
+    """
+    cov = coverage.coverage(
+        data_file=".coverage.{}_{}".format(coverage_number, random.randint(0, 10000)),
+        omit=omit_patterns,
+        config_file=cov_config_file,
+    )
+    cov._warn_no_data = False
+    if sysmon_coverage:
+        useSysmonCore(cov)
+    cov.start()
+    return cov
+
+
+def poolBatchRunner(
+    batch: list[tuple[str, TargetQueue, dict[str, int]]],
+    capture_limit: int = 0,
+) -> list[float | None]:  # pragma: no cover
+    """
+    I am the function that pool worker processes run for a batch of small
+    targets.  I run each target with poolRunner(), in order, each reporting on
+    its own queue and with the IDs of its tests.  Coverage is measured by the
+    worker process itself, for as long as it lives.
+
+    I return the list of what poolRunner() returned for each target.
+    """
+    return [
+        poolRunner(target, queue, test_ids=test_ids, capture_limit=capture_limit)
+        for target, queue, test_ids in batch
+    ]
+
+
+def poolDiscoverer(
+    targets: list[str],
+) -> list[tuple[str, list[str], str, tuple[str, dict] | None]]:
+    """
+    I am the function that pool worker processes run to discover the tests of
+    some targets before they are run, importing them in parallel instead of
+    in the main process.  The modules stay imported for when the worker runs
+    them.
+
+    I return, for each target, in order, a tuple of:
+        - the target
+        - the dotted names of its tests
+        - why it failed to load, or an empty string if it did not
+        - if it is a module, its discovery index entry (see moduleEntry())
+    """
+    loader = GreenTestLoader()
+    discovered: list[tuple[str, list[str], str, tuple[str, dict] | None]] = []
+    for target in targets:
+        try:
+            suite = loader.loadTargets(target)
+        except Exception:
+            discovered.append((target, [], traceback.format_exc(), None))
+            continue
+        if suite is None:
+            if target in sys.modules:
+                # A module without any tests in it
+                discovered.append((target, [], "", moduleEntry(target, [])))
+            else:
+                discovered.append((target, [], f"Unable to load '{target}'", None))
+            continue
+        if isLoadFailure(suite):
+            # The worker running it reports what happened
+            discovered.append((target, [], "Failed to import or skipped", None))
+            continue
+        tests = [x.dotted_name for x in toProtoTestList(suite, None, True)]
+        discovered.append((target, tests, "", moduleEntry(target, tests)))
+    return discovered
+
+
 def poolRunner(
     target: str,
-    queue: Queue,
+    queue: Queue | TargetQueue,
     coverage_number: int | None = None,
     omit_patterns: str | Iterable[str] | None = None,
     cov_config_file: bool = True,
-) -> None:  # pragma: no cover
+    test_ids: dict[str, int] | None = None,
+    capture_limit: int = 0,
+) -> float | None:  # pragma: no cover
     """
     I am the function that pool worker processes run.  I run one unit test.
 
+    If coverage_number is given, I measure coverage of the target on my own,
+    which is for running me outside of a pool, since pool workers measure it
+    for their whole life instead (see LoggingDaemonlessPool).
+
     coverage_config_file is a special option that is either a string specifying
     the custom coverage config file or the special default value True (which
     causes coverage to search for it's standard config files).
+
+    test_ids maps the dotted names of the tests in the target to the IDs the
+    runner gave them, which are sent back along with their results.
+
+    capture_limit is how many characters of the output of each test are kept
+    in memory, the rest is spilled to a temporary file (see CaptureBuffer).
+
+    I return the wall-clock time in seconds it took to load and run the target,
+    which the runner records to schedule the slowest targets first next time.
+    If the run was aborted before I got to the target, I skip it and return
+    None.
     """
+    if worker_abort_event is not None and worker_abort_event.is_set():
+        queue.put(None)
+        return None
+    start_time = time.time()
     # Each pool worker gets his own temp directory, to avoid having tests that
     # are used to taking turns using the same temp file name from interfering
     # with eachother.  So long as the test doesn't use a hard-coded temp
@@ -334,15 +604,7 @@ def poolRunner(
 
     # Each pool starts its own coverage, later combined by the main process.
     if coverage_number:
-        cov = coverage.coverage(
-            data_file=".coverage.{}_{}".format(
-                coverage_number, random.randint(0, 10000)
-            ),
-            omit=omit_patterns,
-            config_file=cov_config_file,
-        )
-        cov._warn_no_data = False
-        cov.start()
+        cov = startCoverage(coverage_number, omit_patterns, cov_config_file)
 
     # What to do each time an individual test is started
     already_sent = set()
@@ -358,14 +620,16 @@ def poolRunner(
         # Let the main process know what happened with the test run
         queue.put(test_result)
 
-    result = ProtoTestResult(start_callback, finalize_callback)
+    result = ProtoTestResult(
+        start_callback, finalize_callback, test_ids, capture_limit=capture_limit
+    )
     test: GreenTestSuite | None
     try:
         loader = GreenTestLoader()
         test = loader.loadTargets(target)
     except:
         raise_internal_failure("Green encountered an error loading the unit test.")
-        return
+        return time.time() - start_time
 
     if test is not None and getattr(test, "run", False):
         # Loading was successful, lets do this
@@ -400,7 +664,11 @@ def poolRunner(
                     raise_internal_failure(
                         "Green encountered an error when running the test."
                     )
-                    return
+                    return time.time() - start_time
+    elif test is None and target in sys.modules:
+        # The target is a module without any tests in it, which lazy discovery
+        # hands out since it does not import modules to look inside them.
+        pass
     else:
         # loadTargets() returned an object without a run() method, probably
         # None
@@ -429,3 +697,4 @@ def poolRunner(
         queue.put(result)
 
     cleanup()
+    return time.time() - start_time
@@ -4,15 +4,18 @@ from __future__ import annotations
 
 import argparse
 from doctest import DocTest, DocTestCase
+from io import StringIO
 from math import ceil
+from operator import attrgetter
+import os
 from shutil import get_terminal_size
 import time
 import traceback
-from typing import Any, Callable, Sequence, TYPE_CHECKING, Union
+from typing import Any, Callable, Iterator, TYPE_CHECKING, Union
 from unittest.result import failfast
 from unittest import TestCase, TestSuite
 
-from green.output import Colors, debug, GreenStream
+from green.output import Colors, debug, GreenStream, SpilledOutput
 from green.version import pretty_version
 
 if TYPE_CHECKING:
@@ -20,9 +23,21 @@ if TYPE_CHECKING:
 
     TestCaseT = Union["ProtoTest", TestCase, DocTestCase]
     RunnableTestT = Union[TestCaseT, TestSuite]
+    # (message, ((filename, lineno, name), ...), exception_lines)
+    ChainLinkT = tuple[
+        str, tuple[tuple[str, Union[int, None], str], ...], tuple[str, ...]
+    ]
 
 terminal_width, _ignored = get_terminal_size()
 
+# What traceback.format_exception() puts between chained exceptions.
+CAUSE_MESSAGE = (
+    "\nThe above exception was the direct cause of the following exception:\n\n"
+)
+CONTEXT_MESSAGE = (
+    "\nDuring handling of the above exception, another exception occurred:\n\n"
+)
+
 
 def proto_test(test: RunnableTestT) -> ProtoTest:
     """
@@ -50,23 +65,51 @@ class ProtoTest:
     and can pass between processes.
     """
 
-    module: str = ""
-    class_name: str = ""
-    method_name: str = ""
-    docstr_part: str = ""
-    subtest_part: str = ""
-    test_time: str = "0.0"
-    failureException = AssertionError
-    description: str = ""
+    # Lots of these are sent between processes, so they are kept lean.  The
+    # attributes which are rarely set come last, see __getstate__().  They
+    # must all be listed in the same order in __setstate__().  The dotted name
+    # is built once it is needed, and not sent along.
+    __slots__ = (
+        "test_id",
+        "module",
+        "class_name",
+        "method_name",
+        "docstr_part",
+        "subtest_part",
+        "test_time",
+        "description",
+        "is_class_or_module_teardown_error",
+        # Doctests specific attributes:
+        "is_doctest",
+        "filename",
+        "lineno",
+        "name",
+        "_dotted_name",
+    )
+    _getState = attrgetter(*__slots__[:-1])
+    _defaults = (None, "", "", "", "", "", "0.0", "")
+    _rare_defaults = (False, False, None, None, "")
+
+    # Assigned by the runner, see BaseTestResult.protoTest()
+    test_id: int | None
+    module: str
+    class_name: str
+    method_name: str
+    docstr_part: str
+    subtest_part: str
+    test_time: str
+    description: str
+    is_class_or_module_teardown_error: bool
+    is_doctest: bool
+    filename: str | None
+    lineno: int | None
+    name: str
+    _dotted_name: str | None
 
-    # Doctests specific attributes:
-    is_doctest: bool = False
-    filename: str | None = None
-    name: str = ""
+    failureException = AssertionError
 
     def __init__(self, test: TestCase | DocTestCase | TestSuite | None = None) -> None:
-        # Teardown handling is a royal mess
-        self.is_class_or_module_teardown_error: bool = False
+        self.__setstate__(self._defaults)
 
         # Is this a subtest? The _SubTest class is private so we need to check the attributes.
         sub_description = getattr(test, "_subDescription", None)
@@ -111,10 +154,48 @@ class ProtoTest:
                     doc_segments.append(line)
             self.docstr_part = " ".join(doc_segments)
 
+    def __getstate__(self) -> tuple:
+        """
+        I am pickled as a tuple of my attributes, leaving out the rarely set
+        ones while they still have their default values.
+        """
+        state = self._getState(self)
+        if state[8:] == self._rare_defaults:
+            return state[:8]
+        return state
+
+    def __setstate__(self, state: tuple) -> None:
+        if len(state) == 8:
+            state += self._rare_defaults
+        (
+            self.test_id,
+            self.module,
+            self.class_name,
+            self.method_name,
+            self.docstr_part,
+            self.subtest_part,
+            self.test_time,
+            self.description,
+            self.is_class_or_module_teardown_error,
+            self.is_doctest,
+            self.filename,
+            self.lineno,
+            self.name,
+        ) = state
+        self._dotted_name = None
+
     def __eq__(self, other: Any) -> bool:
-        return self.__hash__() == other.__hash__()
+        if not isinstance(other, ProtoTest):
+            return self.__hash__() == other.__hash__()
+        if self.test_id is not None and other.test_id is not None:
+            return self.test_id == other.test_id
+        return self.dotted_name == other.dotted_name
 
     def __hash__(self) -> int:
+        # Not the ID, which the main process gives to the tests that arrive
+        # without one, even while they are keys of the captured output.  The
+        # IDs and dotted names of the tests go one to one.  The hash of the
+        # cached dotted name is cached by the string itself.
         return hash(self.dotted_name)
 
     def __str__(self) -> str:
@@ -122,9 +203,19 @@ class ProtoTest:
 
     @property
     def dotted_name(self, ignored: Any = None) -> str:
-        if self.is_doctest or self.is_class_or_module_teardown_error:
-            return self.name
-        return f"{self.module}.{self.class_name}.{self.method_name}{self.subtest_part}"
+        # Built on first use, so the attributes it is made of must be set by
+        # then, as they are by __init__() and __setstate__().
+        dotted_name = self._dotted_name
+        if dotted_name is None:
+            if self.is_doctest or self.is_class_or_module_teardown_error:
+                dotted_name = self.name
+            else:
+                dotted_name = (
+                    f"{self.module}.{self.class_name}."
+                    f"{self.method_name}{self.subtest_part}"
+                )
+            self._dotted_name = dotted_name
+        return dotted_name
 
     def getDescription(self, verbose: int) -> str:
         # Classes or module teardown errors
@@ -153,10 +244,68 @@ class ProtoError:
     """
     I take a full-fledged test error and preserve just the information we need
     and can pass between processes.
+
+    Rather than the formatted traceback, I hold the file, line number and
+    function of each frame along with the exception itself, which is quick to
+    capture and small to send.  The source lines are only looked up when the
+    traceback_lines are needed, in the main process.  The chain is also what
+    tells identical tracebacks apart, so that printErrors() can group them.
     """
 
+    __slots__ = ("chain", "_traceback_lines")
+
     def __init__(self, err: ExcInfoType) -> None:
-        self.traceback_lines = traceback.format_exception(*err)
+        # Each link is (message, frames, exception_lines), where the message
+        # follows the link when the traceback is rendered, oldest link first.
+        links: list[ChainLinkT] = []
+        message = ""
+        tb_exc: traceback.TracebackException | None
+        tb_exc = traceback.TracebackException(*err, lookup_lines=False)
+        while tb_exc is not None:
+            if getattr(tb_exc, "exceptions", None):
+                # Exception groups (python 3.11+) are rendered right away
+                links.append((message, (), tuple(tb_exc.format(chain=False))))
+            else:
+                frames = tuple((x.filename, x.lineno, x.name) for x in tb_exc.stack)
+                exception_lines = tuple(tb_exc.format_exception_only())
+                links.append((message, frames, exception_lines))
+            if tb_exc.__cause__ is not None:
+                tb_exc, message = tb_exc.__cause__, CAUSE_MESSAGE
+            elif tb_exc.__context__ is not None and not tb_exc.__suppress_context__:
+                tb_exc, message = tb_exc.__context__, CONTEXT_MESSAGE
+            else:
+                tb_exc = None
+        links.reverse()
+        self.chain: tuple[ChainLinkT, ...] = tuple(links)
+        self._traceback_lines: list[str] | None = None
+
+    def __getstate__(self) -> tuple[tuple[ChainLinkT, ...]]:
+        return (self.chain,)
+
+    def __setstate__(self, state: tuple[tuple[ChainLinkT, ...]]) -> None:
+        (self.chain,) = state
+        self._traceback_lines = None
+
+    @property
+    def traceback_lines(self) -> list[str]:
+        """
+        The traceback, formatted like traceback.format_exception() does.
+        """
+        if self._traceback_lines is None:
+            lines = []
+            for message, frames, exception_lines in self.chain:
+                if frames:
+                    lines.append("Traceback (most recent call last):\n")
+                    lines.extend(
+                        traceback.StackSummary.from_list(
+                            [(*frame, None) for frame in frames]  # type: ignore
+                        ).format()
+                    )
+                lines.extend(exception_lines)
+                if message:
+                    lines.append(message)
+            self._traceback_lines = lines
+        return self._traceback_lines
 
     def __str__(self) -> str:
         return "\n".join(self.traceback_lines)
@@ -174,6 +323,22 @@ class BaseTestResult:
         self.colors: Colors = colors or Colors()
         # The collectedDurations list is new in Python 3.12.
         self.collectedDurations: list[tuple[str, float]] = []
+        # The IDs of the tests, by dotted name.
+        self.test_ids: dict[str, int] = {}
+
+    def protoTest(self, test: RunnableTestT) -> ProtoTest:
+        """
+        I return the ProtoTest of the test, with its ID from test_ids, if
+        there is one.
+
+        The runner numbers the tests it discovers, and hands their IDs to the
+        worker processes, so that the tests can be told apart without
+        building and hashing their dotted names all the time.
+        """
+        test = proto_test(test)
+        if test.test_id is None and self.test_ids:
+            test.test_id = self.test_ids.get(test.dotted_name)
+        return test
 
     def recordStdout(self, test: RunnableTestT, output):
         """
@@ -181,7 +346,7 @@ class BaseTestResult:
         the captured output somewhere.
         """
         if output:
-            test = proto_test(test)
+            test = self.protoTest(test)
             self.stdout_output[test] = output
 
     def recordStderr(self, test: RunnableTestT, errput):
@@ -190,7 +355,7 @@ class BaseTestResult:
         the captured "errput" somewhere.
         """
         if errput:
-            test = proto_test(test)
+            test = self.protoTest(test)
             self.stderr_errput[test] = errput
 
     def displayStdout(self, test: TestCaseT):
@@ -199,8 +364,8 @@ class BaseTestResult:
         removal is done so that this method can be called multiple times
         without duplicating results output.
         """
-        test = proto_test(test)
-        if test.dotted_name in self.stdout_output:
+        test = self.protoTest(test)
+        if test in self.stdout_output:
             if self.stream is None:
                 raise ValueError("stream is None")
             colors = self.colors
@@ -217,8 +382,8 @@ class BaseTestResult:
         removal is done so that this method can be called multiple times
         without duplicating results errput.
         """
-        test = proto_test(test)
-        if test.dotted_name in self.stderr_errput:
+        test = self.protoTest(test)
+        if test in self.stderr_errput:
             if self.stream is None:
                 raise ValueError("stream is None")
             colors = self.colors
@@ -248,6 +413,17 @@ class ProtoTestResult(BaseTestResult):
     I'm the TestResult object for a single unit test run in a process.
     """
 
+    # The lists of tests with each kind of outcome, as numbered when pickled.
+    # The first ones pair each test with an error or skip reason.
+    OUTCOMES = (
+        "errors",
+        "expectedFailures",
+        "failures",
+        "skipped",
+        "passing",
+        "unexpectedSuccesses",
+    )
+
     failfast: bool = False  # Because unittest inspects the attribute
     finalize_callback_called: bool = False
     shouldStop: bool = False
@@ -258,10 +434,16 @@ class ProtoTestResult(BaseTestResult):
         self,
         start_callback: Callable[[RunnableTestT], None] | None = None,
         finalize_callback: Callable[[ProtoTestResult], None] | None = None,
+        test_ids: dict[str, int] | None = None,
+        capture_limit: int = 0,
     ) -> None:
         super().__init__(None, colors=None)
         self.start_callback = start_callback
         self.finalize_callback = finalize_callback
+        if test_ids:
+            self.test_ids = test_ids
+        # How much of the output of each test the suite keeps in memory
+        self.capture_limit = capture_limit
         self.collectedDurations: list[tuple[str, float]] = []
         self.errors: list[tuple[ProtoTest, ProtoError]] = []
         self.expectedFailures: list[tuple[ProtoTest, ProtoError]] = []
@@ -269,19 +451,6 @@ class ProtoTestResult(BaseTestResult):
         self.passing: list[ProtoTest] = []
         self.skipped: list[tuple[ProtoTest, str]] = []
         self.unexpectedSuccesses: list[ProtoTest] = []
-        self.pickle_attrs: Sequence[str] = (
-            "errors",
-            "expectedFailures",
-            "failures",
-            "passing",
-            "pickle_attrs",  # TODO: check if pickle_attrs should be pickled.
-            "shouldStop",
-            "skipped",
-            "stderr_errput",
-            "stdout_output",
-            "test_time",
-            "unexpectedSuccesses",
-        )
         self.reinitialize()
 
     def reinitialize(self):
@@ -307,28 +476,81 @@ class ProtoTestResult(BaseTestResult):
             f" test_time{self.test_time}"
         )
 
-    def __getstate__(self) -> dict[str, Any]:
+    def __getstate__(self) -> tuple:
         """
-        Prevent the callback functions from getting pickled.
+        I am pickled as one compact record per test outcome, leaving out the
+        callback functions.  A record is the index of the outcome in OUTCOMES
+        and the test, followed by the error or skip reason if the outcome has
+        one.  Captured output refers to the record of its test by index.
         """
-        result_dict = {}
-        for pickle_attr in self.pickle_attrs:
-            result_dict[pickle_attr] = self.__dict__[pickle_attr]
-        return result_dict
+        # Usually only one of the lists holds anything
+        records: list[tuple] = []
+        if self.errors:
+            records.extend((0, test, err) for test, err in self.errors)
+        if self.expectedFailures:
+            records.extend((1, test, err) for test, err in self.expectedFailures)
+        if self.failures:
+            records.extend((2, test, err) for test, err in self.failures)
+        if self.skipped:
+            records.extend((3, test, reason) for test, reason in self.skipped)
+        if self.passing:
+            records.extend((4, test) for test in self.passing)
+        if self.unexpectedSuccesses:
+            records.extend((5, test) for test in self.unexpectedSuccesses)
+        outputs: list[tuple] = []
+        if self.stdout_output or self.stderr_errput:
+            remaining = self.stdout_output.keys() | self.stderr_errput.keys()
+            for index, record in enumerate(records):
+                if record[1] in remaining:
+                    remaining.discard(record[1])
+                    outputs.append(
+                        (
+                            index,
+                            self.stdout_output.get(record[1]),
+                            self.stderr_errput.get(record[1]),
+                        )
+                    )
+            outputs.extend(
+                (test, self.stdout_output.get(test), self.stderr_errput.get(test))
+                for test in remaining
+            )
+        return self.test_time, self.shouldStop, records, outputs
 
-    def __setstate__(self, state: dict[str, Any]) -> None:
+    def __setstate__(self, state: tuple) -> None:
         """
-        Since the callback functions weren't pickled, we need to initialize them.
+        I rebuild the outcome lists and captured output out of the records.
+        Since the callback functions weren't pickled, they are left unset.
         """
-        self.__dict__.update(state)
+        self.test_time, self.shouldStop, records, outputs = state
         self.start_callback = None
         self.finalize_callback = None
+        self.test_ids = {}
+        self.errors = []
+        self.expectedFailures = []
+        self.failures = []
+        self.skipped = []
+        self.passing = []
+        self.unexpectedSuccesses = []
+        self.stdout_output = {}
+        self.stderr_errput = {}
+        lists = [getattr(self, name) for name in self.OUTCOMES]
+        for record in records:
+            if record[0] < 4:
+                lists[record[0]].append(record[1:])
+            else:
+                lists[record[0]].append(record[1])
+        for key, stdout, stderr in outputs:
+            test = records[key][1] if isinstance(key, int) else key
+            if stdout is not None:
+                self.stdout_output[test] = stdout
+            if stderr is not None:
+                self.stderr_errput[test] = stderr
 
     def startTest(self, test: RunnableTestT) -> None:
         """
         Called before each test runs.
         """
-        test = proto_test(test)
+        test = self.protoTest(test)
         self.reinitialize()
         self.start_time = time.time()
         if self.start_callback:
@@ -358,37 +580,37 @@ class ProtoTestResult(BaseTestResult):
         """
         Called when a test passed.
         """
-        self.passing.append(proto_test(test))
+        self.passing.append(self.protoTest(test))
 
     def addError(self, test: RunnableTestT, err: ProtoError | ExcInfoType) -> None:
         """
         Called when a test raises an exception.
         """
-        self.errors.append((proto_test(test), proto_error(err)))
+        self.errors.append((self.protoTest(test), proto_error(err)))
 
     def addFailure(self, test: TestCaseT, err: ExcInfoType) -> None:
         """
         Called when a test fails a unittest assertion.
         """
-        self.failures.append((proto_test(test), proto_error(err)))
+        self.failures.append((self.protoTest(test), proto_error(err)))
 
     def addSkip(self, test: TestCaseT, reason: str) -> None:
         """
         Called when a test is skipped.
         """
-        self.skipped.append((proto_test(test), reason))
+        self.skipped.append((self.protoTest(test), reason))
 
     def addExpectedFailure(self, test: TestCaseT, err: ExcInfoType) -> None:
         """
         Called when a test fails, and we expected the failure.
         """
-        self.expectedFailures.append((proto_test(test), proto_error(err)))
+        self.expectedFailures.append((self.protoTest(test), proto_error(err)))
 
     def addUnexpectedSuccess(self, test: TestCaseT) -> None:
         """
         Called when a test passed, but we expected a failure
         """
-        self.unexpectedSuccesses.append(proto_test(test))
+        self.unexpectedSuccesses.append(self.protoTest(test))
 
     # The _SubTest class is private and masked so we cannot easily type annotate.
     def addSubTest(
@@ -408,6 +630,126 @@ class ProtoTestResult(BaseTestResult):
                 self.addError(subtest, err)
 
 
+class Tally:
+    """
+    I stand in for one of the lists of outcomes of a GreenTestResult when it
+    streams results: I count what is appended to me, and let go of it.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def append(self, item: Any) -> None:
+        self.count += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator:
+        return iter(())
+
+
+class ResultReporter:
+    """
+    I am told about each test result as soon as the GreenTestResult gets it,
+    so that I can report on the run without the result keeping every test
+    around until the end, like with --stream-results.  I am also told when
+    each target is done, so that I can wrap up the tests in it.
+
+    The outcome is the name of the list the result would go in (see
+    ProtoTestResult.OUTCOMES), and the detail is the ProtoError or the reason
+    for skipping, if any.
+    """
+
+    def startTestRun(self, result: GreenTestResult) -> None:
+        """
+        Called once before any tests run.
+        """
+
+    def addResult(
+        self,
+        outcome: str,
+        test: ProtoTest,
+        detail: ProtoError | str | None,
+        stdout: str | SpilledOutput | None,
+        stderr: str | SpilledOutput | None,
+    ) -> None:
+        """
+        Called with each test result.
+        """
+
+    def stopTarget(self, target: str) -> None:
+        """
+        Called once all of the tests of a target have run.
+        """
+
+    def stopTestRun(self, result: GreenTestResult) -> None:
+        """
+        Called once after all tests have run.
+        """
+
+
+class RunProgress:
+    """
+    I keep track of how far along a run is, for the status line shown below
+    the output on a terminal (see GreenTestResult.statusLine()).
+
+    The total is the number of tests discovered, if it is known up front.
+    The estimates are how many seconds each target is expected to take, going
+    by how long they took before (see runner.estimateTargetDurations()), and
+    are left empty if no target was timed yet.
+    """
+
+    def __init__(
+        self, total: int | None, estimates: dict[str, float], processes: int
+    ) -> None:
+        self.total = total
+        self.estimates = estimates
+        self.processes = max(processes, 1)
+        self.start_time = time.monotonic()
+        # The estimated seconds left for the targets that have not finished
+        self.remaining = sum(estimates.values())
+        # When each target that is running was first heard from
+        self.running: dict[str, float] = {}
+
+    def startTarget(self, target: str) -> None:
+        """
+        Called with each message from a target, so once it has started.
+        """
+        if target not in self.running:
+            self.running[target] = time.monotonic()
+
+    def stopTarget(self, target: str) -> None:
+        """
+        Called once a target has finished.
+        """
+        self.running.pop(target, None)
+        self.remaining -= self.estimates.get(target, 0.0)
+
+    def secondsLeft(self, completed: int) -> float | None:
+        """
+        I estimate how many seconds are left in the run, given how many tests
+        are done, or return None if there is nothing to go by.
+
+        The estimated time left of every target is shared out between the
+        processes, less the time the running targets have already taken.
+        Without estimates, or once they have all run out while tests are still
+        running, the tests left are assumed to run as fast as the ones done so
+        far.
+        """
+        now = time.monotonic()
+        if self.estimates:
+            remaining = self.remaining - sum(
+                min(now - started, self.estimates.get(target, 0.0))
+                for target, started in list(self.running.items())
+            )
+            if remaining > 0:
+                return remaining / self.processes
+        if self.total and 0 < completed < self.total:
+            return (self.total - completed) * (now - self.start_time) / completed
+        return None
+
+
 class GreenTestResult(BaseTestResult):
     """
     Aggregates test results and outputs them to a stream.
@@ -440,7 +782,55 @@ class GreenTestResult(BaseTestResult):
             tuple[ProtoTest, Callable[[str], str], str, ProtoError]
         ] = []
         # For exiting non-zero if we don't reach a certain level of coverage
-        self.coverage_percent: int | None = None
+        self.coverage_percent: float | None = None
+        # Told about each result as it arrives
+        self.reporters: list[ResultReporter] = []
+        # The temporary files of the output over the capture limit
+        self.spill_paths: list[str] = []
+        # How far along the run is, once the runner knows
+        self.progress: RunProgress | None = None
+        # Only keep what printErrors() needs, and count the rest
+        self.streaming: bool = args.stream_results
+        # The ID the next test numbered while streaming gets, see protoTest()
+        self.next_test_id: int = 0
+        if self.streaming:
+            self.expectedFailures = Tally()  # type: ignore[assignment]
+            self.passing = Tally()  # type: ignore[assignment]
+            self.skipped = Tally()  # type: ignore[assignment]
+
+    def protoTest(self, test: RunnableTestT) -> ProtoTest:
+        """
+        I return the ProtoTest of the test, with its ID from test_ids.  Tests
+        which were not discovered up front, like subtests, or every test with
+        lazy discovery, get a new ID.
+        """
+        test = proto_test(test)
+        if test.test_id is None:
+            if self.streaming:
+                test.test_id = self.next_test_id
+                self.next_test_id += 1
+            else:
+                test.test_id = self.test_ids.setdefault(
+                    test.dotted_name, len(self.test_ids)
+                )
+        return test
+
+    def numberTests(self, dotted_names: list[str]) -> dict[str, int]:
+        """
+        I return the IDs of the given tests, for the worker which runs them.
+
+        When the results are streamed, the IDs are not kept in test_ids, which
+        would grow with the run.  A streamed result only needs telling apart
+        from the results which arrive along with it, so each test numbered
+        gets a new ID.
+        """
+        if self.streaming:
+            start = self.next_test_id
+            self.next_test_id += len(dotted_names)
+            return dict(zip(dotted_names, range(start, self.next_test_id)))
+        return {
+            x: self.test_ids.setdefault(x, len(self.test_ids)) for x in dotted_names
+        }
 
     def __str__(self) -> str:  # pragma: no cover
         return (
@@ -462,6 +852,8 @@ class GreenTestResult(BaseTestResult):
         proto_test_result: ProtoTestResult,
         err: ProtoError | None = None,
     ) -> None:
+        if not (proto_test_result.stdout_output or proto_test_result.stderr_errput):
+            return
         if proto_test_result.stdout_output.get(test, False):
             self.recordStdout(test, proto_test_result.stdout_output[test])
         if proto_test_result.stderr_errput.get(test, False):
@@ -480,34 +872,102 @@ class GreenTestResult(BaseTestResult):
                     break
 
     def addProtoTestResult(self, proto_test_result: ProtoTestResult) -> None:
+        if proto_test_result.stdout_output or proto_test_result.stderr_errput:
+            for output in (
+                *proto_test_result.stdout_output.values(),
+                *proto_test_result.stderr_errput.values(),
+            ):
+                if isinstance(output, SpilledOutput):
+                    self.spill_paths.append(output.path)
         for test, err in proto_test_result.errors:
-            self.addError(test, err, proto_test_result.test_time)
             self.tryRecordingStdoutStderr(test, proto_test_result, err)
+            self.addError(test, err, proto_test_result.test_time)
         for test, err in proto_test_result.expectedFailures:
-            self.addExpectedFailure(test, err, proto_test_result.test_time)
             self.tryRecordingStdoutStderr(test, proto_test_result, err)
+            self.addExpectedFailure(test, err, proto_test_result.test_time)
         for test, err in proto_test_result.failures:
-            self.addFailure(test, err, proto_test_result.test_time)
             self.tryRecordingStdoutStderr(test, proto_test_result, err)
+            self.addFailure(test, err, proto_test_result.test_time)
         for test in proto_test_result.passing:
-            self.addSuccess(test, proto_test_result.test_time)
             self.tryRecordingStdoutStderr(test, proto_test_result)
+            self.addSuccess(test, proto_test_result.test_time)
         for test, reason in proto_test_result.skipped:
-            self.addSkip(test, reason, proto_test_result.test_time)
             self.tryRecordingStdoutStderr(test, proto_test_result)
+            self.addSkip(test, reason, proto_test_result.test_time)
         for test in proto_test_result.unexpectedSuccesses:
-            self.addUnexpectedSuccess(test, proto_test_result.test_time)
             self.tryRecordingStdoutStderr(test, proto_test_result)
+            self.addUnexpectedSuccess(test, proto_test_result.test_time)
 
     def startTestRun(self) -> None:
         """
         Called once before any tests run.
         """
         self.startTime = time.time()
+        # Coalesce the progress output of each test into frames
+        self.stream.startFrames()
+        for reporter in self.reporters:
+            reporter.startTestRun(self)
         # Really verbose information
         if self.verbose > 2:
             self.stream.writeln(self.colors.bold(f"{pretty_version()}\n"))
 
+    def startProgress(self, progress: RunProgress) -> None:
+        """
+        Called once the runner knows what tests there are to run, to show
+        how far along the run is below the output on a terminal.
+        """
+        self.progress = progress
+        self.stream.footer = self.statusLine
+
+    def statusLine(self) -> str:
+        """
+        I return the line that says how far along the run is: how many tests
+        are done, how fast they go, how many processes are busy and how long
+        the rest should take.
+        """
+        progress = self.progress
+        if progress is None:
+            return ""
+        completed = self.testsRun
+        elapsed = time.monotonic() - progress.start_time
+        rate = completed / elapsed if elapsed else 0.0
+        busy = min(len(progress.running), progress.processes)
+        if progress.total:
+            parts = [f"{completed}/{progress.total} tests"]
+        else:
+            parts = [f"{completed} tests"]
+        parts.append(f"{rate:.0f}/s")
+        parts.append(f"{busy}/{progress.processes} processes busy")
+        seconds_left = progress.secondsLeft(completed)
+        if seconds_left is not None:
+            # The run is not over yet, so it never has no time left
+            minutes, seconds = divmod(max(int(seconds_left + 0.5), 1), 60)
+            hours, minutes = divmod(minutes, 60)
+            if hours:
+                parts.append(f"ETA {hours}:{minutes:02}:{seconds:02}")
+            else:
+                parts.append(f"ETA {minutes}:{seconds:02}")
+        return "  ".join(parts)
+
+    def stopTarget(self, target: str) -> None:
+        """
+        Called once all of the tests of a target have run.
+        """
+        for reporter in self.reporters:
+            reporter.stopTarget(target)
+
+    def removeSpilledOutput(self) -> None:
+        """
+        I delete the temporary files of the output which went over the
+        capture limit, once nothing is left to show it.
+        """
+        for path in self.spill_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.spill_paths = []
+
     def stopTestRun(self) -> None:
         """
         Called once after all tests have run.
@@ -515,8 +975,13 @@ class GreenTestResult(BaseTestResult):
         # FIXME: stopTime and timeTaken are defined outside __init__.
         self.stopTime = time.time()
         self.timeTaken = self.stopTime - self.startTime
+        self.stream.stopFrames()
+        for reporter in self.reporters:
+            reporter.stopTestRun(self)
         self.printErrors()
+        self.removeSpilledOutput()
         if self.args.run_coverage or self.args.quiet_coverage:
+            from coverage import version_info as coverage_version_info
             from coverage.misc import CoverageException
 
             try:
@@ -526,14 +991,24 @@ class GreenTestResult(BaseTestResult):
                 self.args.cov.combine()
                 self.args.cov.save()
                 if not self.args.quiet_coverage:
-                    self.stream.coverage_percent = None
-                    self.args.cov.report(
+                    self.coverage_percent = self.args.cov.report(
                         file=self.stream,
                         omit=self.args.omit_patterns,
                         show_missing=True,
                         ignore_errors=True,
                     )
-                    self.coverage_percent = self.stream.coverage_percent
+                elif self.args.minimum_coverage is not None:
+                    # Only the total percentage is needed, so skip rendering
+                    # a line for every file, where coverage (7.0+) can.
+                    report_options = {}
+                    if coverage_version_info >= (7, 0):
+                        report_options["output_format"] = "total"
+                    self.coverage_percent = self.args.cov.report(
+                        file=StringIO(),
+                        omit=self.args.omit_patterns,
+                        ignore_errors=True,
+                        **report_options,
+                    )
 
             except CoverageException as ce:
                 if (len(ce.args) == 1) and ("No data to report" not in ce.args[0]):
@@ -587,7 +1062,7 @@ class GreenTestResult(BaseTestResult):
         Called before the start of each test.
         """
         # Get our bearings
-        test = proto_test(test)
+        test = self.protoTest(test)
         current_module = test.module
         current_class = test.class_name
 
@@ -633,7 +1108,7 @@ class GreenTestResult(BaseTestResult):
         reason: str = "",
     ) -> None:
         self.testsRun += 1
-        test = proto_test(test)
+        test = self.protoTest(test)
         if self.showAll:
             if self.stream.isatty():
                 self.stream.write(self.colors.start_of_line())
@@ -663,10 +1138,11 @@ class GreenTestResult(BaseTestResult):
         """
         Called when a test passed.
         """
-        test = proto_test(test)
+        test = self.protoTest(test)
         if test_time:
             test.test_time = str(test_time)
         self.passing.append(test)
+        self._streamResult("passing", test)
         self._reportOutcome(test, ".", self.colors.passing)
 
     @failfast
@@ -676,12 +1152,13 @@ class GreenTestResult(BaseTestResult):
         """
         Called when a test raises an exception.
         """
-        test = proto_test(test)
+        test = self.protoTest(test)
         if test_time:
             test.test_time = str(test_time)
         error = proto_error(err)
         self.errors.append((test, error))
         self.all_errors.append((test, self.colors.error, "Error", error))
+        self._streamResult("errors", test, error)
         self._reportOutcome(test, "E", self.colors.error, error)
 
     @failfast
@@ -693,17 +1170,19 @@ class GreenTestResult(BaseTestResult):
         """
         # Special case: Catch Twisted's skips that come thtrough as failures
         # and treat them as skips instead
-        if len(err.traceback_lines) == 1:
-            if err.traceback_lines[0].startswith("UnsupportedTrialFeature"):
-                reason = eval(err.traceback_lines[0][25:])[1]
+        if len(err.chain) == 1:
+            _, frames, exception_lines = err.chain[0]
+            if not frames and exception_lines[0].startswith("UnsupportedTrialFeature"):
+                reason = eval(exception_lines[0][25:])[1]
                 self.addSkip(test, reason)
                 return
 
-        test_proto = proto_test(test)
+        test_proto = self.protoTest(test)
         if test_time:
             test_proto.test_time = str(test_time)
         self.failures.append((test_proto, err))
         self.all_errors.append((test_proto, self.colors.error, "Failure", err))
+        self._streamResult("failures", test_proto, err)
         self._reportOutcome(test_proto, "F", self.colors.failing, err)
 
     def addSkip(
@@ -712,10 +1191,11 @@ class GreenTestResult(BaseTestResult):
         """
         Called when a test is skipped.
         """
-        test = proto_test(test)
+        test = self.protoTest(test)
         if test_time:
             test.test_time = str(test_time)
         self.skipped.append((test, reason))
+        self._streamResult("skipped", test, reason)
         self._reportOutcome(test, "s", self.colors.skipped, reason=reason)
 
     def addExpectedFailure(
@@ -724,11 +1204,12 @@ class GreenTestResult(BaseTestResult):
         """
         Called when a test fails, and we expected the failure.
         """
-        test = proto_test(test)
+        test = self.protoTest(test)
         if test_time:
             test.test_time = str(test_time)
         err = proto_error(err)
         self.expectedFailures.append((test, err))
+        self._streamResult("expectedFailures", test, err)
         self._reportOutcome(test, "x", self.colors.expectedFailure, err)
 
     def addUnexpectedSuccess(
@@ -737,12 +1218,31 @@ class GreenTestResult(BaseTestResult):
         """
         Called when a test passed, but we expected a failure.
         """
-        test = proto_test(test)
+        test = self.protoTest(test)
         if test_time:
             test.test_time = str(test_time)
         self.unexpectedSuccesses.append(test)
+        self._streamResult("unexpectedSuccesses", test)
         self._reportOutcome(test, "u", self.colors.unexpectedSuccess)
 
+    def _streamResult(
+        self, outcome: str, test: ProtoTest, detail: ProtoError | str | None = None
+    ) -> None:
+        """
+        I hand a result over to the reporters.  When streaming, I also let go
+        of the captured output of the tests which did not fail, since
+        printErrors() only shows the output of the failures then.
+        """
+        if not (self.reporters or self.streaming):
+            return
+        stdout = self.stdout_output.get(test)
+        stderr = self.stderr_errput.get(test)
+        for reporter in self.reporters:
+            reporter.addResult(outcome, test, detail, stdout, stderr)
+        if self.streaming and outcome not in ("errors", "failures"):
+            self.stdout_output.pop(test, None)
+            self.stderr_errput.pop(test, None)
+
     def printErrors(self) -> None:
         """
         Print a list of all tracebacks from errors and failures, as well as
@@ -771,12 +1271,20 @@ class GreenTestResult(BaseTestResult):
                     self.displayStdout(test)
                     self.displayStderr(test)
 
-        # Actual tracebacks and captured output for failing tests
+        # Actual tracebacks and captured output for failing tests.  Tests that
+        # failed with identical tracebacks, like when a shared fixture breaks,
+        # are grouped under a single one.
+        groups: dict[tuple, list[tuple[ProtoTest, Callable[[str], str], ProtoError]]]
+        groups = {}
         for test, color_func, outcome, err in self.all_errors:
+            groups.setdefault((outcome, err.chain), []).append((test, color_func, err))
+        for (outcome, _), tests in groups.items():
+            test, color_func, err = tests[0]
             # Header Line
-            self.stream.writeln(
-                f"\n{color_func(outcome)} in {self.colors.bold(test.dotted_name)}"
-            )
+            header = f"\n{color_func(outcome)} in {self.colors.bold(test.dotted_name)}"
+            if len(tests) > 1:
+                header += f" and {len(tests) - 1} more with the same traceback"
+            self.stream.writeln(header)
 
             # Traceback
             if not self.args.no_tracebacks:
@@ -795,20 +1303,35 @@ class GreenTestResult(BaseTestResult):
                     relevant_frames.append(frame)
                 self.stream.write("".join(relevant_frames))
 
+            # The other tests, without their (identical) tracebacks
+            if len(tests) > 1:
+                self.stream.writeln(f"{color_func(outcome)} with the same traceback in")
+                for other, _, _ in tests[1:]:
+                    self.stream.writeln(f"  {self.colors.bold(other.dotted_name)}")
+
             # Captured output for failing tests
-            self.displayStdout(test)
-            self.displayStderr(test)
+            for test, _, _ in tests:
+                self.displayStdout(test)
+                self.displayStderr(test)
 
     def wasSuccessful(self) -> bool:
         """
         Tells whether or not the overall run was successful.
         """
         if self.args.minimum_coverage is not None:
-            if self.coverage_percent < self.args.minimum_coverage:
+            # No percentage means there was no data to report on.  Like the
+            # report, it is only as precise as coverage is configured to be.
+            cov = getattr(self.args, "cov", None)
+            precision = getattr(getattr(cov, "config", None), "precision", 0)
+            coverage_percent = round(
+                self.coverage_percent or 0.0,
+                precision if isinstance(precision, int) else 0,
+            )
+            if coverage_percent < self.args.minimum_coverage:
                 self.stream.writeln(
                     self.colors.red(
-                        "Coverage of {}% is below minimum level of {}%".format(
-                            self.coverage_percent, self.args.minimum_coverage
+                        "Coverage of {:.2f}% is below minimum level of {}%".format(
+                            coverage_percent, self.args.minimum_coverage
                         )
                     )
                 )
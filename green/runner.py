@@ -4,20 +4,55 @@ from __future__ import annotations
 
 import argparse
 import multiprocessing
+import os
 from sys import modules
-from typing import TextIO, TYPE_CHECKING
+from typing import Iterable, Sequence, TextIO, TYPE_CHECKING
 from unittest.signals import registerResult, installHandler, removeResult
 import warnings
 
+from green.cache import readCache, writeCache
 from green.exceptions import InitializerOrFinalizerError
-from green.loader import toParallelTargets
+from green.impact import moduleName
+from green.index import DiscoveryIndex, indexTargetTests, isSplittableEntry
+from green.loader import (
+    GreenTestLoader,
+    isSplittableModule,
+    splitTargetTests,
+    toLazyParallelTargets,
+    toParallelTargetTests,
+)
+from green import output
 from green.output import debug, GreenStream
-from green.process import LoggingDaemonlessPool, poolRunner
-from green.result import GreenTestResult, ProtoTestResult
+from green.process import (
+    BatchingTargetQueue,
+    LoggingDaemonlessPool,
+    poolBatchRunner,
+    poolDiscoverer,
+    TargetQueue,
+)
+from green.result import (
+    GreenTestResult,
+    ProtoTest,
+    ProtoTestResult,
+    ResultReporter,
+    RunProgress,
+)
 
 if TYPE_CHECKING:
-    from multiprocessing.managers import SyncManager
-    from queue import Queue
+    from multiprocessing.pool import AsyncResult
+    from typing import Union
+
+    from green.output import SpilledOutput
+    from green.result import ProtoError, RunnableTestT
+
+    MessageT = Union[RunnableTestT, ProtoTestResult, None, list]
+
+# Name of the cache entry holding the wall-clock seconds each target last took.
+DURATIONS_CACHE = "durations"
+# Name of the cache entry holding the targets of the tests that last failed.
+FAILURES_CACHE = "failures"
+# How many tasks batchTargets() aims to give each process.
+TASKS_PER_PROCESS = 8
 
 
 class InitializerOrFinalizer:
@@ -59,6 +94,417 @@ class InitializerOrFinalizer:
             )
 
 
+def estimateTargetDurations(
+    target_counts: dict[str, int], durations: dict[str, float]
+) -> dict[str, float]:
+    """
+    I estimate how many seconds each target will take to run.
+
+    Targets that were timed in a previous run use their recorded duration.
+    The others are estimated from their number of tests, at the average speed
+    per test of the timed targets (or one second per test if nothing has been
+    timed yet).
+    """
+    timed_targets = [x for x in target_counts if x in durations]
+    timed_tests = sum(target_counts[x] for x in timed_targets)
+    seconds_per_test = 1.0
+    if timed_tests:
+        seconds_per_test = sum(durations[x] for x in timed_targets) / timed_tests
+    return {
+        target: durations.get(target, count * seconds_per_test)
+        for target, count in target_counts.items()
+    }
+
+
+def sortTargetsByDuration(
+    target_counts: dict[str, int], durations: dict[str, float]
+) -> list[str]:
+    """
+    I return the targets ordered longest-first, so that one slow module
+    discovered last does not end up running alone while every other worker
+    sits idle.  Targets with equal estimates keep their discovery order.
+    """
+    estimates = estimateTargetDurations(target_counts, durations)
+    return sorted(target_counts, key=estimates.__getitem__, reverse=True)
+
+
+def batchTargets(
+    target_counts: dict[str, int], durations: dict[str, float], processes: int
+) -> list[list[str]]:
+    """
+    I group the targets into the batches to hand to the pool as one task
+    each, longest-first (see sortTargetsByDuration()).
+
+    Every task has a fixed cost (sending it to a worker, a temp directory),
+    which adds up when there are thousands of tiny targets.  So consecutive
+    targets are batched together until their estimated duration reaches a
+    share of the whole run small enough to still give each process
+    TASKS_PER_PROCESS tasks to balance.  Targets bigger than that run on their
+    own.
+    """
+    estimates = estimateTargetDurations(target_counts, durations)
+    threshold = sum(estimates.values()) / (max(processes, 1) * TASKS_PER_PROCESS)
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    batch_estimate = 0.0
+    for target in sortTargetsByDuration(target_counts, durations):
+        batch.append(target)
+        batch_estimate += estimates[target]
+        if batch_estimate >= threshold:
+            batches.append(batch)
+            batch = []
+            batch_estimate = 0.0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def findHeavyTargets(
+    target_counts: dict[str, int], durations: dict[str, float], processes: int
+) -> list[str]:
+    """
+    I return the targets estimated to take longer than an even share of the
+    whole run across `processes` workers.  Such a target keeps one worker
+    busy after all of the others have run out of work, however early it is
+    dispatched.
+    """
+    estimates = estimateTargetDurations(target_counts, durations)
+    fair_share = sum(estimates.values()) / max(processes, 1)
+    return [target for target, estimate in estimates.items() if estimate > fair_share]
+
+
+def failureTarget(test: ProtoTest) -> str | None:
+    """
+    I return the target which runs the given test again, or None if it can't
+    be run on its own.
+    """
+    if test.is_class_or_module_teardown_error or test.class_name == "N/A":
+        # Teardowns and internal errors of the poolRunner aren't tests
+        return None
+    if test.is_doctest:
+        # Doctests are run by the test module which loads them
+        return test.module
+    if test.class_name == "ModuleImportFailure":
+        # The method is named after the module which failed to import
+        return test.method_name
+    # Subtests can only be run along with the rest of their test
+    return f"{test.module}.{test.class_name}.{test.method_name}"
+
+
+class FailuresReporter(ResultReporter):
+    """
+    I keep track of the targets of the tests which failed (or errored, or
+    succeeded unexpectedly) as the results come in, and of the previous
+    failures which cover a test that ran, for updateFailures().  Unlike the
+    lists of outcomes of the result, I work with --stream-results too, and
+    only hold on to as much as there are failures.
+    """
+
+    FAILED = ("errors", "failures", "unexpectedSuccesses")
+
+    def __init__(self, failures: Iterable[str] = ()) -> None:
+        self.failures: list[str] = list(failures)
+        self.failed: set[str] = set()
+        # The modules (or tests) of the previous failures, and those which ran
+        self.previous: set[str] = {targetModule(x) for x in self.failures}
+        self.ran: set[str] = set()
+
+    def addResult(
+        self,
+        outcome: str,
+        test: ProtoTest,
+        detail: ProtoError | str | None,
+        stdout: str | SpilledOutput | None,
+        stderr: str | SpilledOutput | None,
+    ) -> None:
+        target = failureTarget(test)
+        if target is None:
+            return
+        if outcome in self.FAILED:
+            self.failed.add(target)
+        if not self.previous:
+            return
+        # The target and every dotted name it is inside of
+        name = target
+        while True:
+            if name in self.previous:
+                self.ran.add(name)
+            dot = name.rfind(".")
+            if dot == -1:
+                break
+            name = name[:dot]
+
+
+def updateFailures(
+    reporter: FailuresReporter, ran_in_full: Iterable[str] = ()
+) -> list[str]:
+    """
+    I return the targets of the tests which failed in the run, as the reporter
+    found them, plus the previous failures which did not run again.
+
+    ran_in_full are the targets (modules or classes) which ran all of their
+    tests.  The previous failures inside of them are dropped even if they did
+    not run, since they were renamed or deleted.
+    """
+    ran_in_full = list(ran_in_full)
+    failed = set(reporter.failed)
+    failed.update(
+        x
+        for x in reporter.failures
+        if targetModule(x) not in reporter.ran
+        and not any(isWithin(targetModule(x), y) for y in ran_in_full)
+    )
+    return sorted(failed)
+
+
+def targetModule(target: str) -> str:
+    """
+    I return the dotted name of the module (or package) of a target, be it a
+    dotted name, a file or a directory.  A directory which is not a package
+    gets an empty name.
+    """
+    if os.path.isdir(target):
+        return moduleName(os.path.join(target, "__init__.py"))
+    if target.endswith(".py"):
+        return moduleName(target)
+    return target
+
+
+def isWithin(name: str, target: str) -> bool:
+    """
+    I check whether the dotted name is the target itself, or inside of it.
+    """
+    return not target or name == target or name.startswith(target + ".")
+
+
+def selectFailedTargets(targets: Iterable[str], failures: Iterable[str]) -> list[str]:
+    """
+    I return the failures which are inside of one of the targets.
+    """
+    modules = [targetModule(x) for x in targets]
+    return [
+        failure
+        for failure in failures
+        if any(isWithin(targetModule(failure), x) for x in modules)
+    ]
+
+
+def findIndexedModule(index: DiscoveryIndex, name: str) -> dict | None:
+    """
+    I return the valid entry of the test module the dotted name is in, or
+    None if it is not indexed.
+    """
+    parts = name.split(".")
+    for i in range(len(parts), 0, -1):
+        entry = index.lookupModule(".".join(parts[:i]))
+        if entry is not None:
+            return entry
+    return None
+
+
+def selectLoadableFailures(
+    failures: Iterable[str], index: DiscoveryIndex, file_pattern: str = "test*.py"
+) -> list[str]:
+    """
+    I return the failures which still load some test, leaving out the tests
+    which were renamed or deleted since they failed.
+
+    The tests of the modules in the discovery index are known without
+    importing them, the other failures are loaded.
+    """
+    loader = None
+    loadable = []
+    for failure in failures:
+        entry = findIndexedModule(index, failure)
+        if isSplittableEntry(entry, True):
+            assert entry is not None
+            if any(isWithin(x, failure) for x in entry["tests"]):
+                loadable.append(failure)
+            continue
+        loader = loader or GreenTestLoader()
+        try:
+            tests = loader.loadTargets(failure, file_pattern)
+        except Exception:
+            tests = None
+        if tests and tests.countTestCases():
+            loadable.append(failure)
+    return loadable
+
+
+def hasFailed(target: str, failures: Iterable[str]) -> bool:
+    """
+    I check whether running the target runs one of the failures again.
+    """
+    module = targetModule(target)
+    return any(
+        isWithin(failure, module) or isWithin(module, failure)
+        for failure in map(targetModule, failures)
+    )
+
+
+class ResultMultiplexer:
+    """
+    I feed the messages that the poolRunners of every target send up the
+    shared result queue into a GreenTestResult.
+
+    By default each message is reported as soon as it arrives, so results show
+    up in the order the tests complete, whichever target they belong to.  If
+    `ordered` is set, messages from a target are held back until every target
+    before it (in discovery order) has finished, which reproduces the grouped
+    output of running the targets one after another.
+    """
+
+    def __init__(
+        self,
+        result: GreenTestResult,
+        num_targets: int,
+        ordered: bool = False,
+        targets: Sequence[str] = (),
+    ) -> None:
+        self.result = result
+        self.ordered = ordered
+        self.unfinished = num_targets
+        # The names of the targets, by index, to tell the result when each ends
+        self.targets = targets
+        # The test each target has most recently started, but not reported yet
+        self.started: dict[int, RunnableTestT] = {}
+        # Reorder buffer, only used when ordered
+        self.next_index = 0
+        self.buffered: dict[int, list] = {}
+
+    def handle(self, index: int, msg: MessageT) -> None:
+        """
+        Handle one message sent by the poolRunner of the target at `index`, or
+        a batch of them sent by a BatchingTargetQueue.
+        """
+        progress = self.result.progress
+        if isinstance(msg, list):
+            # The first batch is sent empty as soon as the target starts
+            if progress is not None and self.targets and not msg:
+                progress.startTarget(self.targets[index])
+            for message in msg:
+                self.handle(index, message)
+            return
+        if progress is not None and self.targets:
+            # Targets are running as soon as they are heard from, even if
+            # their results are held back
+            if msg is None:
+                progress.stopTarget(self.targets[index])
+            else:
+                progress.startTarget(self.targets[index])
+        if msg is None:
+            self.unfinished -= 1
+        if not self.ordered:
+            self._process(index, msg)
+            return
+        self.buffered.setdefault(index, []).append(msg)
+        while self.next_index in self.buffered:
+            messages = self.buffered.pop(self.next_index)
+            for message in messages:
+                if self.result.shouldStop:
+                    return
+                self._process(self.next_index, message)
+            if messages[-1] is not None:
+                # This target is still running, keep waiting for it
+                break
+            self.next_index += 1
+
+    def discard(self, index: int, msg: MessageT) -> None:
+        """
+        Take note of a message (or batch) sent by the poolRunner of the target
+        at `index`, without reporting it.
+        """
+        if isinstance(msg, list):
+            for message in msg:
+                self.discard(index, message)
+            return
+        if msg is None:
+            self.unfinished -= 1
+
+    def _process(self, index: int, msg: RunnableTestT | ProtoTestResult | None) -> None:
+        # Sentinel value, the target is done
+        if msg is None:
+            debug(f"runner.run(): received sentinel for target {index}.", 3)
+            if self.targets:
+                self.result.stopTarget(self.targets[index])
+        elif isinstance(msg, ProtoTestResult):
+            # Formatting every message adds up, so only do it when it is shown
+            if output.debug_level >= 3:
+                debug(f"runner.run(): received proto test result: {msg}", 3)
+            test = self.started.pop(index, None)
+            if test is not None:
+                self.result.startTest(test)
+            self.result.addProtoTestResult(msg)
+        else:
+            if output.debug_level:
+                debug(f"runner.run(): start test: {msg}")
+            if self.ordered:
+                # Nothing else is being reported until this test's result
+                # arrives, so print out the white 'processing...' version of
+                # the output right away.
+                self.result.startTest(msg)
+            else:
+                self.started[index] = msg
+
+
+def createPool(args: argparse.Namespace) -> LoggingDaemonlessPool:
+    """
+    I return a new pool of worker processes to load and run the tests in.
+    """
+    # Use "forkserver" method when available to avoid problems with "fork". See, for example,
+    # https://github.com/python/cpython/issues/84559
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp_method = "forkserver"
+    else:
+        mp_method = None
+    mp_context = multiprocessing.get_context(mp_method)
+    if mp_method == "forkserver":
+        # The workers are forked from a server process which has already
+        # imported what they all need.  This has no effect if the
+        # forkserver is already running.
+        mp_context.set_forkserver_preload(
+            ["__main__", "green.process"] + (args.preload or [])
+        )
+    elif args.preload:  # pragma: no cover
+        debug("--preload is ignored without the forkserver start method")
+    return LoggingDaemonlessPool(
+        processes=args.processes or None,
+        initializer=InitializerOrFinalizer(args.initializer),
+        finalizer=InitializerOrFinalizer(args.finalizer),
+        maxtasksperchild=args.maxtasksperchild,
+        context=mp_context,
+        coverage_options=(
+            (args.omit_patterns, args.cov_config_file, args.sysmon_coverage)
+            if args.run_coverage
+            else None
+        ),
+    )
+
+
+def discoverInPool(
+    pool: LoggingDaemonlessPool, targets: list[str], processes: int
+) -> list[tuple[str, list[str], str, tuple[str, dict] | None]]:
+    """
+    I have the workers of the pool discover the tests of the targets, a slice
+    of them at a time, and return what poolDiscoverer() returned for each of
+    them, in order.  The targets of a slice that could not be discovered at
+    all are left out.
+    """
+    # Several slices per worker, so that one slow import does not hold up the
+    # whole discovery.
+    size = max(1, -(-len(targets) // (processes * 4)))
+    slices = [targets[i : i + size] for i in range(0, len(targets), size)]
+    debug(f"Discovering the tests of {len(targets)} target(s) in the workers")
+    async_results = [pool.apply_async(poolDiscoverer, (x,)) for x in slices]
+    discovered = []
+    for targets_slice, async_result in zip(slices, async_results):
+        try:
+            discovered.extend(async_result.get())
+        except Exception as e:
+            debug(f"Unable to discover the tests of {targets_slice}: {e}")
+    return discovered
+
+
 def run(
     suite, stream: TextIO | GreenStream, args: argparse.Namespace, testing: bool = False
 ) -> GreenTestResult:
@@ -74,6 +520,14 @@ def run(
             disable_unidecode=args.disable_unidecode,
         )
     result = GreenTestResult(args, stream)
+    if args.junit_report:
+        from green.junit import JUnitReporter
+
+        result.reporters.append(JUnitReporter(args.junit_report))
+    failures: list[str] = readCache(args.cache_dir, FAILURES_CACHE, [])
+    failures_reporter = FailuresReporter(failures)
+    if args.cache_dir:
+        result.reporters.append(failures_reporter)
 
     # Note: Catching SIGINT isn't supported by Python on windows (python
     # "WONTFIX" issue 18040)
@@ -98,82 +552,207 @@ def run(
                 )
 
         result.startTestRun()
-
-        # The call to toParallelTargets needs to happen before pool stuff so we can crash if there
-        # are, for example, syntax errors in the code to be loaded.
-        parallel_targets = toParallelTargets(suite, args.targets)
-        # Use "forkserver" method when available to avoid problems with "fork". See, for example,
-        # https://github.com/python/cpython/issues/84559
-        if "forkserver" in multiprocessing.get_all_start_methods():
-            mp_method = "forkserver"
-        else:
-            mp_method = None
-        mp_context = multiprocessing.get_context(mp_method)
-        pool = LoggingDaemonlessPool(
-            processes=args.processes or None,
-            initializer=InitializerOrFinalizer(args.initializer),
-            finalizer=InitializerOrFinalizer(args.finalizer),
-            maxtasksperchild=args.maxtasksperchild,
-            context=mp_context,
-        )
-        manager: SyncManager = mp_context.Manager()
-        targets: list[tuple[str, Queue]] = [
-            (target, manager.Queue()) for target in parallel_targets
-        ]
-        if targets:
-            for index, (target, queue) in enumerate(targets):
-                if args.run_coverage:
-                    coverage_number = index + 1
+        # Anything going wrong from here on must still stop the frames of the
+        # stream, or what it holds back is lost along with its daemon thread.
+        try:
+            # The call to toParallelTargets needs to happen before pool stuff so we can crash if there
+            # are, for example, syntax errors in the code to be loaded.
+            discovery_index = DiscoveryIndex(args.cache_dir, args.test_pattern)
+            processes = args.processes or os.cpu_count() or 1
+            pool: LoggingDaemonlessPool | None = None
+            if args.lazy_discovery:
+                # Nothing has been imported, so how many tests each module has is
+                # only known for the files which are in the discovery index and
+                # have not changed since, unless the workers discover the others
+                # first.  Otherwise those count as one test until the workers
+                # report back.
+                lazy_targets = toLazyParallelTargets(
+                    args.targets, args.file_pattern, args.exclude_dirs
+                )
+                entries = {x: discovery_index.lookupModule(x) for x in lazy_targets}
+                target_tests: dict[str, list[str]] = {
+                    x: entry["tests"] if entry else [] for x, entry in entries.items()
+                }
+                unknown = {x for x, entry in entries.items() if entry is None}
+                # The entries of the modules the workers imported for this run
+                discovered_entries: dict[str, dict] = {}
+                debug(
+                    "Found {} of {} target(s) in the discovery index".format(
+                        len(entries) - len(unknown), len(entries)
+                    )
+                )
+                if args.parallel_discovery and unknown:
+                    pool = createPool(args)
+                    discovered = discoverInPool(
+                        pool, [x for x in lazy_targets if x in unknown], processes
+                    )
+                    for target, tests, failure, described in discovered:
+                        if failure:
+                            # It is left for the worker that runs it to report
+                            debug(
+                                f"Unable to discover the tests of {target}: {failure}"
+                            )
+                            continue
+                        target_tests[target] = tests
+                        unknown.discard(target)
+                        if described is not None:
+                            discovered_entries[target] = described[1]
+                            discovery_index.addEntry(*described)
+                    discovery_index.save()
+                target_counts = {
+                    x: len(tests) or 1 for x, tests in target_tests.items()
+                }
+            else:
+                target_tests = toParallelTargetTests(suite, args.targets)
+                target_counts = {x: len(tests) for x, tests in target_tests.items()}
+                indexTargetTests(discovery_index, target_tests)
+            durations: dict[str, float] = readCache(args.cache_dir, DURATIONS_CACHE, {})
+            # Modules are only split by looking at the tests loaded for this run.
+            # An index entry is not enough: it is only checked against the file of
+            # its module, and a class the module imports from another file which
+            # changed since might then never run.
+            if args.split_modules:
+                heavy_targets = findHeavyTargets(target_counts, durations, processes)
+                if args.lazy_discovery:
+                    split_modules = [
+                        target
+                        for target in heavy_targets
+                        if isSplittableEntry(
+                            discovered_entries.get(target), args.split_module_fixtures
+                        )
+                    ]
                 else:
-                    coverage_number = None
-                debug(f"Sending {target} to poolRunner {poolRunner}")
-                pool.apply_async(
-                    poolRunner,
+                    split_modules = [
+                        target
+                        for target in heavy_targets
+                        if isSplittableModule(target, args.split_module_fixtures)
+                    ]
+                if split_modules:
+                    debug(f"Splitting heavy modules into classes: {split_modules}")
+                    if args.lazy_discovery:
+                        target_tests = splitTargetTests(target_tests, split_modules)
+                    else:
+                        target_tests = toParallelTargetTests(
+                            suite, args.targets, split_modules
+                        )
+                    target_counts = {
+                        x: len(tests) or 1 for x, tests in target_tests.items()
+                    }
+            if args.maxtasksperchild:
+                # Every target is promised a fresh process, so don't batch them.
+                batches = [[x] for x in sortTargetsByDuration(target_counts, durations)]
+            else:
+                batches = batchTargets(target_counts, durations, processes)
+            if args.failed_first:
+                if failures:
+                    # Stable, so the rest stay longest-first
+                    batches.sort(
+                        key=lambda batch: not any(hasFailed(x, failures) for x in batch)
+                    )
+            # Show how far along the run is below the output on a terminal
+            result.startProgress(
+                RunProgress(
+                    (
+                        None
+                        if args.lazy_discovery and unknown
+                        else sum(target_counts.values())
+                    ),
+                    (
+                        estimateTargetDurations(target_counts, durations)
+                        if durations
+                        else {}
+                    ),
+                    processes,
+                )
+            )
+            if pool is None:
+                pool = createPool(args)
+            # Messages are tagged with the discovery-order index of their target
+            target_indexes = {
+                target: index for index, target in enumerate(target_counts)
+            }
+            # Only the verbose modes show each test as it starts.  The tests are
+            # numbered as they are sent (see BaseTestResult.protoTest()).  Those
+            # that only the workers find, like subtests, are numbered as they are
+            # reported.
+            queue_class = TargetQueue if args.verbose > 1 else BatchingTargetQueue
+            async_results: list[tuple[list[str], AsyncResult[list[float | None]]]] = []
+            for batch in batches:
+                debug(f"Sending {batch} to poolBatchRunner {poolBatchRunner}")
+                async_result = pool.apply_async(
+                    poolBatchRunner,
                     (
-                        target,
-                        queue,
-                        coverage_number,
-                        args.omit_patterns,
-                        args.cov_config_file,
+                        [
+                            (
+                                x,
+                                queue_class(target_indexes[x]),
+                                result.numberTests(target_tests[x]),
+                            )
+                            for x in batch
+                        ],
+                        args.capture_limit,
                     ),
                 )
+                async_results.append((batch, async_result))
             pool.close()
-            for target, queue in targets:
-                abort = False
 
-                while True:
-                    msg = queue.get()
-
-                    # Sentinel value, we're done
-                    if not msg:
-                        debug("runner.run(): received sentinal, breaking.", 3)
-                        break
-                    else:
-                        debug(f"runner.run(): start test: {msg}")
-                        # Result guaranteed after this message, we're
-                        # currently waiting on this test, so print out
-                        # the white 'processing...' version of the output
-                        result.startTest(msg)
-                        proto_test_result: ProtoTestResult = queue.get()
-                        debug(
-                            "runner.run(): received proto test result: {}".format(
-                                str(proto_test_result)
-                            ),
-                            3,
-                        )
-                        result.addProtoTestResult(proto_test_result)
+            multiplexer = ResultMultiplexer(
+                result,
+                len(target_counts),
+                ordered=args.ordered_output,
+                targets=list(target_counts),
+            )
+            startup_times: list[float] = []
+            while multiplexer.unfinished:
+                index, msg = pool.result_queue.get()
+                if index is None:
+                    startup_times.append(msg)
+                    continue
+                if result.shouldStop:
+                    # Nothing more will be reported, but the workers block once the
+                    # result pipe is full, so keep reading until every target has
+                    # checked in.
+                    multiplexer.discard(index, msg)
+                    continue
+                multiplexer.handle(index, msg)
+                if result.shouldStop:
+                    debug("runner.run(): shouldStop encountered, aborting", 3)
+                    pool.abort_event.set()
 
-                    if result.shouldStop:
-                        debug("runner.run(): shouldStop encountered, breaking", 3)
-                        abort = True
-                        break
+            pool.join()
+        finally:
+            result.stream.stopFrames()
 
-                if abort:
-                    break
+        if startup_times:
+            debug(
+                "{} worker process{} took {:.3f}s on average to start up ({:.3f}s "
+                "at most)".format(
+                    len(startup_times),
+                    "" if len(startup_times) == 1 else "es",
+                    sum(startup_times) / len(startup_times),
+                    max(startup_times),
+                )
+            )
 
-        pool.close()
-        pool.join()
-        manager.shutdown()
+        # Remember how long each target took, for scheduling the next run.
+        finished: dict[str, float] = {}
+        for batch, async_result in async_results:
+            if async_result.ready() and async_result.successful():
+                for target, elapsed in zip(batch, async_result.get()):
+                    if elapsed is not None:
+                        finished[target] = elapsed
+        if finished:
+            durations.update(finished)
+            writeCache(args.cache_dir, DURATIONS_CACHE, durations)
+        # Remember which tests failed, for --last-failed and --failed-first.
+        if args.cache_dir:
+            # Partial runs can't tell which tests are gone
+            ran_in_full = (
+                [] if result.shouldStop or args.test_pattern != "*" else list(finished)
+            )
+            new_failures = updateFailures(failures_reporter, ran_in_full)
+            if new_failures != failures:
+                writeCache(args.cache_dir, FAILURES_CACHE, new_failures)
 
         result.stopTestRun()
 
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import argparse
 from fnmatch import fnmatch
-from io import StringIO
 import sys
 import unittest
 from typing import Iterable, TYPE_CHECKING
@@ -10,7 +9,7 @@ from unittest.suite import _call_if_exists, _DebugResult, _isnotsuite, TestSuite
 from unittest import util
 
 from green.config import get_default_args
-from green.output import GreenStream
+from green.output import CaptureBuffer, GreenStream
 
 if TYPE_CHECKING:
     from unittest.case import TestCase
@@ -168,9 +167,15 @@ class GreenTestSuite(TestSuite):
                 ):
                     continue
 
+                # Python 3.12+ no longer calls startTest() for skipped tests,
+                # which would leave the outcome of the previous test in the
+                # result to be sent again along with the skip.
+                _call_if_exists(result, "reinitialize")
+
                 if not self.allow_stdout:
-                    captured_stdout = StringIO()
-                    captured_stderr = StringIO()
+                    capture_limit = getattr(result, "capture_limit", 0)
+                    captured_stdout = CaptureBuffer(capture_limit)
+                    captured_stderr = CaptureBuffer(capture_limit)
                     saved_stdout = sys.stdout
                     saved_stderr = sys.stderr
                     sys.stdout = GreenStream(captured_stdout)  # type: ignore[assignment]
@@ -0,0 +1,49 @@
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from green.cache import readCache, writeCache
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+
+    def test_roundTrip(self):
+        """
+        A value written to the cache can be read back, creating the directory.
+        """
+        writeCache(self.cache_dir, "thing", {"a.b": 1.5})
+        self.assertEqual(readCache(self.cache_dir, "thing"), {"a.b": 1.5})
+
+    def test_missing(self):
+        """
+        Reading something never written returns the default.
+        """
+        self.assertEqual(readCache(self.cache_dir, "nothing", {}), {})
+
+    def test_corrupt(self):
+        """
+        A corrupt cache file is treated as missing.
+        """
+        os.makedirs(self.cache_dir)
+        pathlib.Path(self.cache_dir, "thing.json").write_text("{not json")
+        self.assertEqual(readCache(self.cache_dir, "thing", []), [])
+
+    def test_disabled(self):
+        """
+        An empty cache directory disables both reading and writing.
+        """
+        writeCache("", "thing", 1)
+        self.assertEqual(readCache("", "thing", 2), 2)
+
+    def test_unserializable(self):
+        """
+        A value json can't store leaves no files behind and raises nothing.
+        """
+        writeCache(self.cache_dir, "thing", object())
+        self.assertEqual(os.listdir(self.cache_dir), [])
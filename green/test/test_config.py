@@ -5,10 +5,12 @@ import copy
 import pathlib
 from io import StringIO
 import os
+import sys
 import shutil
 import tempfile
 import unittest
 from typing import Sequence
+from unittest.mock import MagicMock, patch
 
 from green import config
 from green.output import GreenStream
@@ -594,6 +596,48 @@ class TestMergeConfig(ConfigBase):
             self.assertEqual(computed_args.version, False)
             self.assertEqual(computed_args.termcolor, False)
 
+    def test_preload(self):
+        """
+        The modules to preload are converted to a list.
+        """
+        with ModifiedEnvironment(HOME=str(self.tmpd)):
+            new_args = copy.deepcopy(config.get_default_args())
+            new_args.preload = "django, numpy"
+            computed_args = config.mergeConfig(new_args, testing=True)
+            self.assertEqual(computed_args.preload, ["django", "numpy"])
+
+    def test_changed_files(self):
+        """
+        The changed files are converted to a list.
+        """
+        with ModifiedEnvironment(HOME=str(self.tmpd)):
+            new_args = copy.deepcopy(config.get_default_args())
+            new_args.changed_files = "a.py, b.py"
+            computed_args = config.mergeConfig(new_args, testing=True)
+            self.assertEqual(computed_args.changed_files, ["a.py", "b.py"])
+
+    def test_parallel_discovery(self):
+        """
+        parallel_discovery implies lazy_discovery.
+        """
+        with ModifiedEnvironment(HOME=str(self.tmpd)):
+            new_args = copy.deepcopy(config.get_default_args())
+            new_args.parallel_discovery = True
+            computed_args = config.mergeConfig(new_args, testing=True)
+            self.assertTrue(computed_args.lazy_discovery)
+
+    def test_exclude_dirs(self):
+        """
+        The directories to exclude from discovery are converted to a list.
+        """
+        with ModifiedEnvironment(HOME=str(self.tmpd)):
+            new_args = copy.deepcopy(config.get_default_args())
+            computed_args = config.mergeConfig(new_args, testing=True)
+            self.assertEqual(computed_args.exclude_dirs, [])
+            new_args.exclude_dirs = "node_modules, /build"
+            computed_args = config.mergeConfig(new_args, testing=True)
+            self.assertEqual(computed_args.exclude_dirs, ["node_modules", "/build"])
+
     def test_targets(self):
         """
         The targets passed in make it through mergeConfig, and the specified
@@ -620,3 +664,26 @@ class TestMergeConfig(ConfigBase):
                 config.mergeConfig(new_args, testing=True)
         finally:
             config.get_default_args.cache_clear()
+
+
+class TestUseSysmonCore(unittest.TestCase):
+    def test_useSysmonCore(self):
+        """
+        The sys.monitoring core is selected on python 3.12+.
+        """
+        cov = MagicMock()
+        with patch("green.config.coverage.version_info", (7, 9, 0, "final", 0)):
+            config.useSysmonCore(cov)
+        if sys.version_info < (3, 12):
+            cov.set_option.assert_not_called()
+        else:
+            cov.set_option.assert_called_once_with("run:core", "sysmon")
+
+    def test_oldCoverage(self):
+        """
+        A version of coverage that can't be told which core to use keeps its default.
+        """
+        cov = MagicMock()
+        with patch("green.config.coverage.version_info", (7, 8, 2, "final", 0)):
+            config.useSysmonCore(cov)
+        cov.set_option.assert_not_called()
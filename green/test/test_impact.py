@@ -0,0 +1,252 @@
+import os
+import pathlib
+import shutil
+import subprocess
+import tempfile
+from textwrap import dedent
+import unittest
+from unittest import mock
+
+from green.exceptions import ChangedFilesError
+from green import impact
+
+
+class ImpactBase(unittest.TestCase):
+    def setUp(self):
+        self.startdir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.addCleanup(os.chdir, self.startdir)
+        os.chdir(self.tmpdir)
+        # proj/__init__.py
+        # proj/core.py          <- imported by proj.util
+        # proj/util.py          <- imported by proj/tests/test_util.py
+        # proj/other.py
+        # proj/tests/__init__.py
+        # proj/tests/test_util.py
+        # proj/tests/test_other.py
+        files = {
+            "__init__.py": "",
+            "core.py": "import os\n",
+            "util.py": "from . import core\n",
+            "other.py": "import json\n",
+            "tests/__init__.py": "",
+            "tests/test_util.py": "from proj.util import thing\n",
+            "tests/test_other.py": "import proj.other\n",
+        }
+        for path, content in files.items():
+            path = pathlib.Path("proj", path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+
+    def path(self, *parts):
+        return os.path.join(self.tmpdir, "proj", *parts)
+
+
+class TestModuleName(ImpactBase):
+    def test_names(self):
+        """
+        Modules are named relative to the package they are in.
+        """
+        self.assertEqual(impact.moduleName(self.path("util.py")), "proj.util")
+        self.assertEqual(
+            impact.moduleName(self.path("tests", "__init__.py")), "proj.tests"
+        )
+
+    def test_deleted(self):
+        """
+        Files which do not exist anymore can still be named.
+        """
+        self.assertEqual(impact.moduleName(self.path("gone.py")), "proj.gone")
+
+
+class TestFindImports(ImpactBase):
+    def test_imports(self):
+        """
+        Absolute and relative imports are all found.
+        """
+        pathlib.Path(self.path("tests", "test_all.py")).write_text(
+            dedent(
+                """
+                import os.path, json as j
+                from proj import util
+                from . import test_util
+                from ..core import something
+                def later():
+                    from .. import other
+                """
+            )
+        )
+        self.assertEqual(
+            impact.findImports(
+                self.path("tests", "test_all.py"), "proj.tests.test_all"
+            ),
+            [
+                "json",
+                "os.path",
+                "proj",
+                "proj.core",
+                "proj.core.something",
+                "proj.other",
+                "proj.tests",
+                "proj.tests.test_util",
+                "proj.util",
+            ],
+        )
+
+    def test_syntaxError(self):
+        """
+        Modules which can't be parsed import nothing.
+        """
+        pathlib.Path(self.path("broken.py")).write_text("import (\n")
+        self.assertEqual(impact.findImports(self.path("broken.py"), "proj.broken"), [])
+
+
+class TestBuildImportGraph(ImpactBase):
+    def test_graph(self):
+        """
+        Modules are mapped to the project modules that import them.
+        """
+        importers = impact.buildImportGraph(["proj"])
+        self.assertEqual(importers["proj.core"], {"proj.util"})
+        self.assertEqual(importers["proj.util"], {"proj.tests.test_util"})
+        self.assertEqual(
+            importers["proj"],
+            {"proj.util", "proj.tests.test_util", "proj.tests.test_other"},
+        )
+        self.assertEqual(importers["proj.tests.test_util"], set())
+
+    def test_cache(self):
+        """
+        Only modules which changed are parsed again.
+        """
+        cache_dir = os.path.join(self.tmpdir, "cache")
+        impact.buildImportGraph(["proj"], cache_dir)
+        path = pathlib.Path(self.path("other.py"))
+        path.write_text("from . import core\n")
+        os.utime(path, ns=(0, 0))
+        with mock.patch("green.impact.findImports", wraps=impact.findImports) as find:
+            importers = impact.buildImportGraph(["proj"], cache_dir)
+        find.assert_called_once_with(str(path.absolute()), "proj.other")
+        self.assertEqual(importers["proj.core"], {"proj.util", "proj.other"})
+
+
+class TestFindAffectedTestModules(ImpactBase):
+    def test_transitive(self):
+        """
+        Test modules importing a changed module, even indirectly, are affected.
+        """
+        self.assertEqual(
+            impact.findAffectedTestModules([self.path("core.py")], ["proj"]),
+            ["proj.tests.test_util"],
+        )
+
+    def test_changedTest(self):
+        """
+        Test modules which changed themselves are affected.
+        """
+        self.assertEqual(
+            impact.findAffectedTestModules(
+                [self.path("tests", "test_other.py"), self.path("README.txt")],
+                ["proj"],
+            ),
+            ["proj.tests.test_other"],
+        )
+
+    def test_select(self):
+        """
+        Target directories are narrowed down, other targets are kept.
+        """
+        self.assertEqual(
+            impact.selectChangedTargets(
+                ["proj", "some.dotted.Target"], [self.path("other.py")]
+            ),
+            ["proj.tests.test_other", "some.dotted.Target"],
+        )
+
+    def test_outsideTargets(self):
+        """
+        Imports are followed through the modules outside of the targets.
+        """
+        pathlib.Path("tests").mkdir()
+        pathlib.Path("tests", "test_core.py").write_text("from proj import core\n")
+        pathlib.Path("tests", "test_json.py").write_text("import json\n")
+        self.assertEqual(
+            impact.findAffectedTestModules([self.path("core.py")], ["tests"]),
+            ["test_core"],
+        )
+
+    def test_deleted(self):
+        """
+        Test modules importing a deleted module are affected.
+        """
+        os.unlink(self.path("other.py"))
+        self.assertEqual(
+            impact.findAffectedTestModules([self.path("other.py")], ["proj"]),
+            ["proj.tests.test_other"],
+        )
+
+    def test_unknown(self):
+        """
+        All test modules are affected by a change outside of the import
+        roots.
+        """
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        self.assertEqual(
+            impact.findAffectedTestModules(
+                [os.path.join(outside, "elsewhere.py")], [self.path("tests")]
+            ),
+            ["proj.tests.test_other", "proj.tests.test_util"],
+        )
+
+
+class TestFindImportRoots(ImpactBase):
+    def test_roots(self):
+        """
+        The roots are the directories of the top-level packages of the
+        targets, and the current directory, without nested ones.
+        """
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        pathlib.Path(outside, "pkg").mkdir()
+        pathlib.Path(outside, "pkg", "__init__.py").write_text("")
+        self.assertEqual(
+            impact.findImportRoots([self.path("tests"), os.path.join(outside, "pkg")]),
+            sorted([os.getcwd(), outside]),
+        )
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class TestFindChangedFiles(ImpactBase):
+    def git(self, *args):
+        subprocess.run(
+            ["git", "-c", "user.name=green", "-c", "user.email=green@example.com"]
+            + list(args),
+            check=True,
+            capture_output=True,
+        )
+
+    def test_changed(self):
+        """
+        Committed, uncommitted and untracked changes since the ref are found.
+        """
+        self.git("init", "-q")
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "first")
+        pathlib.Path(self.path("core.py")).write_text("import sys\n")
+        pathlib.Path(self.path("new.py")).write_text("")
+        changed = impact.findChangedFiles("HEAD")
+        self.assertEqual(
+            sorted(os.path.realpath(x) for x in changed),
+            sorted(os.path.realpath(self.path(x)) for x in ("core.py", "new.py")),
+        )
+
+    def test_badRef(self):
+        """
+        Git errors are raised as ChangedFilesError.
+        """
+        self.git("init", "-q")
+        self.assertRaises(
+            ChangedFilesError, impact.findChangedFiles, "no-such-ref-anywhere"
+        )
@@ -0,0 +1,154 @@
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+from green.cache import readCache
+from green import index
+from green.index import DiscoveryIndex
+
+
+class IndexBase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+        self.path = os.path.join(self.tmpdir, "test_indexed.py")
+        pathlib.Path(self.path).write_text("import unittest\n")
+        self.module = types.ModuleType("test_indexed")
+        self.module.__file__ = self.path
+        sys.modules["test_indexed"] = self.module
+        self.addCleanup(sys.modules.pop, "test_indexed", None)
+        self.tests = ["test_indexed.A.test_one", "test_indexed.B.test_two"]
+
+
+class TestDiscoveryIndex(IndexBase):
+    def test_roundTrip(self):
+        """
+        Saved entries are found again, by path and by module.
+        """
+        discovery_index = DiscoveryIndex(self.cache_dir)
+        discovery_index.add("test_indexed", self.tests)
+        discovery_index.save()
+        discovery_index = DiscoveryIndex(self.cache_dir)
+        entry = discovery_index.lookup(self.path)
+        self.assertEqual(entry["module"], "test_indexed")
+        self.assertEqual(entry["tests"], self.tests)
+        self.assertFalse(entry["module_fixtures"])
+        self.assertIs(discovery_index.lookupModule("test_indexed"), entry)
+        self.assertIsNone(discovery_index.lookupModule("test_other"))
+
+    def test_changed(self):
+        """
+        The entry of a file which changed since is not used.
+        """
+        discovery_index = DiscoveryIndex(self.cache_dir)
+        discovery_index.add("test_indexed", self.tests)
+        discovery_index.save()
+        pathlib.Path(self.path).write_text("import unittest\nimport os\n")
+        self.assertIsNone(DiscoveryIndex(self.cache_dir).lookup(self.path))
+
+    def test_testPattern(self):
+        """
+        Entries made with another test pattern are not used.
+        """
+        discovery_index = DiscoveryIndex(self.cache_dir, "*one")
+        discovery_index.add("test_indexed", self.tests[:1])
+        discovery_index.save()
+        self.assertIsNone(DiscoveryIndex(self.cache_dir).lookup(self.path))
+        self.assertIsNotNone(DiscoveryIndex(self.cache_dir, "*one").lookup(self.path))
+
+    def test_fixtures(self):
+        """
+        Module fixtures and ways of loading tests are flagged.
+        """
+        self.module.setUpModule = lambda: None
+        self.module.doctest_modules = ["os"]
+        discovery_index = DiscoveryIndex(self.cache_dir)
+        discovery_index.add("test_indexed", self.tests)
+        entry = discovery_index.lookup(self.path)
+        self.assertTrue(entry["module_fixtures"])
+        self.assertTrue(entry["doctest_modules"])
+        self.assertFalse(entry["load_tests"])
+
+    def test_concurrent(self):
+        """
+        Saving keeps the entries saved meanwhile by others, and drops those of
+        the files which are gone.
+        """
+        other_path = os.path.join(self.tmpdir, "test_other.py")
+        pathlib.Path(other_path).write_text("import unittest\n")
+        gone_path = os.path.join(self.tmpdir, "test_gone.py")
+        pathlib.Path(gone_path).write_text("import unittest\n")
+        first = DiscoveryIndex(self.cache_dir)
+        second = DiscoveryIndex(self.cache_dir)
+        second.add("test_indexed", [], other_path)
+        second.add("test_indexed", [], gone_path)
+        second.save()
+        os.unlink(gone_path)
+        first.add("test_indexed", self.tests)
+        first.save()
+        self.assertEqual(
+            sorted(readCache(self.cache_dir, index.DISCOVERY_CACHE)),
+            sorted([self.path, other_path]),
+        )
+
+    def test_disabled(self):
+        """
+        Without a cache directory, nothing is stored.
+        """
+        discovery_index = DiscoveryIndex("")
+        discovery_index.add("test_indexed", self.tests)
+        discovery_index.save()
+        self.assertIsNone(DiscoveryIndex("").lookup(self.path))
+
+    def test_notImported(self):
+        """
+        Modules which are not imported are not indexed.
+        """
+        discovery_index = DiscoveryIndex(self.cache_dir)
+        discovery_index.add("test_not_imported", [])
+        self.assertEqual(discovery_index.updates, {})
+
+
+class TestIsSplittableEntry(unittest.TestCase):
+    def test_flags(self):
+        """
+        Indexed modules are splittable unless they load their tests in their
+        own way, or have module fixtures which are not allowed.
+        """
+        entry = {"load_tests": False, "doctest_modules": False}
+        self.assertTrue(index.isSplittableEntry({**entry, "module_fixtures": False}))
+        self.assertFalse(index.isSplittableEntry({**entry, "module_fixtures": True}))
+        self.assertTrue(
+            index.isSplittableEntry({**entry, "module_fixtures": True}, True)
+        )
+        self.assertFalse(
+            index.isSplittableEntry(
+                {**entry, "load_tests": True, "module_fixtures": False}
+            )
+        )
+        self.assertFalse(index.isSplittableEntry(None))
+
+
+class TestIndexTargetTests(IndexBase):
+    def test_modules(self):
+        """
+        Module targets are indexed, unless some of their tests were given as
+        more specific targets.
+        """
+        discovery_index = DiscoveryIndex(self.cache_dir)
+        index.indexTargetTests(
+            discovery_index,
+            {"test_indexed": self.tests, "green.test.Something.test_it": ["x"]},
+        )
+        self.assertEqual(list(discovery_index.entries), [self.path])
+        discovery_index = DiscoveryIndex(os.path.join(self.tmpdir, "cache2"))
+        index.indexTargetTests(
+            discovery_index,
+            {"test_indexed.A": self.tests[:1], "test_indexed": self.tests[1:]},
+        )
+        self.assertEqual(discovery_index.entries, {})
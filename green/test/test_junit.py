@@ -1,12 +1,19 @@
 from green.config import get_default_args
 from green.output import GreenStream
-from green.junit import JUnitXML, JUnitDialect, Verdict
+from green.junit import JUnitReporter, JUnitXML, JUnitDialect, Verdict
 from green.result import GreenTestResult, ProtoTest, proto_error
 
+from copy import copy
 from io import StringIO
 
+import os
+
+from shutil import rmtree
+
 from sys import exc_info
 
+from tempfile import mkdtemp
+
 from unittest import TestCase
 
 from xml.etree.ElementTree import fromstring as from_xml
@@ -284,3 +291,69 @@ class JUnitXMLReportIsGenerated(TestCase):
             self.assertIsNone(failure)
             self.assertIsNone(error)
             self.assertIsNone(skipped)
+
+
+class JUnitReporterWritesReport(TestCase):
+    def setUp(self):
+        tmpdir = mkdtemp()
+        self.addCleanup(rmtree, tmpdir)
+        self._path = os.path.join(tmpdir, "junit.xml")
+        args = copy(get_default_args())
+        args.stream_results = True
+        self._test_results = GreenTestResult(args, GreenStream(StringIO()))
+        self._test_results.reporters.append(JUnitReporter(self._path))
+        self._test_results.startTestRun()
+
+    def test_streamed(self):
+        """
+        The report is written from the results as they arrive.
+        """
+        passing = test("my.module", "MyClass", "test_pass")
+        passing.test_time = "0.5"
+        self._test_results.recordStdout(passing, "some output")
+        self._test_results.addSuccess(passing)
+        try:
+            raise ValueError("Wrong value")
+        except:
+            error = proto_error(exc_info())
+        self._test_results.addFailure(test("my.module", "MyClass", "test_fail"), error)
+        self._test_results.addSkip(test("my.module", "Other", "test_skip"), "Later")
+        self._test_results.stopTestRun()
+
+        with open(self._path) as report_file:
+            root = from_xml(report_file.read().encode())
+        suites = {x.get(JUnitDialect.NAME): x for x in root}
+        self.assertEqual(list(suites), ["my.module.MyClass", "my.module.Other"])
+        suite = suites["my.module.MyClass"]
+        self.assertEqual(suite.get(JUnitDialect.TEST_COUNT), "2")
+        self.assertEqual(suite.get(JUnitDialect.FAILURE_COUNT), "1")
+        self.assertEqual(suite.get(JUnitDialect.TEST_TIME), "0.5")
+        tests = {x.get(JUnitDialect.NAME): x for x in suite}
+        self.assertEqual(
+            tests["test_pass"].find(JUnitDialect.SYSTEM_OUT).text, "some output"
+        )
+        self.assertIn("Wrong value", tests["test_fail"].find(JUnitDialect.FAILURE).text)
+        self.assertEqual(suites["my.module.Other"].get(JUnitDialect.SKIPPED_COUNT), "1")
+
+    def test_suiteWrittenWhenTargetStops(self):
+        """
+        Suites are written once their target is done, and the report is valid
+        in the meantime.
+        """
+        self._test_results.addSuccess(test("my.module", "MyClass", "test_one"))
+        self._test_results.addSuccess(test("my.other", "MyClass", "test_two"))
+        self._test_results.stopTarget("my.module")
+
+        with open(self._path) as report_file:
+            root = from_xml(report_file.read().encode())
+        self.assertEqual(
+            [x.get(JUnitDialect.NAME) for x in root], ["my.module.MyClass"]
+        )
+
+        self._test_results.stopTestRun()
+        with open(self._path) as report_file:
+            root = from_xml(report_file.read().encode())
+        self.assertEqual(
+            [x.get(JUnitDialect.NAME) for x in root],
+            ["my.module.MyClass", "my.other.MyClass"],
+        )
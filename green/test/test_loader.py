@@ -5,6 +5,7 @@ import platform
 import shutil
 import sys
 import tempfile
+import types
 from textwrap import dedent
 import unittest
 from unittest.mock import MagicMock, patch
@@ -108,6 +109,174 @@ class TestToParallelTargets(unittest.TestCase):
         """
         toParallelTargets() ignores"""
 
+    def test_counts(self):
+        """
+        toParallelTargetTests() finds all of the tests belonging to each target.
+        """
+
+        class NormalTestCase(unittest.TestCase):
+            def test_one(self):
+                pass
+
+            def test_two(self):
+                pass
+
+        class NormalTestCase2(unittest.TestCase):
+            def runTest(self):
+                pass
+
+        NormalTestCase.__module__ = self._fake_module_name
+        NormalTestCase2.__module__ = self._fake_module_name2
+
+        tests = loader.toParallelTargetTests(
+            [NormalTestCase("test_one"), NormalTestCase("test_two"), NormalTestCase2()],
+            ["."],
+        )
+        counts = {target: len(x) for target, x in tests.items()}
+        self.assertEqual(counts, {"my_test_module": 2, "my_test_module2": 1})
+
+    def test_tests(self):
+        """
+        toParallelTargetTests() lists the tests belonging to each target.
+        """
+
+        class NormalTestCase(unittest.TestCase):
+            def test_one(self):
+                pass
+
+            def test_two(self):
+                pass
+
+        NormalTestCase.__module__ = self._fake_module_name
+
+        tests = loader.toParallelTargetTests(
+            [NormalTestCase("test_one"), NormalTestCase("test_two")],
+            ["my_test_module.NormalTestCase.test_two"],
+        )
+        self.assertEqual(
+            tests,
+            {
+                "my_test_module": ["my_test_module.NormalTestCase.test_one"],
+                "my_test_module.NormalTestCase.test_two": [
+                    "my_test_module.NormalTestCase.test_two"
+                ],
+            },
+        )
+
+    def test_split(self):
+        """
+        toParallelTargetTests() splits the requested modules into classes.
+        """
+
+        class NormalTestCase(unittest.TestCase):
+            def test_one(self):
+                pass
+
+        class OtherTestCase(unittest.TestCase):
+            def test_one(self):
+                pass
+
+            def test_two(self):
+                pass
+
+        class NormalTestCase2(unittest.TestCase):
+            def runTest(self):
+                pass
+
+        NormalTestCase.__module__ = self._fake_module_name
+        OtherTestCase.__module__ = self._fake_module_name
+        NormalTestCase2.__module__ = self._fake_module_name2
+
+        tests = loader.toParallelTargetTests(
+            [
+                NormalTestCase("test_one"),
+                OtherTestCase("test_one"),
+                OtherTestCase("test_two"),
+                NormalTestCase2(),
+            ],
+            ["."],
+            ["my_test_module"],
+        )
+        self.assertEqual(
+            [(target, len(x)) for target, x in tests.items()],
+            [
+                ("my_test_module.NormalTestCase", 1),
+                ("my_test_module.OtherTestCase", 2),
+                ("my_test_module2", 1),
+            ],
+        )
+
+    def test_splitTargetTests(self):
+        """
+        splitTargetTests() splits the requested modules into classes, going by
+        the dotted names of their tests.
+        """
+        target_tests = {
+            "my_test_module": [
+                "my_test_module.NormalTestCase.test_one",
+                "my_test_module.OtherTestCase.test_one",
+                "my_test_module.OtherTestCase.test_two",
+            ],
+            "my_test_module2": ["my_test_module2.NormalTestCase2.runTest"],
+        }
+        self.assertEqual(
+            list(loader.splitTargetTests(target_tests, ["my_test_module"]).items()),
+            [
+                (
+                    "my_test_module.NormalTestCase",
+                    ["my_test_module.NormalTestCase.test_one"],
+                ),
+                (
+                    "my_test_module.OtherTestCase",
+                    [
+                        "my_test_module.OtherTestCase.test_one",
+                        "my_test_module.OtherTestCase.test_two",
+                    ],
+                ),
+                ("my_test_module2", ["my_test_module2.NormalTestCase2.runTest"]),
+            ],
+        )
+
+
+class TestIsSplittableModule(unittest.TestCase):
+    def setUp(self):
+        self.module = types.ModuleType("my_split_module")
+        sys.modules["my_split_module"] = self.module
+        self.addCleanup(sys.modules.pop, "my_split_module")
+
+    def test_plain(self):
+        """
+        Modules with nothing but test cases can be split.
+        """
+        self.assertTrue(loader.isSplittableModule("my_split_module"))
+
+    def test_notImported(self):
+        """
+        Modules that were not imported are not split.
+        """
+        self.assertFalse(loader.isSplittableModule("my_missing_module"))
+
+    def test_loadTests(self):
+        """
+        Modules using load_tests or doctest_modules are never split.
+        """
+        self.module.load_tests = lambda *args: None
+        self.assertFalse(loader.isSplittableModule("my_split_module", True))
+        del self.module.load_tests
+        self.module.doctest_modules = ["os"]
+        self.assertFalse(loader.isSplittableModule("my_split_module", True))
+
+    def test_moduleFixtures(self):
+        """
+        Modules with module fixtures are only split when allowed.
+        """
+        self.module.setUpModule = lambda: None
+        self.assertFalse(loader.isSplittableModule("my_split_module"))
+        self.assertTrue(loader.isSplittableModule("my_split_module", True))
+        del self.module.setUpModule
+        self.module.tearDownModule = lambda: None
+        self.assertFalse(loader.isSplittableModule("my_split_module"))
+
 
 class TestCompletions(unittest.TestCase):
     def test_completionBad(self):
@@ -267,6 +436,67 @@ class TestCompletions(unittest.TestCase):
         self.assertIn("my_pkg2.test_crash03.A.testOne", c)
         self.assertIn("my_pkg2.test_crash03.A.testTwo", c)
 
+    def test_completionIndex(self):
+        """
+        Test files in the discovery index which have not changed since are
+        not imported again to complete.
+        """
+        cwd = os.getcwd()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        os.chdir(tmpdir)
+        self.addCleanup(os.chdir, cwd)
+        os.mkdir("my_pkg3")
+        pathlib.Path("my_pkg3", "__init__.py").write_text("")
+        test_path = pathlib.Path("my_pkg3", "test_indexed.py")
+        test_path.write_text(
+            dedent(
+                """
+                import unittest
+
+                class A(unittest.TestCase):
+                    def testOne(self):
+                        pass
+                """
+            )
+        )
+        self.addCleanup(sys.modules.pop, "my_pkg3.test_indexed", None)
+        self.addCleanup(sys.modules.pop, "my_pkg3", None)
+        c = loader.getCompletions(".", "cache")
+        self.assertIn("my_pkg3.test_indexed.A.testOne", c)
+        with patch.object(GreenTestLoader, "loadFromModuleFilename") as load:
+            self.assertEqual(loader.getCompletions(".", "cache"), c)
+        load.assert_not_called()
+        with test_path.open("a") as test_file:
+            test_file.write("    def testTwo(self):\n        pass\n")
+        with patch.object(
+            GreenTestLoader, "loadFromModuleFilename", return_value=[]
+        ) as load:
+            loader.getCompletions(".", "cache")
+        load.assert_called_once()
+
+    def test_completionExcludeDirs(self):
+        """
+        Test files in excluded directories are not completed.
+        """
+        cwd = os.getcwd()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        os.chdir(tmpdir)
+        self.addCleanup(os.chdir, cwd)
+        for name in ("my_pkg4", "my_excluded"):
+            os.mkdir(name)
+            pathlib.Path(name, "__init__.py").write_text("")
+            pathlib.Path(name, "test_it.py").write_text(
+                "import unittest\nclass A(unittest.TestCase):\n"
+                "    def testOne(self):\n        pass\n"
+            )
+            self.addCleanup(sys.modules.pop, f"{name}.test_it", None)
+            self.addCleanup(sys.modules.pop, name, None)
+        c = loader.getCompletions(".", exclude_dirs=["my_excluded"])
+        self.assertIn("my_pkg4.test_it.A.testOne", c)
+        self.assertNotIn("my_excluded", c)
+
 
 class TestIsPackage(unittest.TestCase):
 
@@ -416,13 +646,13 @@ class TestDiscover(unittest.TestCase):
 
     @patch("green.loader.os.path.isdir")
     @patch("green.loader.debug")
-    @patch("green.loader.os.listdir")
-    def test_oserror(self, mock_listdir, mock_debug, mock_isdir):
+    @patch("green.loader.os.scandir")
+    def test_oserror(self, mock_scandir, mock_debug, mock_isdir):
         """
         discover() prints a debug message and moves on when ecountering an OSError
         """
         mock_isdir.return_value = True
-        mock_listdir.side_effect = OSError()
+        mock_scandir.side_effect = OSError()
         tmpdir = tempfile.mkdtemp()
         self.addCleanup(shutil.rmtree, tmpdir)
         self.loader.discover(os.path.join(tmpdir, "garbage_in"))
@@ -934,6 +1164,22 @@ class TestLoadTargets(unittest.TestCase):
                 "An exception should have been raised about the syntax error. :-("
             )
 
+    def test_skipped_module_by_dotname(self):
+        """
+        A module loaded by dotname that wants to be skipped gets skipped
+        """
+        sub_tmpdir = tempfile.mkdtemp(dir=self.tmpdir)
+        fh = open(os.path.join(sub_tmpdir, "skipped_by_dotname.py"), "w")
+        fh.write("import unittest\nraise unittest.case.SkipTest('not today')\n")
+        fh.close()
+        os.chdir(sub_tmpdir)
+        suite = self.loader.loadTargets("skipped_by_dotname")
+        self.assertEqual(suite.countTestCases(), 1)
+        self.assertRaises(
+            unittest.case.SkipTest,
+            getattr(suite._tests[0], suite._tests[0]._testMethodName),
+        )
+
     def test_file_pattern(self):
         """
         Specifying a file pattern causes only matching files to be loaded
@@ -989,6 +1235,149 @@ class TestLoadTargets(unittest.TestCase):
         self.assertEqual(tests.countTestCases(), 2)
 
 
+class TestToLazyParallelTargets(unittest.TestCase):
+    def setUp(self):
+        self.startdir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.addCleanup(os.chdir, self.startdir)
+        os.chdir(self.tmpdir)
+        # lazypkg/__init__.py
+        # lazypkg/test_a.py
+        # lazypkg/helpers.py
+        # lazypkg/sub/__init__.py
+        # lazypkg/sub/test_b.py
+        # lazypkg/not-a-package/test_c.py
+        # lazypkg/venv/bin/activate
+        # lazypkg/venv/test_d.py
+        for path in [
+            "__init__.py",
+            "test_a.py",
+            "helpers.py",
+            "sub/__init__.py",
+            "sub/test_b.py",
+            "not-a-package/test_c.py",
+            "venv/bin/activate",
+            "venv/test_d.py",
+        ]:
+            path = pathlib.Path("lazypkg", path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("raise Exception('should not be imported')\n")
+
+    def test_walk(self):
+        """
+        Directories are walked like discover() does, without importing anything.
+        """
+        self.assertEqual(
+            loader.toLazyParallelTargets("."),
+            ["lazypkg.sub.test_b", "lazypkg.test_a"],
+        )
+        self.assertEqual(
+            list(loader.findTestModules("lazypkg", "*.py")),
+            ["lazypkg.__init__", "lazypkg.helpers", "lazypkg.sub.__init__"]
+            + ["lazypkg.sub.test_b", "lazypkg.test_a"],
+        )
+
+    def test_dottedDir(self):
+        """
+        Dotted names of directories are walked too.
+        """
+        self.assertEqual(
+            loader.toLazyParallelTargets(["lazypkg.sub"]), ["lazypkg.sub.test_b"]
+        )
+
+    def test_excludeDirs(self):
+        """
+        Excluded directories are not walked into.
+        """
+        self.assertEqual(
+            loader.toLazyParallelTargets(["."], "test*.py", ["sub"]),
+            ["lazypkg.test_a"],
+        )
+        self.assertEqual(
+            list(loader.findTestFiles(".", "test*.py", ["/sub"])),
+            [os.path.join(".", "lazypkg", "sub", "test_b.py")]
+            + [os.path.join(".", "lazypkg", "test_a.py")],
+        )
+        self.assertEqual(
+            list(loader.findTestFiles(".", "test*.py", ["/lazypkg/sub/"])),
+            [os.path.join(".", "lazypkg", "test_a.py")],
+        )
+
+    def test_otherTargets(self):
+        """
+        Targets that are not directories are left for the workers to load.
+        """
+        self.assertEqual(
+            loader.toLazyParallelTargets(
+                ["lazypkg.test_a.A", os.path.join("lazypkg", "test_a.py"), "."]
+            ),
+            ["lazypkg.test_a.A", "lazypkg.test_a", "lazypkg.sub.test_b"],
+        )
+
+
+class TestExcludeDirs(unittest.TestCase):
+    def excluded(self, patterns, relative_path):
+        excludes = loader.compileExcludeDirs(tuple(patterns))
+        name = relative_path.rpartition("/")[2]
+        return loader.isExcludedDir(name, relative_path, excludes)
+
+    def test_names(self):
+        """
+        Patterns without a slash match directory names at any depth.
+        """
+        self.assertTrue(self.excluded(["node_modules"], "node_modules"))
+        self.assertTrue(self.excluded(["build*"], "src/build_output"))
+        self.assertTrue(self.excluded(["data/"], "src/data"))
+        self.assertFalse(self.excluded(["data"], "src/data2"))
+        self.assertTrue(self.excluded(["dat[a-c]"], "src/datb"))
+        self.assertFalse(self.excluded(["dat[!a-c]"], "src/datb"))
+
+    def test_paths(self):
+        """
+        Patterns with a slash match paths relative to the directory being
+        searched, where ** matches any number of directories.
+        """
+        self.assertTrue(self.excluded(["/docs"], "docs"))
+        self.assertFalse(self.excluded(["/docs"], "src/docs"))
+        self.assertTrue(self.excluded(["src/*"], "src/docs"))
+        self.assertFalse(self.excluded(["src/*"], "src/docs/more"))
+        self.assertTrue(self.excluded(["**/fixtures"], "fixtures"))
+        self.assertTrue(self.excluded(["src/**/fixtures"], "src/a/b/fixtures"))
+        self.assertTrue(self.excluded(["src/**"], "src"))
+
+    def test_negation(self):
+        """
+        Negated patterns include directories again, and the last pattern that
+        matches wins.  Comments and blank patterns are ignored.
+        """
+        patterns = ["# comment", "", "data*", "!data_tests"]
+        self.assertTrue(self.excluded(patterns, "data"))
+        self.assertFalse(self.excluded(patterns, "data_tests"))
+        self.assertTrue(self.excluded(patterns + ["data_*"], "data_tests"))
+
+    def test_discover(self):
+        """
+        discover() skips the excluded directories.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        for pkg in ("kept_pkg", "excluded_pkg"):
+            os.mkdir(os.path.join(tmpdir, pkg))
+            pathlib.Path(tmpdir, pkg, "__init__.py").write_text("")
+            pathlib.Path(tmpdir, pkg, "test_it.py").write_text(
+                "import unittest\nclass A(unittest.TestCase):\n"
+                "    def test_it(self):\n        pass\n"
+            )
+            self.addCleanup(sys.modules.pop, pkg, None)
+            self.addCleanup(sys.modules.pop, f"{pkg}.test_it", None)
+        suite = GreenTestLoader().discover(tmpdir, exclude_dirs=["excluded_*"])
+        self.assertEqual(
+            [x.dotted_name for x in loader.toProtoTestList(suite)],
+            ["kept_pkg.test_it.A.test_it"],
+        )
+
+
 class TestFlattenTestSuite(unittest.TestCase):
     # Setup
     @classmethod
@@ -1,9 +1,16 @@
 from io import StringIO
+import os
+import pickle
 import platform
+import shutil
+import tempfile
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
-from green.output import Colors, GreenStream, debug
+from colorama.ansi import Cursor
+
+from green.output import CaptureBuffer, Colors, ERASE_BELOW, GreenStream, debug
 import green.output
 
 
@@ -162,17 +169,6 @@ class TestGreenStream(unittest.TestCase):
         gs.writelines(["one", "two", "three"])
         self.assertEqual(len(gs.write.mock_calls), 3)
 
-    def testCoverageDetection(self):
-        """
-        write() detects a coverage percentage flying by
-        """
-        s = StringIO()
-        gs = GreenStream(s)
-        gs.write(
-            "\n---------------------------------------------------\nTOTAL                   896    367    59%\nRan"
-        )
-        self.assertEqual(gs.coverage_percent, 59)
-
     def testEncodingMirrors(self):
         """
         The encoding of a stream gets mirrored through
@@ -193,3 +189,166 @@ class TestGreenStream(unittest.TestCase):
         s = MagicMock(spec=1)
         gs = GreenStream(s)
         self.assertEqual(gs.encoding, "UTF-8")
+
+
+class FakeTerminal(StringIO):
+    """
+    A stream that says it is a terminal, and counts how often it is flushed.
+    """
+
+    flushes = 0
+
+    def isatty(self):
+        return True
+
+    def flush(self):
+        self.flushes += 1
+
+
+class TestGreenStreamFrames(unittest.TestCase):
+    def test_notTerminal(self):
+        """
+        Output that is not going to a terminal is written straight away.
+        """
+        s = StringIO()
+        gs = GreenStream(s)
+        gs.startFrames()
+        gs.write(".")
+        self.assertEqual(s.getvalue(), ".")
+        self.assertIsNone(gs.frame_thread)
+
+    def test_coalesced(self):
+        """
+        On a terminal, what is written is held back until the frame is due.
+        """
+        s = FakeTerminal()
+        gs = GreenStream(s)
+        gs.startFrames(frames_per_second=1)
+        self.addCleanup(gs.stopFrames)
+        for char in "..F":
+            gs.write(char)
+            gs.flush()
+        self.assertEqual(s.getvalue(), "")
+        self.assertEqual(s.flushes, 0)
+        gs.stopFrames()
+        self.assertEqual(s.getvalue(), "..F")
+        self.assertEqual(s.flushes, 1)
+        # Back to writing straight away
+        gs.write("E")
+        self.assertEqual(s.getvalue(), "..FE")
+
+    def test_rendered(self):
+        """
+        Once flushed, what is written is rendered without waiting for more.
+        """
+        s = FakeTerminal()
+        gs = GreenStream(s)
+        gs.startFrames(frames_per_second=50)
+        self.addCleanup(gs.stopFrames)
+        gs.write(".")
+        gs.flush()
+        deadline = time.monotonic() + 5
+        while not s.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(s.getvalue(), ".")
+
+    def test_footer(self):
+        """
+        The footer is shown below the output, and erased by the next frame.
+        """
+        s = FakeTerminal()
+        gs = GreenStream(s)
+        gs.startFrames(frames_per_second=1)
+        self.addCleanup(gs.stopFrames)
+        gs.width = 80
+        gs.footer = lambda: "status"
+        gs.write(Colors(termcolor=True).passing(".."))
+        gs.render()
+        self.assertEqual(
+            s.getvalue()[s.getvalue().index("\n") :],
+            "\nstatus" + Cursor.UP(1) + "\r" + Cursor.FORWARD(2),
+        )
+        s.seek(0)
+        s.truncate()
+        gs.write("F\n")
+        gs.render()
+        self.assertEqual(
+            s.getvalue(), ERASE_BELOW + "F\n\nstatus" + Cursor.UP(1) + "\r"
+        )
+        s.seek(0)
+        s.truncate()
+        gs.stopFrames()
+        self.assertEqual(s.getvalue(), ERASE_BELOW)
+
+    def test_column(self):
+        """
+        The column the cursor is left in skips escape codes, and starts over
+        on a new line.
+        """
+        gs = GreenStream(StringIO())
+        gs._moveColumn(Colors(termcolor=True).passing("..."))
+        self.assertEqual(gs.column, 3)
+        gs._moveColumn("..")
+        self.assertEqual(gs.column, 5)
+        gs._moveColumn("done\nnext")
+        self.assertEqual(gs.column, 4)
+        gs._moveColumn("  test\r" + Colors(termcolor=True).bold(". test"))
+        self.assertEqual(gs.column, 6)
+
+
+class TestCaptureBuffer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        patcher = patch("tempfile.tempdir", self.tmpdir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_underLimit(self):
+        """
+        Output within the limit is kept in memory.
+        """
+        buffer = CaptureBuffer(10)
+        buffer.write("hello")
+        buffer.write(" you")
+        self.assertEqual(buffer.getvalue(), "hello you")
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_noLimit(self):
+        """
+        A limit of 0 keeps all of the output in memory.
+        """
+        buffer = CaptureBuffer(0)
+        buffer.write("x" * 10000)
+        self.assertEqual(buffer.getvalue(), "x" * 10000)
+
+    def test_spilled(self):
+        """
+        Output beyond the limit is spilled to a file, and only the beginning
+        and end of it are presented.
+        """
+        buffer = CaptureBuffer(10)
+        buffer.write("abcdefgh")
+        buffer.write("ijklmnop")
+        buffer.write("qrstuvwxyz")
+        spilled = pickle.loads(pickle.dumps(buffer.getvalue()))
+        self.assertEqual(spilled.head, "abcde")
+        self.assertEqual(os.path.dirname(spilled.path), self.tmpdir)
+        with open(spilled.path) as spill_file:
+            self.assertEqual(spill_file.read(), "fghijklmnopqrstuvwxyz")
+        self.assertEqual(spilled.tail(), "vwxyz")
+        self.assertEqual(
+            str(spilled),
+            "abcde\n[... 16 characters not shown, see --capture-limit ...]\nvwxyz",
+        )
+
+    def test_spillFileGone(self):
+        """
+        The beginning of the output is still presented if the file is gone.
+        """
+        buffer = CaptureBuffer(2)
+        buffer.write("abc")
+        spilled = buffer.getvalue()
+        os.remove(spilled.path)
+        self.assertEqual(spilled.tail(), "")
+        self.assertTrue(str(spilled).startswith("a\n[... 2 characters not shown"))
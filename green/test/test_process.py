@@ -1,15 +1,27 @@
 from ctypes import c_double
+import glob
 import os
 import multiprocessing
+import pickle
 from queue import Queue, Empty
 import shutil
+import sys
 import tempfile
 from textwrap import dedent
 import unittest
 from unittest.mock import MagicMock
 
-from green.process import ProcessLogger, poolRunner
+from green.process import (
+    BatchingTargetQueue,
+    LoggingDaemonlessPool,
+    ProcessLogger,
+    poolBatchRunner,
+    poolDiscoverer,
+    poolRunner,
+    TargetQueue,
+)
 from green import process
+from green.result import ProtoTest, ProtoTestResult
 
 
 class TestProcessLogger(unittest.TestCase):
@@ -52,6 +64,169 @@ class TestProcessLogger(unittest.TestCase):
         mock_get_logger.assert_any_call()
 
 
+class TestTargetQueue(unittest.TestCase):
+    def test_tagged(self):
+        """
+        Messages are tagged with the index of their target.
+        """
+        queue = Queue()
+        target_queue = TargetQueue(3, queue)
+        target_queue.put("message")
+        target_queue.put(None)
+        self.assertEqual(queue.get_nowait(), (3, "message"))
+        self.assertEqual(queue.get_nowait(), (3, None))
+
+    def test_workerQueue(self):
+        """
+        Without a queue of its own, the queue of the worker process is used.
+        """
+        queue = Queue()
+        self.addCleanup(
+            setattr, process, "worker_result_queue", process.worker_result_queue
+        )
+        process.worker_result_queue = queue
+        TargetQueue(1).put("message")
+        self.assertEqual(queue.get_nowait(), (1, "message"))
+
+    def test_noQueue(self):
+        """
+        Outside of a worker process, a queue must be given.
+        """
+        self.addCleanup(
+            setattr, process, "worker_result_queue", process.worker_result_queue
+        )
+        process.worker_result_queue = None
+        self.assertRaises(ValueError, TargetQueue(1).put, "message")
+
+
+class TestBatchingTargetQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = Queue()
+        self.target_queue = BatchingTargetQueue(2, self.queue)
+        # Only test_started is about the empty batch sent up front
+        self.target_queue.started = True
+
+    def _result(self, name, failed=False):
+        test = ProtoTest()
+        test.method_name = name
+        result = ProtoTestResult()
+        if failed:
+            result.addFailure(test, (AssertionError, AssertionError("x"), None))
+        else:
+            result.addSuccess(test)
+        return result
+
+    def test_batched(self):
+        """
+        Results are sent together with the end of the target, tests starting are not.
+        """
+        self.target_queue.put(ProtoTest())
+        self.target_queue.put(self._result("one"))
+        self.target_queue.put(self._result("two"))
+        self.assertTrue(self.queue.empty())
+        self.target_queue.put(None)
+        index, batch = self.queue.get_nowait()
+        self.assertEqual(index, 2)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch[0].passing[0].method_name, "one")
+        self.assertEqual(batch[1].passing[0].method_name, "two")
+        self.assertIsNone(batch[2])
+        self.assertTrue(self.queue.empty())
+
+    def test_started(self):
+        """
+        An empty batch is sent as soon as the first test starts.
+        """
+        target_queue = BatchingTargetQueue(3, self.queue)
+        target_queue.put(ProtoTest())
+        self.assertEqual(self.queue.get(timeout=5), (3, []))
+        target_queue.put(ProtoTest())
+        target_queue.put(None)
+        self.assertEqual(self.queue.get(timeout=5), (3, [None]))
+
+    def test_failure(self):
+        """
+        A batch is sent as soon as a test did not succeed.
+        """
+        self.target_queue.put(self._result("one"))
+        self.target_queue.put(self._result("two", failed=True))
+        index, batch = self.queue.get_nowait()
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(len(batch[1].failures), 1)
+
+    def test_size(self):
+        """
+        A batch is sent once it is full.
+        """
+        for i in range(process.RESULT_BATCH_SIZE + 1):
+            self.target_queue.put(self._result(str(i)))
+        index, batch = self.queue.get_nowait()
+        self.assertEqual(len(batch), process.RESULT_BATCH_SIZE)
+        self.assertTrue(self.queue.empty())
+
+    def test_age(self):
+        """
+        A batch is sent once its first result has waited long enough, without
+        waiting for anything else to be put.
+        """
+        self.addCleanup(
+            setattr, process, "RESULT_BATCH_SECONDS", process.RESULT_BATCH_SECONDS
+        )
+        process.RESULT_BATCH_SECONDS = 0.01
+        self.target_queue.put(self._result("one"))
+        index, batch = self.queue.get(timeout=5)
+        self.assertEqual(len(batch), 1)
+        self.assertIsNone(self.target_queue.timer)
+        self.target_queue.put(None)
+        self.assertEqual(self.queue.get(timeout=5), (2, [None]))
+
+    def test_pickled(self):
+        """
+        The queue can be sent to a worker, which makes its own lock.
+        """
+        target_queue = BatchingTargetQueue(4)
+        unpickled = pickle.loads(pickle.dumps(target_queue))
+        self.assertEqual(unpickled.index, 4)
+        self.assertIsNone(unpickled.timer)
+        self.assertIsNot(unpickled.lock, target_queue.lock)
+
+    def test_copied(self):
+        """
+        Results are copied, since the poolRunner reuses them.
+        """
+        result = self._result("one")
+        self.target_queue.put(result)
+        result.passing = []
+        self.target_queue.put(None)
+        index, batch = self.queue.get_nowait()
+        self.assertEqual(batch[0].passing[0].method_name, "one")
+
+
+class TestLoggingDaemonlessPool(unittest.TestCase):
+    def setUp(self):
+        self.startdir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.addCleanup(os.chdir, self.startdir)
+        os.chdir(self.tmpdir)
+
+    def test_coverage(self):
+        """
+        Each worker measures coverage into a single data file, however many
+        tasks it runs.
+        """
+        pool = LoggingDaemonlessPool(
+            processes=1,
+            context=multiprocessing.get_context("spawn"),
+            coverage_options=(None, False, False),
+        )
+        async_results = [pool.apply_async(poolBatchRunner, ([],)) for _ in range(3)]
+        pool.close()
+        pool.join()
+        self.assertEqual([x.get() for x in async_results], [[], [], []])
+        self.assertEqual(len(glob.glob(".coverage.*")), 1)
+
+
 class TestPoolRunner(unittest.TestCase):
     # Setup
     @classmethod
@@ -110,6 +285,69 @@ class TestPoolRunner(unittest.TestCase):
         self.assertEqual(len(result.passing), 1)
         self.assertGreater(float(result.test_time), 0)
 
+    def test_aborted(self):
+        """
+        Once the run has been aborted, the target is skipped.
+        """
+        abort_event = multiprocessing.Event()
+        abort_event.set()
+        self.addCleanup(
+            setattr, process, "worker_abort_event", process.worker_abort_event
+        )
+        process.worker_abort_event = abort_event
+        results = Queue()
+        self.assertIsNone(poolRunner("some.target", results))
+        self.assertIsNone(results.get_nowait())
+        self.assertRaises(Empty, results.get_nowait)
+
+    def test_batch(self):
+        """
+        A batch runs each target, reporting on its own queue.
+        """
+        saved_coverage = process.coverage
+        process.coverage = MagicMock()
+        self.addCleanup(setattr, process, "coverage", saved_coverage)
+        os.chdir(self.tmpdir)
+        for name in ("test_batch_a", "test_batch_b"):
+            with open(name + ".py", "w") as fh:
+                fh.write(
+                    dedent(
+                        """
+                    import unittest
+                    class A(unittest.TestCase):
+                        def testPass(self):
+                            pass
+                    """
+                    )
+                )
+        queue = Queue()
+        elapsed = poolBatchRunner(
+            [
+                ("test_batch_a", TargetQueue(0, queue), {}),
+                ("test_batch_b", TargetQueue(1, queue), {}),
+            ]
+        )
+        self.assertEqual(len(elapsed), 2)
+        self.assertTrue(all(x > 0 for x in elapsed))
+        messages = []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+        self.assertEqual([x for x in messages if x[1] is None], [(0, None), (1, None)])
+        # Coverage is left to the worker process
+        process.coverage.coverage.assert_not_called()
+
+    def test_noTests(self):
+        """
+        A module without any tests in it is not an error
+        """
+        os.chdir(self.tmpdir)
+        with open("test_pool_no_tests.py", "w") as fh:
+            fh.write("import unittest\n")
+        results = Queue()
+        poolRunner("test_pool_no_tests", results)
+        self.assertIsNone(results.get_nowait())
+        self.assertRaises(Empty, results.get_nowait)
+
     def test_SyntaxErrorInUnitTest(self):
         """
         SyntaxError gets reported as an error loading the unit test
@@ -216,3 +454,61 @@ class TestPoolRunner(unittest.TestCase):
         val = multiprocessing.Value(c_double, 0)
         # The error happens when something tries to clean up a sub-temporary
         # directory that they assume will always be there to be cleaned up.
+
+
+class TestPoolDiscoverer(unittest.TestCase):
+    def setUp(self):
+        startdir = os.getcwd()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.addCleanup(os.chdir, startdir)
+        os.chdir(tmpdir)
+        for name in ("found", "empty", "broken"):
+            self.addCleanup(sys.modules.pop, f"test_pool_discovered_{name}", None)
+
+    def test_discovered(self):
+        """
+        The tests of each target are returned, along with their index entry,
+        or why they could not be loaded.
+        """
+        with open("test_pool_discovered_found.py", "w") as fh:
+            fh.write(
+                dedent(
+                    """
+                    import unittest
+                    class A(unittest.TestCase):
+                        def test_one(self):
+                            pass
+                        def test_two(self):
+                            pass
+                    """
+                )
+            )
+        with open("test_pool_discovered_empty.py", "w") as fh:
+            fh.write("import unittest\n")
+        with open("test_pool_discovered_broken.py", "w") as fh:
+            fh.write("aoeu(\n")
+        found, empty, broken = poolDiscoverer(
+            [
+                "test_pool_discovered_found",
+                "test_pool_discovered_empty",
+                "test_pool_discovered_broken",
+            ]
+        )
+        target, tests, failure, (path, entry) = found
+        self.assertEqual(target, "test_pool_discovered_found")
+        self.assertEqual(
+            tests,
+            [
+                "test_pool_discovered_found.A.test_one",
+                "test_pool_discovered_found.A.test_two",
+            ],
+        )
+        self.assertEqual(failure, "")
+        self.assertEqual(path, os.path.abspath("test_pool_discovered_found.py"))
+        self.assertEqual(entry["tests"], tests)
+        self.assertEqual(empty[1:3], ([], ""))
+        self.assertEqual(empty[3][1]["tests"], [])
+        self.assertEqual(broken[1], [])
+        self.assertIn("SyntaxError", broken[2])
+        self.assertIsNone(broken[3])
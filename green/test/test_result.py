@@ -6,13 +6,16 @@ import copy
 # of a test to actually try to run, and causes very weird crashes.
 import doctest
 from io import StringIO
+import os
+import pickle
 import sys
+import traceback
 import unittest
 from unittest.mock import MagicMock, patch
 import tempfile
 
 from green.config import get_default_args
-from green.output import Colors, GreenStream
+from green.output import CaptureBuffer, Colors, GreenStream
 from green.result import (
     GreenTestResult,
     proto_test,
@@ -20,6 +23,7 @@ from green.result import (
     proto_error,
     ProtoTestResult,
     BaseTestResult,
+    RunProgress,
 )
 
 from coverage import coverage, CoverageException
@@ -193,7 +197,7 @@ class TestProtoTestResult(unittest.TestCase):
         addSubTest calls over to addFailure for failures
         """
         ptr = ProtoTestResult()
-        test = proto_test(MagicMock())
+        test = MagicMock()
         test.failureException = Exception
         subtest = MagicMock()
         err = [Exception]
@@ -207,13 +211,58 @@ class TestProtoTestResult(unittest.TestCase):
         addSubTest calls over to addError for errors
         """
         ptr = ProtoTestResult()
-        test = proto_test(MagicMock())
+        test = MagicMock()
         test.failureException = KeyError
         subtest = MagicMock()
         err = [Exception]
         ptr.addSubTest(test, subtest, err)
         mock_addError.assert_called_with(subtest, err)
 
+    def test_testIds(self):
+        """
+        Tests get the IDs they were given, if any.
+        """
+        ptr = ProtoTestResult(test_ids={"my_module.MyClass.myMethod": 7})
+        known, unknown = MyProtoTest(), MyProtoTest()
+        unknown.method_name = "other"
+        ptr.addSuccess(known)
+        ptr.addSuccess(unknown)
+        self.assertEqual([x.test_id for x in ptr.passing], [7, None])
+
+    def test_pickle(self):
+        """
+        Outcomes and captured output survive being pickled.
+        """
+        ptr = ProtoTestResult(MagicMock(), MagicMock())
+        passing, failing, skipped, other = (MyProtoTest() for _ in range(4))
+        failing.method_name = "failing"
+        skipped.method_name = "skipped"
+        other.method_name = "other"
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            err = sys.exc_info()
+        ptr.addSuccess(passing)
+        ptr.addFailure(failing, err)
+        ptr.addSkip(skipped, "why not")
+        ptr.recordStdout(MyProtoTest(), "out")
+        ptr.recordStderr(failing, "err")
+        ptr.recordStdout(other, "other out")
+        ptr.test_time = "1.5"
+        ptr.shouldStop = True
+        unpickled = pickle.loads(pickle.dumps(ptr))
+        self.assertIsNone(unpickled.start_callback)
+        self.assertIsNone(unpickled.finalize_callback)
+        self.assertEqual(unpickled.test_time, "1.5")
+        self.assertTrue(unpickled.shouldStop)
+        self.assertEqual(unpickled.passing, [passing])
+        self.assertEqual(unpickled.skipped, [(skipped, "why not")])
+        self.assertEqual(unpickled.failures[0][0], failing)
+        self.assertIn("boom", str(unpickled.failures[0][1]))
+        self.assertEqual(unpickled.errors, [])
+        self.assertEqual(unpickled.stdout_output, {passing: "out", other: "other out"})
+        self.assertEqual(unpickled.stderr_errput, {failing: "err"})
+
 
 class TestProtoError(unittest.TestCase):
     def test_str(self):
@@ -228,6 +277,47 @@ class TestProtoError(unittest.TestCase):
         pe = proto_error(err)
         self.assertIn(test_str, str(pe))
 
+    def test_pickle(self):
+        """
+        A ProtoError survives being pickled.
+        """
+        try:
+            raise Exception("noetuaoe")
+        except:
+            err = sys.exc_info()
+        pe = pickle.loads(pickle.dumps(proto_error(err)))
+        self.assertIn("noetuaoe", str(pe))
+
+    def test_chain(self):
+        """
+        Chained exceptions are kept, and formatted like the traceback module does.
+        """
+        try:
+            try:
+                raise KeyError("inner")
+            except KeyError as e:
+                raise ValueError("outer") from e
+        except:
+            err = sys.exc_info()
+        pe = pickle.loads(pickle.dumps(proto_error(err)))
+        self.assertEqual(len(pe.chain), 2)
+        self.assertEqual(pe.chain[1][2], ("ValueError: outer\n",))
+        self.assertEqual(pe.chain[0][1][-1][2], "test_chain")
+        self.assertEqual(pe.traceback_lines, traceback.format_exception(*err))
+
+    def test_lazy(self):
+        """
+        The source lines are only looked up when the traceback is formatted.
+        """
+        try:
+            raise Exception("noetuaoe")
+        except:
+            err = sys.exc_info()
+        with patch("linecache.getline") as getline:
+            pe = proto_error(err)
+            getline.assert_not_called()
+        self.assertIn('raise Exception("noetuaoe")', str(pe))
+
 
 class TestProtoTest(unittest.TestCase):
     def test_ProtoTestBlank(self):
@@ -361,6 +451,49 @@ class TestProtoTest(unittest.TestCase):
         # dotted name
         self.assertEqual(p.dotted_name, "doctest.name")
 
+    def test_pickle(self):
+        """
+        All the attributes of a ProtoTest survive being pickled, and the
+        rarely set ones are left out while they have their defaults.
+        """
+        pt = MyProtoTest()
+        pt.subtest_part = " (i=1)"
+        data = pickle.dumps(pt)
+        self.assertNotIn(b"is_doctest", data)
+        unpickled = pickle.loads(data)
+        self.assertEqual(unpickled.dotted_name, "my_module.MyClass.myMethod (i=1)")
+        self.assertEqual(unpickled.docstr_part, "My docstring")
+        self.assertFalse(unpickled.is_doctest)
+        self.assertIsNone(unpickled.lineno)
+        pt.is_doctest = True
+        pt.name = "doctest.name"
+        pt.lineno = 20
+        unpickled = pickle.loads(pickle.dumps(pt))
+        self.assertTrue(unpickled.is_doctest)
+        self.assertEqual(unpickled.dotted_name, "doctest.name")
+        self.assertEqual(unpickled.lineno, 20)
+
+    def test_testId(self):
+        """
+        ProtoTests which both have IDs are told apart by their IDs, others by
+        their dotted names, which their hash always comes from.
+        """
+        first, second = MyProtoTest(), MyProtoTest()
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        first.test_id = 1
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        # The dotted name is built once it is used
+        second = MyProtoTest()
+        second.method_name = "renamed"
+        self.assertNotEqual(first, second)
+        second.test_id = 1
+        self.assertEqual(first, second)
+        second.test_id = 2
+        self.assertNotEqual(first, second)
+        self.assertEqual(pickle.loads(pickle.dumps(first)).test_id, 1)
+
     def test_class_or_module_failure(self):
         """
         If we parse an error from a class or module failure, we get the correct result.
@@ -771,6 +904,29 @@ class TestGreenTestResult(unittest.TestCase):
         self.assertIn("raise Exception", self.stream.getvalue())
         self.assertIn("Error", self.stream.getvalue())
 
+    def test_printErrorsGrouped(self):
+        """
+        printErrors() shows identical tracebacks only once.
+        """
+        self.args.verbose = 1
+        self.args.termcolor = False
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        errors = []
+        for i in range(3):
+            try:
+                raise Exception("shared" if i < 2 else "different")
+            except:
+                errors.append(proto_error(sys.exc_info()))
+            test = MyProtoTest()
+            test.method_name = f"myMethod{i}"
+            gtr.addError(test, errors[-1])
+        gtr.printErrors()
+        output = self.stream.getvalue()
+        self.assertIn("my_module.MyClass.myMethod0 and 1 more", output)
+        self.assertIn("same traceback in\n  my_module.MyClass.myMethod1\n", output)
+        self.assertEqual(output.count("Exception: shared"), 1)
+        self.assertEqual(output.count("Exception: different"), 1)
+
     def test_addProtoTestResult(self):
         """
         addProtoTestResult adds the correct things to the correct places.
@@ -819,6 +975,65 @@ class TestGreenTestResult(unittest.TestCase):
         self.assertEqual(gtr.skipped, [(skip_t, skip_r)])
         self.assertEqual(gtr.unexpectedSuccesses, [us_t])
 
+    def test_testIds(self):
+        """
+        Tests without an ID get a new one, and captured output is still
+        matched up with tests that only got their ID from the main process.
+        """
+        self.args.verbose = 0
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        gtr.test_ids["my_module.MyClass.myMethod"] = 0
+        ptr = ProtoTestResult()
+        known, unknown = MyProtoTest(), MyProtoTest()
+        unknown.method_name = "other"
+        ptr.addSuccess(known)
+        ptr.addSuccess(unknown)
+        ptr.recordStdout(unknown, "output")
+        ptr.recordStderr(unknown, "errput")
+        gtr.addProtoTestResult(pickle.loads(pickle.dumps(ptr)))
+        self.assertEqual([x.test_id for x in gtr.passing], [0, 1])
+        self.assertEqual(list(gtr.stdout_output.values()), ["output"])
+        self.assertEqual(list(gtr.stderr_errput.values()), ["errput"])
+        self.assertIn(gtr.passing[1], gtr.stdout_output)
+        self.assertIn(gtr.passing[1], gtr.stderr_errput)
+
+    def test_numberTests(self):
+        """
+        The tests sent to the workers are numbered in test_ids, unless the
+        results are streamed, when their IDs are not kept.
+        """
+        self.args.verbose = 0
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        self.assertEqual(gtr.numberTests(["a", "b"]), {"a": 0, "b": 1})
+        self.assertEqual(gtr.numberTests(["b", "c"]), {"b": 1, "c": 2})
+        self.assertEqual(gtr.test_ids, {"a": 0, "b": 1, "c": 2})
+        self.args.stream_results = True
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        self.assertEqual(gtr.numberTests(["a", "b"]), {"a": 0, "b": 1})
+        self.assertEqual(gtr.numberTests(["c"]), {"c": 2})
+        self.assertEqual(gtr.protoTest(MyProtoTest()).test_id, 3)
+        self.assertEqual(gtr.test_ids, {})
+
+    def test_stopTestRun_removesSpilledOutput(self):
+        """
+        The files that output over the capture limit spilled to are deleted
+        once the errors have been printed.
+        """
+        self.args.verbose = 0
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        buffer = CaptureBuffer(2)
+        buffer.write("spilled output")
+        ptr = ProtoTestResult()
+        test = MyProtoTest()
+        ptr.addFailure(test, proto_error((AssertionError, AssertionError(), None)))
+        ptr.recordStdout(test, buffer.getvalue())
+        gtr.startTestRun()
+        gtr.addProtoTestResult(pickle.loads(pickle.dumps(ptr)))
+        self.assertTrue(os.path.exists(buffer.spill_path))
+        gtr.stopTestRun()
+        self.assertIn("characters not shown", self.stream.getvalue())
+        self.assertFalse(os.path.exists(buffer.spill_path))
+
     def test_stopTestRun_processes_message(self):
         """
         StopTestRun adds number of processes used to summary
@@ -841,6 +1056,130 @@ class TestGreenTestResult(unittest.TestCase):
 
         self.assertIn("using 1 process\n", self.stream.getvalue())
 
+    def test_streaming(self):
+        """
+        When streaming, only the failures are kept, and the rest is counted.
+        """
+        self.args.verbose = 1
+        self.args.termcolor = False
+        self.args.stream_results = True
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        gtr.startTestRun()
+        passing = MyProtoTest()
+        gtr.recordStdout(passing, "passing output")
+        gtr.addSuccess(passing)
+        gtr.addSkip(MyProtoTest(), "reason")
+        failing = MyProtoTest()
+        failing.method_name = "failing"
+        try:
+            raise Exception("boom")
+        except:
+            err = proto_error(sys.exc_info())
+        gtr.recordStdout(failing, "failing output")
+        gtr.addFailure(failing, err)
+        self.assertEqual(list(gtr.passing), [])
+        self.assertEqual(list(gtr.skipped), [])
+        self.assertEqual(gtr.failures, [(failing, err)])
+        self.assertEqual(list(gtr.stdout_output), [failing])
+        gtr.stopTestRun()
+        output = self.stream.getvalue()
+        self.assertIn("failing output", output)
+        self.assertNotIn("passing output", output)
+        self.assertIn("FAILED (failures=1, passes=1, skips=1)", output)
+
+    def test_reporters(self):
+        """
+        Reporters are told about each result as it arrives.
+        """
+        self.args.verbose = 1
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        reporter = MagicMock()
+        gtr.reporters.append(reporter)
+        gtr.startTestRun()
+        reporter.startTestRun.assert_called_once_with(gtr)
+        test = MyProtoTest()
+        gtr.recordStderr(test, "errput")
+        gtr.addSkip(test, "reason")
+        reporter.addResult.assert_called_once_with(
+            "skipped", test, "reason", None, "errput"
+        )
+        gtr.stopTestRun()
+        reporter.stopTestRun.assert_called_once_with(gtr)
+
+    def test_statusLine(self):
+        """
+        The status line shows how far along the run is.
+        """
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        self.assertEqual(gtr.statusLine(), "")
+        progress = RunProgress(10, {}, 4)
+        gtr.startProgress(progress)
+        self.assertEqual(gtr.stream.footer, gtr.statusLine)
+        progress.startTarget("a")
+        gtr.testsRun = 5
+        progress.start_time -= 2
+        self.assertEqual(
+            gtr.statusLine(), "5/10 tests  2/s  1/4 processes busy  ETA 0:02"
+        )
+        # Tests are still running, so the ETA is never 0:00
+        gtr.testsRun = 9
+        self.assertTrue(gtr.statusLine().endswith("ETA 0:01"))
+
+    def test_statusLineLazy(self):
+        """
+        Without a total or any durations, there is no ETA.
+        """
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        gtr.startProgress(RunProgress(None, {}, 2))
+        gtr.testsRun = 3
+        self.assertTrue(gtr.statusLine().startswith("3 tests  "))
+        self.assertNotIn("ETA", gtr.statusLine())
+
+
+class TestRunProgress(unittest.TestCase):
+    def test_secondsLeft(self):
+        """
+        The estimates of the targets left are shared out between the processes.
+        """
+        progress = RunProgress(None, {"a": 40.0, "b": 20.0, "c": 20.0}, 2)
+        self.assertEqual(progress.secondsLeft(0), 40.0)
+        progress.stopTarget("a")
+        self.assertEqual(progress.secondsLeft(0), 20.0)
+
+    def test_runningTargets(self):
+        """
+        Running targets have less time left, but never less than none.
+        """
+        progress = RunProgress(None, {"a": 10.0, "b": 20.0}, 1)
+        progress.startTarget("a")
+        progress.running["a"] -= 4
+        self.assertAlmostEqual(progress.secondsLeft(0), 26.0, places=1)
+        progress.running["a"] -= 100
+        self.assertAlmostEqual(progress.secondsLeft(0), 20.0, places=1)
+
+    def test_pace(self):
+        """
+        Without estimates, the tests left go as fast as the ones done.
+        """
+        progress = RunProgress(30, {}, 4)
+        self.assertIsNone(progress.secondsLeft(0))
+        progress.start_time -= 10
+        self.assertAlmostEqual(progress.secondsLeft(10), 20.0, places=1)
+        self.assertIsNone(progress.secondsLeft(30))
+
+    def test_estimatesRunOut(self):
+        """
+        Once the estimates have all run out, the tests left go as fast as the
+        ones done, if there is a total to go by.
+        """
+        progress = RunProgress(30, {"a": 1.0}, 1)
+        progress.startTarget("a")
+        progress.running["a"] -= 5
+        progress.start_time -= 10
+        self.assertAlmostEqual(progress.secondsLeft(10), 20.0, places=1)
+        progress.total = None
+        self.assertIsNone(progress.secondsLeft(10))
+
 
 class TestGreenTestResultAdds(unittest.TestCase):
     def setUp(self):
@@ -950,7 +1289,7 @@ class TestGreenTestResultAdds(unittest.TestCase):
         test = proto_test(MagicMock())
         reason = "Twisted is odd"
         err = proto_error(err)
-        err.traceback_lines = [f"UnsupportedTrialFeature: ('skip', '{reason}')"]
+        err.chain = (("", (), (f"UnsupportedTrialFeature: ('skip', '{reason}')\n",)),)
         self.gtr.addFailure(test, err)
         self.gtr._reportOutcome.assert_called_with(
             test, "s", self.gtr.colors.skipped, reason=reason
@@ -1092,6 +1431,21 @@ class TestGreenTestResultAdds(unittest.TestCase):
         gtr.coverage_percent = 60
         self.assertEqual(gtr.wasSuccessful(), True)
 
+    def test_wasSuccessful_coverageRounded(self):
+        """
+        The coverage percentage is rounded to the precision of the coverage
+        report before it is compared with the minimum.
+        """
+        self.args.minimum_coverage = 90
+        self.args.cov = MagicMock()
+        self.args.cov.config.precision = 0
+        gtr = GreenTestResult(self.args, GreenStream(self.stream))
+        gtr.passing.append("anything")
+        gtr.coverage_percent = 89.6
+        self.assertEqual(gtr.wasSuccessful(), True)
+        self.args.cov.config.precision = 1
+        self.assertEqual(gtr.wasSuccessful(), False)
+
 
 class TestGreenTestRunCoverage(unittest.TestCase):
     def setUp(self):
@@ -1117,10 +1471,10 @@ class TestGreenTestRunCoverage(unittest.TestCase):
             def runTest(self):
                 pass
 
-        gtr = GreenTestResult(args, GreenStream(self.stream))
-        gtr.startTestRun()
-        gtr.startTest(FakeCase())
-        gtr.stopTestRun()
+        self.gtr = GreenTestResult(args, GreenStream(self.stream))
+        self.gtr.startTestRun()
+        self.gtr.startTest(FakeCase())
+        self.gtr.stopTestRun()
         output = self.stream.getvalue()
         return output.split("\n")
 
@@ -1128,9 +1482,37 @@ class TestGreenTestRunCoverage(unittest.TestCase):
         self.args.run_coverage = True
         output = self._outputFromTest(self.args)
         self.assertIn("Stmts   Miss  Cover   Missing", "\n".join(output))
+        self.assertIsInstance(self.gtr.coverage_percent, float)
 
     def test_quiet_coverage(self):
         self.args.run_coverage = True
         self.args.quiet_coverage = True
         output = self._outputFromTest(self.args)
         self.assertNotIn("Stmts   Miss  Cover   Missing", "\n".join(output))
+
+    def test_quiet_minimum_coverage(self):
+        """
+        The minimum coverage is enforced without showing the coverage report.
+        """
+        self.args.run_coverage = True
+        self.args.quiet_coverage = True
+        self.args.minimum_coverage = 101
+        output = self._outputFromTest(self.args)
+        self.assertNotIn("Stmts   Miss  Cover   Missing", "\n".join(output))
+        self.assertIsInstance(self.gtr.coverage_percent, float)
+        self.assertFalse(self.gtr.wasSuccessful())
+
+    @patch("coverage.version_info", (6, 5, 0, "final", 0))
+    def test_quiet_minimum_coverage_old(self):
+        """
+        Versions of coverage before 7.0, which can only render the full
+        report, still enforce the minimum coverage.
+        """
+        self.args.run_coverage = True
+        self.args.quiet_coverage = True
+        self.args.minimum_coverage = 101
+        with patch.object(coverage, "report", return_value=50.0) as report:
+            output = self._outputFromTest(self.args)
+        self.assertNotIn("output_format", report.call_args.kwargs)
+        self.assertNotIn("Stmts   Miss  Cover   Missing", "\n".join(output))
+        self.assertFalse(self.gtr.wasSuccessful())
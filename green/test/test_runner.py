@@ -1,4 +1,5 @@
 import copy
+import multiprocessing
 from io import StringIO
 import os
 import pathlib
@@ -13,14 +14,30 @@ from unittest import mock
 import warnings
 import weakref
 
+from green.cache import readCache, writeCache
 from green.config import get_default_args
 from green.exceptions import InitializerOrFinalizerError
+from green.index import DiscoveryIndex
 from green.loader import GreenTestLoader
 from green.output import GreenStream
-from green.runner import InitializerOrFinalizer, run
+from green.runner import (
+    batchTargets,
+    estimateTargetDurations,
+    FailuresReporter,
+    failureTarget,
+    findHeavyTargets,
+    hasFailed,
+    InitializerOrFinalizer,
+    ResultMultiplexer,
+    run,
+    selectFailedTargets,
+    selectLoadableFailures,
+    sortTargetsByDuration,
+    updateFailures,
+)
+from green.result import GreenTestResult, ProtoTest, ProtoTestResult, RunProgress
 from green.suite import GreenTestSuite
 
-
 skip_testtools = False
 try:
     import testtools
@@ -97,6 +114,295 @@ class TestInitializerOrFinalizer(unittest.TestCase):
         self.assertRaises(InitializerOrFinalizerError, initializer)
 
 
+class TestSortTargetsByDuration(unittest.TestCase):
+    def test_noHistory(self):
+        """
+        Without recorded durations, targets with more tests go first.
+        """
+        counts = {"small": 1, "big": 10, "medium": 5}
+        self.assertEqual(sortTargetsByDuration(counts, {}), ["big", "medium", "small"])
+
+    def test_history(self):
+        """
+        Recorded durations win over test counts.
+        """
+        counts = {"small": 1, "big": 10}
+        durations = {"small": 90.0, "big": 1.0}
+        self.assertEqual(sortTargetsByDuration(counts, durations), ["small", "big"])
+
+    def test_ties(self):
+        """
+        Targets with equal estimates keep their discovery order.
+        """
+        counts = {"a": 1, "b": 1, "c": 1}
+        self.assertEqual(sortTargetsByDuration(counts, {}), ["a", "b", "c"])
+
+    def test_estimateUntimed(self):
+        """
+        Targets never timed are estimated at the speed of the timed ones.
+        """
+        estimates = estimateTargetDurations({"timed": 4, "new": 2}, {"timed": 2.0})
+        self.assertEqual(estimates, {"timed": 2.0, "new": 1.0})
+
+
+class TestBatchTargets(unittest.TestCase):
+    def test_tiny(self):
+        """
+        Tiny targets are batched together, longest-first.
+        """
+        counts = {f"t{i}": 1 for i in range(24)}
+        counts["big"] = 8
+        batches = batchTargets(counts, {}, 1)
+        self.assertEqual(batches[0], ["big"])
+        self.assertEqual(len(batches), 7)
+        self.assertTrue(all(len(x) == 4 for x in batches[1:]))
+        self.assertEqual(sum(batches, []), sortTargetsByDuration(counts, {}))
+
+    def test_fewTargets(self):
+        """
+        A handful of targets each get a task of their own.
+        """
+        counts = {"a": 2, "b": 1, "c": 1}
+        self.assertEqual(batchTargets(counts, {}, 4), [["a"], ["b"], ["c"]])
+
+
+class TestFindHeavyTargets(unittest.TestCase):
+    def test_heavy(self):
+        """
+        Targets longer than an even share of the run across processes are heavy.
+        """
+        counts = {"big": 10, "medium": 4, "small": 2}
+        self.assertEqual(findHeavyTargets(counts, {}, 2), ["big"])
+        self.assertEqual(findHeavyTargets(counts, {}, 5), ["big", "medium"])
+
+    def test_singleProcess(self):
+        """
+        With one process nothing is worth splitting.
+        """
+        self.assertEqual(findHeavyTargets({"only": 100}, {}, 1), [])
+
+    def test_history(self):
+        """
+        Recorded durations decide which targets are heavy.
+        """
+        counts = {"big": 10, "slow": 1}
+        durations = {"big": 1.0, "slow": 30.0}
+        self.assertEqual(findHeavyTargets(counts, durations, 2), ["slow"])
+
+
+def protoTest(dotted_name):
+    test = ProtoTest()
+    test.module, test.class_name, test.method_name = dotted_name.rsplit(".", 2)
+    return test
+
+
+class TestFailures(unittest.TestCase):
+    def test_failureTarget(self):
+        """
+        Failed tests are turned into targets which run them again.
+        """
+        test = protoTest("pkg.test_mod.Class.test_method")
+        test.subtest_part = " (i=1)"
+        self.assertEqual(failureTarget(test), "pkg.test_mod.Class.test_method")
+        test = protoTest("green.loader.ModuleImportFailure.pkg.test_broken")
+        test.class_name = "ModuleImportFailure"
+        test.method_name = "pkg.test_broken"
+        self.assertEqual(failureTarget(test), "pkg.test_broken")
+        test = ProtoTest()
+        test.is_class_or_module_teardown_error = True
+        self.assertIsNone(failureTarget(test))
+
+    def test_updateFailures(self):
+        """
+        Failures are replaced by the outcome of the tests that ran again.
+        """
+        reporter = FailuresReporter(
+            ["m.C.test_fixed", "m.C.test_other", "n.C.test_skipped", "n"]
+        )
+        reporter.addResult("passing", protoTest("m.C.test_fixed"), None, None, None)
+        reporter.addResult("failures", protoTest("m.C.test_new"), None, None, None)
+        reporter.addResult(
+            "skipped", protoTest("n.C.test_skipped"), "reason", None, None
+        )
+        teardown = ProtoTest()
+        teardown.is_class_or_module_teardown_error = True
+        reporter.addResult("errors", teardown, None, None, None)
+        self.assertEqual(updateFailures(reporter), ["m.C.test_new", "m.C.test_other"])
+        # Only the previous failures which ran are kept track of
+        self.assertEqual(reporter.ran, {"m.C.test_fixed", "n.C.test_skipped", "n"})
+
+    def test_updateFailuresRanInFull(self):
+        """
+        Failures inside of the targets which ran in full are dropped, whether
+        or not they ran again.
+        """
+        reporter = FailuresReporter(["m.C.test_gone", "n.C.test_other"])
+        reporter.addResult("failures", protoTest("m.C.test_new"), None, None, None)
+        self.assertEqual(
+            updateFailures(reporter, ["m.C"]),
+            ["m.C.test_new", "n.C.test_other"],
+        )
+
+    def test_selectLoadableFailures(self):
+        """
+        Failures which no longer load any test are left out, going by the
+        discovery index for the modules in it.
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        startdir = os.getcwd()
+        os.chdir(tmpdir)
+        self.addCleanup(os.chdir, startdir)
+        content = "import unittest\nclass C(unittest.TestCase):\n"
+        content += "    def test_one(self):\n        pass\n"
+        pathlib.Path("test_loadable.py").write_text(content)
+        index = DiscoveryIndex(os.path.join(tmpdir, "cache"))
+        failures = ["test_loadable.C.test_one", "test_loadable.C.test_gone"]
+        self.assertEqual(selectLoadableFailures(failures, index), failures[:1])
+        self.addCleanup(sys.modules.pop, "test_loadable", None)
+        index.add("test_loadable", ["test_loadable.C.test_two"])
+        index.save()
+        with mock.patch("green.runner.GreenTestLoader") as loader:
+            self.assertEqual(selectLoadableFailures(failures, index), [])
+        loader.assert_not_called()
+
+    def test_selectFailedTargets(self):
+        """
+        Only the failures inside of the targets are selected.
+        """
+        failures = ["a.b.C.test_one", "a.bc.C.test_two", "d.C.test_three"]
+        self.assertEqual(selectFailedTargets(["a.b", "d"], failures), failures[::2])
+        self.assertEqual(selectFailedTargets(["x"], failures), [])
+
+    def test_hasFailed(self):
+        """
+        Targets that run a failure again, or part of one, have failed.
+        """
+        failures = ["a.b.C.test_one", "d"]
+        self.assertTrue(hasFailed("a.b", failures))
+        self.assertTrue(hasFailed("d.C", failures))
+        self.assertFalse(hasFailed("a.bc", failures))
+
+
+class TestResultMultiplexer(unittest.TestCase):
+    def setUp(self):
+        self.result = mock.MagicMock()
+        self.result.shouldStop = False
+        self.reported = []
+        self.result.addProtoTestResult.side_effect = self.reported.append
+
+    def _messages(self, name):
+        test = ProtoTest()
+        test.method_name = name
+        proto_test_result = ProtoTestResult()
+        proto_test_result.addSuccess(test)
+        return test, proto_test_result
+
+    def test_completionOrder(self):
+        """
+        Results are reported as soon as they arrive, whatever their target.
+        """
+        multiplexer = ResultMultiplexer(self.result, 2)
+        test0, result0 = self._messages("zero")
+        test1, result1 = self._messages("one")
+        multiplexer.handle(0, test0)
+        multiplexer.handle(1, test1)
+        multiplexer.handle(1, result1)
+        multiplexer.handle(1, None)
+        self.assertEqual(self.reported, [result1])
+        self.result.startTest.assert_called_once_with(test1)
+        self.assertEqual(multiplexer.unfinished, 1)
+        multiplexer.handle(0, result0)
+        multiplexer.handle(0, None)
+        self.assertEqual(self.reported, [result1, result0])
+        self.assertEqual(multiplexer.unfinished, 0)
+
+    def test_ordered(self):
+        """
+        With ordered set, later targets wait for the earlier ones to finish.
+        """
+        multiplexer = ResultMultiplexer(self.result, 2, ordered=True)
+        test0, result0 = self._messages("zero")
+        test1, result1 = self._messages("one")
+        multiplexer.handle(1, test1)
+        multiplexer.handle(1, result1)
+        multiplexer.handle(1, None)
+        self.assertEqual(self.reported, [])
+        multiplexer.handle(0, test0)
+        self.result.startTest.assert_called_once_with(test0)
+        multiplexer.handle(0, result0)
+        multiplexer.handle(0, None)
+        self.assertEqual(self.reported, [result0, result1])
+        self.assertEqual(multiplexer.unfinished, 0)
+
+    def test_discard(self):
+        """
+        Discarded messages are not reported, but finished targets are counted.
+        """
+        multiplexer = ResultMultiplexer(self.result, 1)
+        test0, result0 = self._messages("zero")
+        multiplexer.discard(0, test0)
+        multiplexer.discard(0, result0)
+        multiplexer.discard(0, None)
+        self.assertEqual(self.reported, [])
+        self.assertEqual(multiplexer.unfinished, 0)
+
+    def test_batch(self):
+        """
+        Batches of messages are handled one message at a time.
+        """
+        multiplexer = ResultMultiplexer(self.result, 2)
+        test0, result0 = self._messages("zero")
+        multiplexer.handle(0, [result0, None])
+        self.assertEqual(self.reported, [result0])
+        self.assertEqual(multiplexer.unfinished, 1)
+        multiplexer.discard(1, [None])
+        self.assertEqual(multiplexer.unfinished, 0)
+
+    def test_stopTarget(self):
+        """
+        The result is told when each target is done, by name.
+        """
+        multiplexer = ResultMultiplexer(self.result, 2, targets=["a", "b"])
+        test1, result1 = self._messages("one")
+        multiplexer.handle(1, result1)
+        self.result.stopTarget.assert_not_called()
+        multiplexer.handle(1, None)
+        self.result.stopTarget.assert_called_once_with("b")
+
+    def test_progress(self):
+        """
+        The progress of the run knows which targets are running, even when
+        their results are held back.
+        """
+        self.result.progress = RunProgress(2, {}, 2)
+        multiplexer = ResultMultiplexer(
+            self.result, 2, ordered=True, targets=["a", "b"]
+        )
+        test1, result1 = self._messages("one")
+        multiplexer.handle(1, [test1, result1])
+        self.assertEqual(list(self.result.progress.running), ["b"])
+        multiplexer.handle(1, None)
+        self.assertEqual(self.result.progress.running, {})
+        # Batched targets send an empty batch when they start
+        multiplexer.handle(0, [])
+        self.assertEqual(list(self.result.progress.running), ["a"])
+
+    def test_orderedStop(self):
+        """
+        Buffered results are not reported once the result says to stop.
+        """
+        multiplexer = ResultMultiplexer(self.result, 2, ordered=True)
+        test0, result0 = self._messages("zero")
+        test1, result1 = self._messages("one")
+        multiplexer.handle(1, test1)
+        multiplexer.handle(1, result1)
+        multiplexer.handle(0, test0)
+        self.result.shouldStop = True
+        multiplexer.handle(0, None)
+        self.assertEqual(self.reported, [])
+
+
 class TestRun(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -136,6 +442,17 @@ class TestRun(unittest.TestCase):
         run(GreenTestSuite(), gs, args=self.args)
         self.assertIn("No Tests Found", self.stream.getvalue())
 
+    def test_stopsFrames(self):
+        """
+        The frames of the stream are stopped even if the run blows up.
+        """
+        gs = GreenStream(self.stream)
+        with mock.patch("green.runner.createPool", side_effect=OSError("boom")):
+            with mock.patch.object(gs, "stopFrames") as stopFrames:
+                with self.assertRaises(OSError):
+                    run(GreenTestSuite(), gs, args=self.args)
+        stopFrames.assert_called_once_with()
+
     def test_verbose3(self):
         """
         verbose=3 causes version output, and an empty test case passes.
@@ -219,6 +536,383 @@ class TestRun(unittest.TestCase):
         self.assertEqual(result.testsRun, 1)
         self.assertIn("FAILED", self.stream.getvalue())
 
+    def test_records_durations(self):
+        """
+        The time each target took is saved in the cache directory.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class Durations(unittest.TestCase):
+                def test01(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_durations.py").write_text(content, encoding="utf-8")
+        self.args.cache_dir = str(sub_tmpdir / "cache")
+        os.chdir(sub_tmpdir)
+        try:
+            tests = self.loader.loadTargets("test_durations")
+            run(tests, self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        durations = readCache(self.args.cache_dir, "durations")
+        self.assertEqual(list(durations), ["test_durations"])
+        self.assertGreater(durations["test_durations"], 0)
+
+    def test_records_failures(self):
+        """
+        The tests that failed are saved in the cache directory, and with
+        failed_first they run before the others next time.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        for name, num_tests in (("test_a", 1), ("test_b", 3)):
+            methods = "".join(
+                f"    def test{i}(self):\n        pass\n" for i in range(num_tests)
+            )
+            content = f"import unittest\nclass {name}(unittest.TestCase):\n{methods}"
+            (sub_tmpdir / f"{name}.py").write_text(content, encoding="utf-8")
+        content = "import unittest\nclass Fails(unittest.TestCase):\n"
+        content += "    def test0(self):\n        self.fail()\n"
+        (sub_tmpdir / "test_fails.py").write_text(content, encoding="utf-8")
+        self.args.cache_dir = str(sub_tmpdir / "cache")
+        self.args.verbose = 2
+        self.args.processes = 1
+        # A failure which was renamed since, in a module which runs in full
+        writeCache(self.args.cache_dir, "failures", ["test_b.test_b.test_gone"])
+        os.chdir(sub_tmpdir)
+        try:
+            tests = self.loader.loadTargets(["test_fails", "test_b"])
+            run(tests, self.stream, self.args)
+            self.assertEqual(
+                readCache(self.args.cache_dir, "failures"), ["test_fails.Fails.test0"]
+            )
+            # test_b has more tests so it normally runs first
+            self.stream = StringIO()
+            self.args.failed_first = True
+            (sub_tmpdir / "test_fails.py").write_text(
+                content.replace("self.fail()", "pass"), encoding="utf-8"
+            )
+            tests = self.loader.loadTargets(["test_fails", "test_b", "test_a"])
+            run(tests, self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        output = self.stream.getvalue()
+        self.assertLess(output.index("test_fails"), output.index("test_b"))
+        self.assertEqual(readCache(self.args.cache_dir, "failures"), [])
+
+    def test_records_failures_streaming(self):
+        """
+        The tests that failed are saved in the cache directory when the
+        results are streamed too, and those that were fixed are dropped.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class Streamed(unittest.TestCase):
+                def test_fixed(self):
+                    pass
+                def test_fails(self):
+                    self.fail()
+                @unittest.skip("reason")
+                def test_skipped(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_streamed.py").write_text(content, encoding="utf-8")
+        self.args.cache_dir = str(sub_tmpdir / "cache")
+        self.args.stream_results = True
+        self.args.processes = 1
+        writeCache(
+            self.args.cache_dir, "failures", ["test_streamed.Streamed.test_fixed"]
+        )
+        os.chdir(sub_tmpdir)
+        try:
+            tests = self.loader.loadTargets("test_streamed")
+            result = run(tests, self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        self.assertEqual(len(result.passing), 1)
+        self.assertEqual(
+            readCache(self.args.cache_dir, "failures"),
+            ["test_streamed.Streamed.test_fails"],
+        )
+        # The IDs of the tests are not kept either
+        self.assertEqual(result.test_ids, {})
+
+    def test_test_ids(self):
+        """
+        The tests are numbered when they are sent to the workers, which send
+        their results back with those IDs.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class Numbered(unittest.TestCase):
+                def test01(self):
+                    pass
+                def test02(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_numbered.py").write_text(content, encoding="utf-8")
+        os.chdir(sub_tmpdir)
+        try:
+            tests = self.loader.loadTargets("test_numbered")
+            with mock.patch.object(GreenTestResult, "protoTest") as protoTest:
+                protoTest.side_effect = lambda test: test
+                result = run(tests, self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        self.assertEqual(
+            result.test_ids,
+            {"test_numbered.Numbered.test01": 0, "test_numbered.Numbered.test02": 1},
+        )
+        self.assertEqual(sorted(x.test_id for x in result.passing), [0, 1])
+
+    def test_ordered_output(self):
+        """
+        ordered_output reports the modules in the order they were discovered.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        for name, num_tests in (("test_a", 1), ("test_b", 3)):
+            methods = "".join(
+                f"    def test{i}(self):\n        pass\n" for i in range(num_tests)
+            )
+            content = f"import unittest\nclass {name}(unittest.TestCase):\n{methods}"
+            (sub_tmpdir / f"{name}.py").write_text(content, encoding="utf-8")
+        self.args.ordered_output = True
+        self.args.verbose = 2
+        self.args.processes = 2
+        os.chdir(sub_tmpdir)
+        try:
+            tests = self.loader.loadTargets(["test_a", "test_b"])
+            result = run(tests, self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        self.assertEqual(result.testsRun, 4)
+        output = self.stream.getvalue()
+        # test_b has more tests so it is dispatched first, but reported second
+        self.assertLess(output.index("test_a"), output.index("test_b"))
+
+    def test_split_modules(self):
+        """
+        split_modules runs the classes of a heavy module as separate targets,
+        but leaves modules with module fixtures alone.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class First(unittest.TestCase):
+                def test01(self):
+                    pass
+            class Second(unittest.TestCase):
+                def test01(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_split.py").write_text(content, encoding="utf-8")
+        fixtures = content + "def setUpModule():\n    pass\n"
+        (sub_tmpdir / "test_fixtures.py").write_text(fixtures, encoding="utf-8")
+        self.args.cache_dir = str(sub_tmpdir / "cache")
+        self.args.split_modules = True
+        self.args.processes = 2
+        os.chdir(sub_tmpdir)
+        try:
+            tests = self.loader.loadTargets(["test_split"])
+            result = run(tests, self.stream, self.args)
+            tests = self.loader.loadTargets(["test_fixtures"])
+            run(tests, self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        self.assertEqual(result.testsRun, 2)
+        durations = readCache(self.args.cache_dir, "durations")
+        self.assertEqual(
+            sorted(durations),
+            ["test_fixtures", "test_split.First", "test_split.Second"],
+        )
+
+    def test_lazy_discovery(self):
+        """
+        lazy_discovery leaves loading the tests to the workers.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class Lazy(unittest.TestCase):
+                def test01(self):
+                    pass
+                def test02(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_lazy.py").write_text(content, encoding="utf-8")
+        (sub_tmpdir / "test_nothing.py").write_text("import os\n", encoding="utf-8")
+        self.args.lazy_discovery = True
+        self.args.targets = ["."]
+        os.chdir(sub_tmpdir)
+        try:
+            result = run(GreenTestSuite(), self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        self.assertEqual(result.testsRun, 2)
+        self.assertTrue(result.wasSuccessful())
+
+    def test_lazy_discovery_index(self):
+        """
+        lazy_discovery takes the tests of the files which have not changed
+        since they were last loaded from the discovery index, but does not
+        split their modules with it, since the classes they import may have
+        changed.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class First(unittest.TestCase):
+                def test01(self):
+                    pass
+            class Second(unittest.TestCase):
+                def test01(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_indexed.py").write_text(content, encoding="utf-8")
+        self.args.cache_dir = str(sub_tmpdir / "cache")
+        self.args.processes = 2
+        os.chdir(sub_tmpdir)
+        try:
+            run(self.loader.loadTargets(["."]), self.stream, self.args)
+            self.args.lazy_discovery = True
+            self.args.split_modules = True
+            self.args.targets = ["."]
+            with mock.patch("green.runner.RunProgress") as progress:
+                result = run(GreenTestSuite(), self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        self.assertEqual(result.testsRun, 2)
+        self.assertEqual(progress.call_args[0][0], 2)
+        durations = readCache(self.args.cache_dir, "durations")
+        self.assertIn("test_indexed", durations)
+        self.assertNotIn("test_indexed.First", durations)
+
+    def test_parallel_discovery_split(self):
+        """
+        With parallel_discovery, the modules discovered for the run are split.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class First(unittest.TestCase):
+                def test01(self):
+                    pass
+            class Second(unittest.TestCase):
+                def test01(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_discovered.py").write_text(content, encoding="utf-8")
+        self.args.cache_dir = str(sub_tmpdir / "cache")
+        self.args.lazy_discovery = True
+        self.args.parallel_discovery = True
+        self.args.split_modules = True
+        self.args.processes = 2
+        self.args.targets = ["."]
+        os.chdir(sub_tmpdir)
+        try:
+            result = run(GreenTestSuite(), self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        self.assertEqual(result.testsRun, 2)
+        durations = readCache(self.args.cache_dir, "durations")
+        self.assertEqual(
+            sorted(durations), ["test_discovered.First", "test_discovered.Second"]
+        )
+
+    def test_parallel_discovery(self):
+        """
+        parallel_discovery has the workers discover the tests of the files
+        which are not in the discovery index before running them.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class Parallel(unittest.TestCase):
+                def test01(self):
+                    pass
+                def test02(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_parallel.py").write_text(content, encoding="utf-8")
+        (sub_tmpdir / "test_broken.py").write_text("aoeu(\n", encoding="utf-8")
+        self.args.cache_dir = str(sub_tmpdir / "cache")
+        self.args.lazy_discovery = True
+        self.args.parallel_discovery = True
+        self.args.processes = 2
+        self.args.targets = ["."]
+        os.chdir(sub_tmpdir)
+        try:
+            with mock.patch("green.runner.RunProgress") as progress:
+                result = run(GreenTestSuite(), self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        # The module which failed to import is still reported by its worker
+        self.assertEqual(result.testsRun, 3)
+        self.assertEqual(len(result.errors), 1)
+        # Its tests are not known, so neither is the total
+        self.assertIsNone(progress.call_args[0][0])
+        index = readCache(self.args.cache_dir, "discovery")
+        self.assertEqual(
+            [x["tests"] for x in index.values()],
+            [["test_parallel.Parallel.test01", "test_parallel.Parallel.test02"]],
+        )
+
+    @unittest.skipUnless(
+        "forkserver" in multiprocessing.get_all_start_methods(),
+        "The forkserver start method is not available",
+    )
+    def test_preload(self):
+        """
+        The modules to preload are imported into the forkserver.
+        """
+        self.args.preload = ["json"]
+        context = multiprocessing.get_context("forkserver")
+        with mock.patch.object(context, "set_forkserver_preload") as preload:
+            run(GreenTestSuite(), self.stream, self.args)
+        preload.assert_called_once_with(["__main__", "green.process", "json"])
+
+    def test_worker_startup(self):
+        """
+        How long the worker processes took to start up is reported.
+        """
+        sub_tmpdir = pathlib.Path(tempfile.mkdtemp(dir=self.tmpdir))
+        content = dedent(
+            """
+            import unittest
+            class Startup(unittest.TestCase):
+                def test01(self):
+                    pass
+            """
+        )
+        (sub_tmpdir / "test_startup.py").write_text(content, encoding="utf-8")
+        os.chdir(sub_tmpdir)
+        try:
+            tests = self.loader.loadTargets("test_startup")
+            with mock.patch("green.runner.debug") as debug:
+                run(tests, self.stream, self.args)
+        finally:
+            os.chdir(self.startdir)
+        messages = [str(x.args[0]) for x in debug.call_args_list]
+        self.assertTrue([x for x in messages if "to start up" in x], messages)
+
     def test_failfast(self):
         """
         failfast causes the testing to stop after the first failure.
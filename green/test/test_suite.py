@@ -8,6 +8,7 @@ from unittest.mock import MagicMock
 
 from green.config import get_default_args
 from green.loader import GreenTestLoader
+from green.result import ProtoTestResult
 from green.runner import run
 from green.suite import GreenTestSuite
 
@@ -97,6 +98,24 @@ class TestGreenTestSuite(unittest.TestCase):
         gts = GreenTestSuite(args=args)
         self.assertEqual(gts.allow_stdout, True)
 
+    def test_captureLimit(self):
+        """
+        Output past the capture limit of the result is spilled to a file.
+        """
+
+        class Loud(unittest.TestCase):
+            def test_loud(self):
+                print("x" * 100)
+
+        gts = GreenTestSuite(args=get_default_args())
+        gts.addTest(Loud("test_loud"))
+        result = ProtoTestResult(capture_limit=10)
+        gts.run(result)
+        ((test, output),) = result.stdout_output.items()
+        self.addCleanup(os.remove, output.path)
+        self.assertEqual(output.head, "xxxxx")
+        self.assertEqual(output.length, 101)
+
     def test_skip_in_setUpClass(self):
         """
         If SkipTest is raised in setUpClass, then the test gets skipped
@@ -0,0 +1,137 @@
+import copy
+from io import StringIO
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from green.config import get_default_args
+from green.output import GreenStream
+from green import watch
+
+
+class WatchBase(unittest.TestCase):
+    def setUp(self):
+        self.startdir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.addCleanup(os.chdir, self.startdir)
+        os.chdir(self.tmpdir)
+        pathlib.Path("wpkg").mkdir()
+        for name in ("__init__.py", "helpers.py", "test_a.py", "test_b.py"):
+            pathlib.Path("wpkg", name).write_text("\n")
+
+
+class TestSnapshotFiles(WatchBase):
+    def test_changes(self):
+        """
+        Added, removed and modified python files are all noticed.
+        """
+        before = watch.snapshotFiles(["wpkg"])
+        self.assertEqual(len(before), 4)
+        after = dict(before)
+        after[os.path.join("wpkg", "test_c.py")] = 1
+        after[os.path.join("wpkg", "test_a.py")] += 1
+        del after[os.path.join("wpkg", "helpers.py")]
+        self.assertEqual(
+            watch.changedFiles(before, after),
+            [os.path.join("wpkg", x) for x in ("helpers.py", "test_a.py", "test_c.py")],
+        )
+        self.assertEqual(watch.changedFiles(before, dict(before)), [])
+
+
+class TestAffectedTargets(WatchBase):
+    def test_testModules(self):
+        """
+        Only changed test modules run again, unless they were deleted.
+        """
+        changed = [os.path.join("wpkg", "test_a.py")]
+        self.assertEqual(watch.affectedTargets(changed, ["wpkg"]), ["wpkg.test_a"])
+        changed = [os.path.join("wpkg", "test_gone.py")]
+        self.assertEqual(watch.affectedTargets(changed, ["wpkg"]), [])
+
+    def test_otherModules(self):
+        """
+        A change to any other module runs the test modules importing it again.
+        """
+        pathlib.Path("wpkg", "test_a.py").write_text("from . import helpers\n")
+        changed = [os.path.join("wpkg", "helpers.py")]
+        self.assertEqual(watch.affectedTargets(changed, ["wpkg"]), ["wpkg.test_a"])
+
+    def test_notDirectories(self):
+        """
+        Targets that are not directories always run again.
+        """
+        changed = [os.path.join("wpkg", "test_a.py")]
+        self.assertEqual(
+            watch.affectedTargets(changed, ["wpkg.test_b"]), ["wpkg.test_b"]
+        )
+
+    def test_isPreloaded(self):
+        """
+        Files are matched against preloaded modules and packages.
+        """
+        path = os.path.join("wpkg", "helpers.py")
+        self.assertTrue(watch.isPreloaded(path, ["wpkg"]))
+        self.assertTrue(watch.isPreloaded(path, ["wpkg.helpers"]))
+        self.assertFalse(watch.isPreloaded(path, ["wpkg.test_a", "wpk"]))
+
+
+class TestWatch(WatchBase):
+    def test_rerun(self):
+        """
+        The tests affected by a change run again, without coverage, until
+        interrupted.
+        """
+        args = copy.deepcopy(get_default_args())
+        args.targets = ["wpkg"]
+        args.run_coverage = True
+        stream = GreenStream(StringIO())
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                pathlib.Path("wpkg", "test_b.py").write_text("\n\n")
+            if len(sleeps) == 4:
+                raise KeyboardInterrupt
+
+        results = [mock.MagicMock(), mock.MagicMock()]
+        results[1].wasSuccessful.return_value = False
+        with mock.patch("green.watch.run", side_effect=results) as run:
+            with mock.patch("green.watch.time.sleep", sleep):
+                exit_code = watch.watch(stream, args)
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(run.call_count, 2)
+        first_args, second_args = (x.args[2] for x in run.call_args_list)
+        self.assertTrue(first_args.lazy_discovery)
+        self.assertTrue(first_args.run_coverage)
+        self.assertEqual(second_args.targets, ["wpkg.test_b"])
+        self.assertFalse(second_args.run_coverage)
+
+    def test_importedOutside(self):
+        """
+        Changes to the modules the tests import from outside of the targets
+        are watched as well.
+        """
+        pathlib.Path("tests").mkdir()
+        pathlib.Path("tests", "test_c.py").write_text("from wpkg import helpers\n")
+        args = copy.deepcopy(get_default_args())
+        args.targets = ["tests"]
+        stream = GreenStream(StringIO())
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                pathlib.Path("wpkg", "helpers.py").write_text("\n\n")
+            if len(sleeps) == 4:
+                raise KeyboardInterrupt
+
+        with mock.patch("green.watch.run") as run:
+            with mock.patch("green.watch.time.sleep", sleep):
+                watch.watch(stream, args)
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(run.call_args_list[1].args[2].targets, ["test_c"])
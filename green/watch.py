@@ -0,0 +1,147 @@
+"""Running tests again whenever files change."""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import multiprocessing.forkserver
+import os
+import time
+from typing import Iterable, Sequence
+
+from green.impact import findAffectedTestModules, findImportRoots, moduleName
+from green.loader import findTestFiles
+from green.output import debug, GreenStream
+from green.runner import run
+from green.suite import GreenTestSuite
+
+# Seconds to wait between looking for changed files.
+POLL_INTERVAL = 0.5
+
+
+def snapshotFiles(
+    roots: Iterable[str], exclude_dirs: Sequence[str] = ()
+) -> dict[str, int]:
+    """
+    I return the modification time of every python file under the roots
+    that discovery would look into.
+    """
+    snapshot = {}
+    for root in roots:
+        for path in findTestFiles(root, "*.py", exclude_dirs):
+            try:
+                snapshot[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+    return snapshot
+
+
+def changedFiles(before: dict[str, int], after: dict[str, int]) -> list[str]:
+    """
+    I return the files that were added, removed or modified between two
+    snapshots.
+    """
+    return sorted(
+        path
+        for path in before.keys() | after.keys()
+        if before.get(path) != after.get(path)
+    )
+
+
+def affectedTargets(
+    changed: Iterable[str],
+    targets: list[str],
+    file_pattern: str = "test*.py",
+    cache_dir: str = "",
+    exclude_dirs: Sequence[str] = (),
+) -> list[str]:
+    """
+    I return the targets to run again after the changed files changed.
+
+    If the targets are all directories, only the test modules in them which
+    changed or import a module which changed need to run again (see
+    findAffectedTestModules()).  Otherwise all of the targets are returned.
+    """
+    if not all(os.path.isdir(x) for x in targets):
+        return targets
+    return findAffectedTestModules(
+        changed, targets, file_pattern, cache_dir, exclude_dirs
+    )
+
+
+def isPreloaded(path: str, preload: Iterable[str]) -> bool:
+    """
+    I check whether the file at path belongs to one of the preloaded modules
+    or packages.
+    """
+    module = moduleName(path)
+    return any(module == x or module.startswith(x + ".") for x in preload)
+
+
+def restartForkserver() -> None:
+    """
+    I stop the forkserver, so that the next pool starts a new one, which
+    imports the preloaded modules afresh.
+    """
+    forkserver = getattr(multiprocessing.forkserver, "_forkserver", None)
+    stop = getattr(forkserver, "_stop", None)
+    if stop is not None:
+        stop()
+
+
+def watch(stream: GreenStream, args: argparse.Namespace) -> int:
+    """
+    I run the targets, and then keep running the tests affected by each
+    change to the python files under them, or under the directories their
+    imports come from (see findImportRoots()), until interrupted.
+
+    Every run uses a new pool of worker processes, so that modules which
+    changed are imported afresh, but the workers start from the forkserver
+    that the previous runs already warmed up.
+
+    I return the exit code of the last run.
+    """
+    # The main process must not hold on to test modules that may change.
+    args.lazy_discovery = True
+    roots = findImportRoots([x for x in args.targets if os.path.isdir(x)])
+    snapshot = snapshotFiles(roots, args.exclude_dirs)
+    run_args = args
+    while True:
+        result = run(GreenTestSuite(), stream, run_args)
+        exit_code = int(not result.wasSuccessful())
+
+        # Coverage of only the tests that were run again would be misleading
+        run_args = copy.copy(args)
+        run_args.run_coverage = False
+        run_args.quiet_coverage = False
+        run_args.minimum_coverage = None
+
+        stream.writeln("Watching for changes, press Ctrl-C to stop.")
+        try:
+            while True:
+                time.sleep(POLL_INTERVAL)
+                new_snapshot = snapshotFiles(roots, args.exclude_dirs)
+                changed = changedFiles(snapshot, new_snapshot)
+                snapshot = new_snapshot
+                if not changed:
+                    continue
+                debug(f"Changed files: {changed}")
+                run_args.targets = affectedTargets(
+                    changed,
+                    args.targets,
+                    args.file_pattern,
+                    args.cache_dir,
+                    args.exclude_dirs,
+                )
+                if run_args.targets:
+                    break
+        except KeyboardInterrupt:
+            stream.writeln()
+            return exit_code
+
+        if args.preload and any(isPreloaded(x, args.preload) for x in changed):
+            debug("A preloaded module changed, restarting the forkserver")
+            restartForkserver()
+        stream.writeln()
+        stream.writeln(f"Changed: {', '.join(changed)}")
+        stream.writeln()